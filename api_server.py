@@ -0,0 +1,337 @@
+"""
+HTTP API inferensi deteksi kematangan TBS, berjalan berdampingan dengan UI Streamlit.
+
+Endpoint:
+  GET  /health  liveness: proses server hidup
+  GET  /ready   readiness: model sudah dimuat dan antrian inferensi belum penuh
+  GET  /stats   metrik antrian, scheduler micro-batching (ukuran batch, waktu tunggu) dan model yang dimuat
+  GET  /metrics metrik pipeline dalam format teks Prometheus (lihat metrics.py)
+  POST /detect  gambar sebagai multipart/form-data (satu file atau beberapa file sekaligus
+                sebagai batch) atau body mentah dengan Content-Type image/*
+
+Parameter query /detect:
+  conf      confidence threshold (default 0.3)
+  annotate  1 = sertakan gambar beranotasi (JPEG base64) di JSON
+  format    "image" = kembalikan gambar beranotasi (image/jpeg) langsung, hanya untuk satu gambar
+  sliced    1 = inferensi bertile untuk gambar resolusi tinggi (lihat sliced.py)
+
+Inferensi berjalan di thread pool di luar event loop dengan model default dari registry
+model (model_registry.py); bobot yang diganti di disk dimuat ulang tanpa memutus request. Jumlah request yang diproses bersamaan dibatasi
+config.API_MAX_CONCURRENCY; request lain menunggu di antrian (maksimal config.API_QUEUE_SIZE)
+dan ditolak dengan 503 jika antrian penuh atau menunggu lebih lama dari
+config.API_QUEUE_TIMEOUT. Request yang diproses bersamaan digabung menjadi satu batch
+oleh scheduler micro-batching (batch_scheduler.py); metriknya tersedia di GET /stats.
+
+Contoh:
+    python api_server.py --port 8000
+    curl -F image=@tbs.jpg "http://localhost:8000/detect?conf=0.4&annotate=1"
+"""
+import argparse
+import asyncio
+import base64
+import io
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+import config
+import metrics
+from batch_scheduler import get_batch_scheduler
+from model_registry import get_model_registry
+from utils1 import (class_names, class_colors, load_image_bgr, detect_images_all, filter_detections,
+                    detections_to_records, draw_boxes_on_frame)
+
+logger = logging.getLogger("api_server")
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def default_concurrency():
+    if config.API_MAX_CONCURRENCY:
+        return config.API_MAX_CONCURRENCY
+    return config.BATCH_MAX_SIZE if config.BATCH_SCHEDULER_ENABLED else 1
+
+
+class InferenceQueue:
+    """
+    Antrian inferensi: maksimal max_concurrency pekerjaan berjalan di thread pool,
+    sisanya menunggu (maksimal queue_size) dengan batas waktu tunggu queue_timeout.
+    """
+    def __init__(self, max_concurrency=None, queue_size=None, queue_timeout=None):
+        self.max_concurrency = max_concurrency or default_concurrency()
+        self.queue_size = config.API_QUEUE_SIZE if queue_size is None else queue_size
+        self.queue_timeout = queue_timeout or config.API_QUEUE_TIMEOUT
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="inferensi")
+        self._semaphore = None # Dibuat di event loop saat pertama dipakai
+
+    @property
+    def full(self):
+        return self.waiting >= self.queue_size
+
+    async def run(self, function, *args):
+        """
+        Menjalankan function(*args) di thread pool setelah mendapat giliran.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.full:
+            self.rejected += 1
+            raise QueueFullError("Antrian inferensi penuh, coba lagi nanti.")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise QueueFullError("Terlalu lama menunggu di antrian inferensi.")
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {"waiting": self.waiting, "running": self.running, "completed": self.completed,
+                "rejected": self.rejected, "max_concurrency": self.max_concurrency, "queue_size": self.queue_size}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class DetectionService:
+    """
+    Model bersama beserta antrian inferensinya. Model dimuat di background agar
+    /health langsung merespons; /ready baru sukses setelah model dimuat dan dipanaskan.
+    """
+    def __init__(self, queue=None):
+        self.queue = queue or InferenceQueue()
+        self.model = None
+        self.load_error = None
+        metrics.register_queue("api_waiting", lambda: self.queue.waiting)
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    def load(self):
+        try:
+            # Lewat registry langsung: exception asli (bobot tidak ada, backend salah, OOM)
+            # sampai ke /ready dan log, tidak ditelan seperti di utils1.load_model
+            self.model = get_model_registry().get(config.MODEL_WEIGHTS, config.MODEL_BACKEND)
+            logger.info("Model siap (%s).", config.MODEL_BACKEND)
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            logger.exception("Gagal memuat model %s (%s)", config.MODEL_WEIGHTS, config.MODEL_BACKEND)
+
+    def detect(self, image_bytes, conf, annotate=False, sliced=False):
+        """
+        Mendeteksi satu gambar (byte hasil encode). Mengembalikan (dict hasil, JPEG beranotasi atau None).
+        """
+        return self.detect_batch([image_bytes], conf, annotate, sliced)[0]
+
+    def detect_batch(self, images, conf, annotate=False, sliced=False):
+        """
+        Mendeteksi semua gambar satu request sekaligus: gambar di-decode dulu, lalu dikirim
+        bersamaan ke scheduler micro-batching sehingga diinferensi sebagai satu batch.
+        """
+        images_bgr = [load_image_bgr(image_bytes) for image_bytes in images]
+        # Model dipinjam per request: hot-swap bobot tidak memutus request yang sedang berjalan
+        with get_model_registry().acquire() as model:
+            all_detections = detect_images_all([io.BytesIO(image_bytes) for image_bytes in images], model,
+                                               images_bgr, sliced)
+        return [self._result(image_bgr, filter_detections(detections, conf), annotate)
+                for image_bgr, detections in zip(images_bgr, all_detections)]
+
+    def _result(self, image_bgr, detections, annotate):
+        counts = {name: 0 for name in class_names}
+        for cls in detections[:, 5].astype(int):
+            counts[class_names[cls]] += 1
+        result = {
+            "width": image_bgr.shape[1],
+            "height": image_bgr.shape[0],
+            "count": len(detections),
+            "counts": counts,
+            "detections": detections_to_records(detections),
+        }
+
+        annotated = None
+        if annotate:
+            # image_bgr hanya dipakai permintaan ini, jadi box digambar langsung tanpa salinan
+            annotated_bgr = draw_boxes_on_frame(image_bgr, detections, class_names, class_colors, inplace=True)
+            annotated = cv2.imencode(".jpg", annotated_bgr)[1].tobytes()
+        return result, annotated
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_error(self, status_code, **kwargs):
+        exception = kwargs.get("exc_info", (None, None, None))[1]
+        message = getattr(exception, "log_message", None) or self._reason
+        self.finish({"error": message})
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write({"status": "ok"})
+
+
+class ReadyHandler(BaseHandler):
+    def get(self):
+        service = self.service
+        if service.ready and not service.queue.full:
+            status = "ready"
+        elif service.ready:
+            status = "busy"
+        else:
+            status = "error" if service.load_error else "loading"
+
+        payload = {"status": status, "backend": config.MODEL_BACKEND, "queue": service.queue.stats()}
+        if service.load_error:
+            payload["error"] = service.load_error
+        self.set_status(200 if status == "ready" else 503)
+        self.write(payload)
+
+
+class StatsHandler(BaseHandler):
+    def get(self):
+        registry = get_model_registry()
+        model = registry.peek()
+        scheduler = get_batch_scheduler(model) if model is not None else None
+        self.write({"queue": self.service.queue.stats(), "scheduler": scheduler.stats() if scheduler else None,
+                    "models": registry.stats()})
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", metrics.CONTENT_TYPE)
+        self.finish(metrics.render())
+
+
+class DetectHandler(BaseHandler):
+    def _uploads(self):
+        """
+        Daftar (nama file, byte gambar) dari multipart/form-data atau body mentah image/*.
+        """
+        uploads = [(file.filename, file.body) for files in self.request.files.values() for file in files]
+        if not uploads and self.request.headers.get("Content-Type", "").startswith("image/") and self.request.body:
+            uploads = [(None, self.request.body)]
+        for filename, body in uploads:
+            if not body:
+                raise tornado.web.HTTPError(400, f"File gambar kosong: {filename or '(body)'}.")
+        return uploads
+
+    async def post(self):
+        if not self.service.ready:
+            raise tornado.web.HTTPError(503, "Model belum siap.")
+
+        try:
+            conf = float(self.get_argument("conf", "0.3"))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "Parameter conf harus berupa angka.")
+        if not 0.0 <= conf <= 1.0:
+            raise tornado.web.HTTPError(400, "Parameter conf harus di antara 0 dan 1.")
+        as_image = self.get_argument("format", "json") == "image"
+        annotate = as_image or self.get_argument("annotate", "0").lower() in ("1", "true", "yes")
+        sliced = self.get_argument("sliced", "0").lower() in ("1", "true", "yes")
+
+        uploads = self._uploads()
+        if not uploads:
+            raise tornado.web.HTTPError(400, "Tidak ada gambar. Kirim multipart/form-data atau body image/*.")
+        if len(uploads) > config.API_MAX_BATCH_IMAGES:
+            raise tornado.web.HTTPError(413, f"Maksimal {config.API_MAX_BATCH_IMAGES} gambar per request.")
+        if as_image and len(uploads) != 1:
+            raise tornado.web.HTTPError(400, "format=image hanya untuk satu gambar.")
+
+        started = time.perf_counter()
+        try:
+            # Satu request batch memakai satu slot antrian
+            outputs = await self.service.queue.run(self.service.detect_batch, [body for _, body in uploads],
+                                                   conf, annotate, sliced)
+        except QueueFullError as e:
+            self.set_header("Retry-After", "1")
+            raise tornado.web.HTTPError(503, str(e))
+        except (OSError, ValueError, cv2.error) as e:
+            raise tornado.web.HTTPError(400, f"Gambar tidak dapat dibaca ({type(e).__name__}).")
+
+        if as_image:
+            self.set_header("Content-Type", "image/jpeg")
+            self.finish(outputs[0][1])
+            return
+
+        results = []
+        for (filename, _), (result, annotated) in zip(uploads, outputs):
+            result = {"filename": filename, **result}
+            if annotated is not None:
+                result["annotated_image"] = base64.b64encode(annotated).decode("ascii")
+            results.append(result)
+        self.write({
+            "conf": conf,
+            "class_names": class_names,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "results": results,
+        })
+
+
+def make_app(service):
+    handler_args = {"service": service}
+    return tornado.web.Application([
+        (r"/health", HealthHandler, handler_args),
+        (r"/ready", ReadyHandler, handler_args),
+        (r"/stats", StatsHandler, handler_args),
+        (r"/metrics", MetricsHandler, handler_args),
+        (r"/detect", DetectHandler, handler_args),
+    ])
+
+
+async def serve(host, port, service):
+    server = HTTPServer(make_app(service), max_body_size=config.API_MAX_BODY_BYTES)
+    server.listen(port, host)
+    logger.info("API inferensi berjalan di http://%s:%d", host, port)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, service.load)
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        service.queue.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API inferensi deteksi kematangan TBS.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--concurrency", type=int, default=default_concurrency(),
+                        help="Jumlah request yang diproses bersamaan")
+    parser.add_argument("--queue-size", type=int, default=config.API_QUEUE_SIZE,
+                        help="Jumlah permintaan yang boleh menunggu di antrian")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    service = DetectionService(InferenceQueue(args.concurrency, args.queue_size))
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,12 @@
 import streamlit as st
-from PIL import Image, ImageOps
-import numpy as np
-from io import BytesIO
 import os
 import base64
-import tempfile
-import cv2
-import time
+import threading
 
-from utils1 import load_model, detect_image_streamlit, detect_video_streamlit, class_names, class_colors
+# Modul deteksi (torch, ultralytics, OpenCV, SciPy) di-import di dalam fungsi halaman Deteksi,
+# sehingga halaman Home dan About tampil tanpa menunggu import tersebut
+from spool import SessionFiles, spool_upload, new_download_path, download_url, sweep_stale_files
+import config
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -77,6 +75,25 @@ def load_css():
         background-color: #0056b3;
     }
 
+    /* Link unduhan file hasil (di-stream server statis), tampil seperti tombol download */
+    a.download-link {
+        display: inline-flex;
+        align-items: center;
+        justify-content: center;
+        width: 100%;
+        padding: 12px 20px;
+        font-size: 1rem;
+        background-color: #007bff;
+        color: white !important;
+        border-radius: 5px;
+        font-weight: bold;
+        text-decoration: none;
+        transition: all 0.3s;
+    }
+    a.download-link:hover {
+        background-color: #0056b3;
+    }
+
     /* Layout responsive */
     .main .block-container {
         max-width: 100%;
@@ -348,21 +365,50 @@ def show_main_banner():
         st.markdown(f'<img src="data:image/png;base64,{get_image_base64(images["main_banner"])}" style="width:100%; height:auto; display:block; margin-bottom: 1rem;">', unsafe_allow_html=True)
 
 # Load model
-def initialize_model():
-    if 'model_loaded' not in st.session_state:
-        st.session_state.model_loaded = False
-        st.session_state.model = None
-
-    if not st.session_state.model_loaded:
-        with st.spinner("🔄 Memuat model deteksi..."):
-            model = load_model()
-            if model:
-                st.session_state.model = model
-                st.session_state.model_loaded = True
-            else:
+@st.cache_resource
+def preload_model():
+    # Sekali per proses: muat dan panaskan model default di latar belakang setelah halaman pertama terkirim.
+    # Sesi yang membuka halaman Deteksi lebih dulu menunggu pemuatan yang sama di registry model.
+    # Jika dijalankan lewat serve_app.py (container), model sudah siap sebelum server dibuka.
+    def load():
+        from utils1 import load_model
+        load_model()
+
+    thread = threading.Thread(target=load, name="model-preload", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def start_metrics_server():
+    # Sekali per proses: GET /metrics (format Prometheus) di config.METRICS_PORT
+    import metrics
+    return metrics.start_http_server(config.METRICS_PORT)
+
+def initialize_model(model_name):
+    # Sesi hanya menyimpan nama model; instance-nya dipakai bersama semua sesi lewat registry model
+    from model_registry import get_model_registry
+    from utils1 import load_model
+
+    if get_model_registry().peek(model_name) is None:
+        with st.spinner(f"🔄 Memuat model deteksi {model_name}..."):
+            if load_model(name=model_name) is None:
                 st.error("❌ Gagal memuat model.")
                 st.stop()
 
+def selected_model():
+    # Pinjam model pilihan sesi ini selama satu permintaan: with selected_model() as model: ...
+    from model_registry import get_model_registry
+
+    return get_model_registry().acquire(st.session_state.get('model_name'))
+
+# Pilihan model deteksi (config.MODEL_WEIGHTS dan config.DETECTION_MODEL_LIST)
+def show_model_selector():
+    from model_registry import get_model_registry, model_names
+
+    loaded = {entry['name'] for entry in get_model_registry().stats()['models']}
+    return st.selectbox("Model deteksi", model_names(), key="model_name",
+                        format_func=lambda name: f"{name} (dimuat)" if name in loaded else name)
+
 # Footer function
 def show_footer():
     st.markdown("""
@@ -434,7 +480,37 @@ def show_home_page():
     show_footer()
 
 # Detection functions
-def handle_image_detection(uploaded_file, confidence_threshold):
+def apply_image_threshold(image_bgr, confidence_threshold):
+    from utils1 import render_image_detections
+
+    # Saring deteksi tersimpan dengan threshold saat ini lalu render ulang (tanpa inferensi)
+    result_image = render_image_detections(image_bgr, st.session_state.image_detections, confidence_threshold)
+    st.session_state.detection_conf = confidence_threshold
+    if result_image is not None:
+        st.session_state.detection_result = result_image
+        st.session_state.detection_status = "success"
+        st.session_state.download_image_ready = True
+    else:
+        st.session_state.detection_result = "not_found"
+        st.session_state.detection_status = "no_object"
+        st.session_state.download_image_ready = False
+
+def image_records_csv(source_id, confidence_threshold):
+    # Deteksi yang lolos threshold sebagai CSV (satu baris per box)
+    import io
+    from detection_records import DetectionRecords
+    from utils1 import filter_detections
+
+    records = DetectionRecords()
+    records.append(source_id, filter_detections(st.session_state.image_detections, confidence_threshold))
+    buffer = io.BytesIO()
+    records.to_csv(buffer)
+    return buffer.getvalue()
+
+def handle_image_detection(uploaded_file, confidence_threshold, sliced=False):
+    import cv2
+    from utils1 import detect_image_all, load_image_bgr
+
     # Reset hasil deteksi ketika file baru diupload
     if uploaded_file and ('current_uploaded_file' not in st.session_state or
                             st.session_state.current_uploaded_file != uploaded_file.name):
@@ -442,20 +518,36 @@ def handle_image_detection(uploaded_file, confidence_threshold):
         st.session_state.detection_status = None
         st.session_state.current_uploaded_file = uploaded_file.name
         st.session_state.download_image_ready = False # NEW: Flag to control download button visibility
+        st.session_state.image_detections = None
+        st.session_state.detection_conf = None
 
     # Initialize session state for detection results
-    for key in ['detection_result', 'detection_status', 'download_image_ready']: # Include new flag
+    for key in ['detection_result', 'detection_status', 'download_image_ready', 'image_detections', 'detection_conf']: # Include new flag
         if key not in st.session_state:
             st.session_state[key] = None
 
+    # Mode tiling atau model berubah: deteksi lama tidak berlaku lagi, perlu deteksi ulang
+    if st.session_state.image_detections is not None and (st.session_state.get('image_sliced') != sliced or
+                                                          st.session_state.get('image_model') != st.session_state.model_name):
+        st.session_state.image_detections = None
+        st.session_state.detection_result = None
+        st.session_state.detection_status = None
+        st.session_state.download_image_ready = False
+
+    # Gambar di-decode sekali per rerun menjadi buffer BGR yang dipakai untuk tampilan, deteksi dan render
+    image_bgr = load_image_bgr(uploaded_file)
+
+    # Slider threshold berubah setelah deteksi: cukup saring dan render ulang
+    if st.session_state.image_detections is not None and st.session_state.detection_conf != confidence_threshold:
+        apply_image_threshold(image_bgr, confidence_threshold)
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("#### 📥 Gambar Asli")
         # Display the image directly within the detection-container
         st.markdown('<div class="detection-container">', unsafe_allow_html=True)
-        image = Image.open(uploaded_file)
-        st.image(image, caption="Gambar yang diupload", use_column_width=True)
+        st.image(image_bgr, channels="BGR", caption="Gambar yang diupload", use_column_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
         # Use Streamlit columns directly for button alignment
@@ -465,11 +557,10 @@ def handle_image_detection(uploaded_file, confidence_threshold):
             detect_button = st.button("🔍 Deteksi", use_container_width=True, type="primary")
 
         download_image_data = None
-        if st.session_state.get('download_image_ready', False) and st.session_state.detection_result:
+        if st.session_state.get('download_image_ready', False) and st.session_state.detection_result is not None:
             try:
-                img_buf = BytesIO()
-                st.session_state.detection_result.save(img_buf, format='PNG')
-                download_image_data = img_buf.getvalue()
+                # Encode PNG langsung dari buffer BGR, tanpa konversi ke RGB/PIL
+                download_image_data = cv2.imencode(".png", st.session_state.detection_result)[1].tobytes()
             except Exception as e:
                 st.error(f"Error preparing image for download: {e}")
                 download_image_data = None 
@@ -500,7 +591,7 @@ def handle_image_detection(uploaded_file, confidence_threshold):
                 disabled=reset_disabled
             )
             if reset_button and not reset_disabled: 
-                for key in ['detection_result', 'detection_status', 'current_uploaded_file', 'download_image_ready']: # Add download_image_ready to reset
+                for key in ['detection_result', 'detection_status', 'current_uploaded_file', 'download_image_ready', 'image_detections', 'detection_conf', 'image_sliced', 'image_model']: # Add download_image_ready to reset
                     st.session_state[key] = None
                 st.rerun()
 
@@ -512,20 +603,18 @@ def handle_image_detection(uploaded_file, confidence_threshold):
 
         if detect_button:
             with st.spinner("Memproses deteksi gambar..."):
-                result_image = detect_image_streamlit(uploaded_file, st.session_state.model, conf=confidence_threshold)
-
-                if result_image and isinstance(result_image, Image.Image):
-                    st.session_state.detection_result = result_image
-                    st.session_state.detection_status = "success"
-                    st.session_state.download_image_ready = True 
+                # Inferensi sekali dengan threshold terendah; slider hanya menyaring hasilnya
+                with selected_model() as model:
+                    st.session_state.image_detections = detect_image_all(uploaded_file, model, image_bgr, sliced=sliced)
+                st.session_state.image_sliced = sliced
+                st.session_state.image_model = st.session_state.model_name
+                apply_image_threshold(image_bgr, confidence_threshold)
+
+                if st.session_state.detection_status == "success":
                     st.rerun() 
-                else:
-                    st.session_state.detection_result = "not_found"
-                    st.session_state.detection_status = "no_object"
-                    st.session_state.download_image_ready = False 
 
-        if st.session_state.detection_status == "success" and st.session_state.detection_result:
-            image_result_placeholder.image(st.session_state.detection_result, caption="Hasil Deteksi", use_column_width=True)
+        if st.session_state.detection_status == "success" and st.session_state.detection_result is not None:
+            image_result_placeholder.image(st.session_state.detection_result, channels="BGR", caption="Hasil Deteksi", use_column_width=True)
         elif st.session_state.detection_status == "no_object":
             # Using instruction-message directly here for consistency
             image_result_placeholder.markdown('<div class="instruction-message">'
@@ -540,7 +629,7 @@ def handle_image_detection(uploaded_file, confidence_threshold):
 
 
         # Summary box outside the main display area, but still in col2
-        if st.session_state.detection_status == "success" and st.session_state.detection_result:
+        if st.session_state.detection_status == "success" and st.session_state.detection_result is not None:
             st.markdown("---")
             st.markdown("### ✅ Ringkasan Deteksi")
             st.markdown(f"""
@@ -551,15 +640,93 @@ def handle_image_detection(uploaded_file, confidence_threshold):
                     <p style="font-style: italic;">Hasil visual ditampilkan di atas. Anda dapat mengunduhnya.</p>
                 </div>
             """, unsafe_allow_html=True)
+            st.download_button("📄 Data Deteksi (CSV)", data=image_records_csv(uploaded_file.name, confidence_threshold),
+                               file_name="deteksi_gambar.csv", mime="text/csv", key="image_records_download")
+
+@st.cache_resource
+def start_download_server():
+    # Sekali per proses: server unduhan (streaming, Range, Content-Type benar) untuk file di DOWNLOAD_DIR
+    import download_server
+    return download_server.start_download_server()
+
+def file_url(path, download=False):
+    # URL file hasil di server unduhan, pada host yang sama dengan halaman ini kecuali DOWNLOAD_BASE_URL diatur
+    base_url = config.DOWNLOAD_BASE_URL
+    if not base_url:
+        headers = st.context.headers
+        host = headers.get("X-Forwarded-Host") or headers.get("Host") or "localhost"
+        hostname = host.rsplit(":", 1)[0] if not host.endswith("]") else host
+        scheme = headers.get("X-Forwarded-Proto", "http")
+        base_url = f"{scheme}://{hostname}:{config.DOWNLOAD_PORT}/files/"
+    return download_url(path, base_url, download)
+
+@st.cache_resource
+def sweep_spool_once():
+    # Sekali per proses: hapus upload/hasil sisa proses sebelumnya yang berhenti tiba-tiba
+    return sweep_stale_files()
+
+def session_files():
+    # File sementara milik sesi ini; dihapus otomatis saat sesi berakhir
+    if 'session_files' not in st.session_state:
+        st.session_state.session_files = SessionFiles()
+    return st.session_state.session_files
+
+def remove_temp_video():
+    # Hapus salinan video sumber (disimpan untuk render ulang saat threshold berubah)
+    session_files().remove(st.session_state.get('temp_video_path'))
+    st.session_state.temp_video_path = None
+
+def remove_processed_video():
+    # Hapus file hasil deteksi video sebelumnya (jika ada)
+    session_files().remove(st.session_state.get('processed_video_path'))
+    st.session_state.processed_video_path = None
+
+def new_processed_video_path(filename):
+    # File hasil di folder unduhan statis; frame hasil deteksi langsung di-encode ke sini
+    remove_processed_video()
+    st.session_state.processed_video_path = session_files().track(new_download_path(filename))
+    return st.session_state.processed_video_path
+
+def video_records_path(confidence_threshold):
+    # CSV deteksi video per frame yang diinferensi, ditulis sekali per threshold ke folder unduhan statis
+    path = st.session_state.get('video_records_path')
+    if st.session_state.get('video_records_conf') == confidence_threshold and path and os.path.exists(path):
+        return path
+    session_files().remove(path)
+    # Deteksi sudah tersimpan per kolom selama video diproses; cukup disaring threshold
+    records = st.session_state.video_detections.records.filtered(confidence_threshold)
+    path = session_files().track(new_download_path("deteksi_video.csv"))
+    records.to_csv(path)
+    st.session_state.video_records_path = path
+    st.session_state.video_records_conf = confidence_threshold
+    return path
+
+def new_tracker(tracking):
+    from tracker import ObjectTracker
+    from utils1 import class_names
+
+    # Tracker baru per proses/render agar ID dan hitungan unik dimulai dari awal video
+    return ObjectTracker(len(class_names)) if tracking else None
+
+def handle_video_detection(uploaded_video, confidence_threshold, sampler=None, keep_skipped=None, tracking=False,
+                           codec=None):
+    from job_queue import OUTPUT_STEM
+    from utils1 import VideoDetections, class_names, detect_video_streamlit, render_video_detections
+    from video_output import FramePreview, output_filename
+    from video_pipeline import VideoPipeline
 
-def handle_video_detection(uploaded_video, confidence_threshold):
     # Reset hasil deteksi video ketika file baru diupload
     if uploaded_video and ('current_uploaded_video' not in st.session_state or
                             st.session_state.current_uploaded_video != uploaded_video.name):
         st.session_state.video_detection_status = None
         st.session_state.current_uploaded_video = uploaded_video.name
-        st.session_state.temp_video_path = None
-        st.session_state.processed_frames_data = None 
+        remove_temp_video()
+        remove_processed_video()
+        st.session_state.video_detections = None
+        st.session_state.video_records_conf = None
+        st.session_state.video_render_conf = None
+        st.session_state.video_render_codec = None
+        st.session_state.video_unique_counts = None
         st.session_state.video_fps = None 
         st.session_state.video_width = None
         st.session_state.video_height = None
@@ -580,44 +747,17 @@ def handle_video_detection(uploaded_video, confidence_threshold):
             detect_video_button = st.button("🎬 Deteksi", use_container_width=True, type="primary")
 
         
-        download_video_data = None
-        output_video_filename = "hasil_deteksi_video.mp4"
-        # Using tempfile.NamedTemporaryFile for safer temporary file handling
-        temp_output_path_dl = os.path.join(tempfile.gettempdir(), output_video_filename) # Define path here
-
-        if st.session_state.get('download_video_ready', False) and st.session_state.get('processed_frames_data') is not None:
-            if st.session_state.get('video_fps') and st.session_state.get('video_width') and st.session_state.get('video_height'):
-                try:
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v') # Codec for .mp4
-                    out_dl = cv2.VideoWriter(temp_output_path_dl, fourcc, st.session_state.video_fps,
-                                            (st.session_state.video_width, st.session_state.video_height))
-
-                    if out_dl.isOpened():
-                        for frame_bgr in st.session_state.processed_frames_data:
-                            out_dl.write(frame_bgr)
-                        out_dl.release()
-
-                        with open(temp_output_path_dl, "rb") as file:
-                            download_video_data = file.read()
-                        # Clean up the temporary file immediately after reading
-                        os.remove(temp_output_path_dl)
-                    else:
-                        st.error("Gagal membuat file video untuk diunduh. Pastikan codec 'mp4v' tersedia.")
-                except Exception as e:
-                    st.error(f"Error creating video for download: {e}")
-            else:
-                st.warning("Video info (FPS, width, height) tidak tersedia untuk mengunduh. Coba deteksi ulang.")
+        output_video_filename = output_filename(OUTPUT_STEM, codec)
+        processed_video_path = st.session_state.get('processed_video_path')
+        video_download_available = (st.session_state.get('download_video_ready', False)
+                                    and processed_video_path is not None
+                                    and os.path.exists(processed_video_path))
 
         with button_col2:
-            if download_video_data is not None: # ONLY render if data is ready
-                st.download_button(
-                    "💾 Download",
-                    data=download_video_data,
-                    file_name=output_video_filename,
-                    mime="video/mp4",
-                    use_container_width=True,
-                    key="video_download_button_col"
-                )
+            if video_download_available: # ONLY render if data is ready
+                # File hasil di-stream oleh server unduhan, tidak dibaca ke memori setiap rerun
+                st.markdown(f'<a class="download-link" href="{file_url(processed_video_path, download=True)}" '
+                            f'download="{output_video_filename}">💾 Download</a>', unsafe_allow_html=True)
             else:
                 # Placeholder to maintain layout
                 st.markdown("<div style='height:46px;'></div>", unsafe_allow_html=True) # Approx button height
@@ -634,10 +774,10 @@ def handle_video_detection(uploaded_video, confidence_threshold):
                 disabled=reset_disabled
             )
             if reset_video_button and not reset_disabled:
-                if st.session_state.temp_video_path and os.path.exists(st.session_state.temp_video_path):
-                    os.remove(st.session_state.temp_video_path)
-                    st.session_state.temp_video_path = None
-                for key in ['video_detection_status', 'current_uploaded_video', 'temp_video_path', 'processed_frames_data', 'video_fps', 'video_width', 'video_height', 'download_video_ready']: # Add download_video_ready to reset
+                remove_temp_video()
+                remove_processed_video()
+                for key in ['video_detection_status', 'current_uploaded_video', 'temp_video_path', 'processed_video_path', 'video_pipeline_stats',
+                            'video_detections', 'video_render_conf', 'video_render_codec', 'video_unique_counts', 'video_tracking', 'video_fps', 'video_width', 'video_height', 'download_video_ready', 'video_records_conf']: # Add download_video_ready to reset
                     if key in st.session_state:
                         del st.session_state[key]
                 st.rerun()
@@ -653,36 +793,65 @@ def handle_video_detection(uploaded_video, confidence_threshold):
                                                             '<h4>🔄 Memproses deteksi video...</h4>'
                                                             '</div>', unsafe_allow_html=True)
 
-                # Save uploaded video to a temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_file:
-                    temp_file.write(uploaded_video.read())
-                    temp_video_path = temp_file.name
-                    st.session_state.temp_video_path = temp_video_path
+                # Salin video yang diunggah ke disk per chunk (tanpa salinan bytes utuh di memori)
+                remove_temp_video()
+                temp_video_path = session_files().track(spool_upload(uploaded_video, suffix=".mp4"))
+                st.session_state.temp_video_path = temp_video_path
 
                 try:
-                    # Initialize for collecting frames for download
-                    st.session_state.processed_frames_data = []
-
-                    # Get video properties for later saving
-                    cap = cv2.VideoCapture(temp_video_path)
-                    st.session_state.video_fps = cap.get(cv2.CAP_PROP_FPS)
-                    st.session_state.video_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    st.session_state.video_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    cap.release()
-
-                    frame_count = 0
-                    for processed_frame_rgb in detect_video_streamlit(temp_video_path, st.session_state.model, conf=confidence_threshold):
-                        dynamic_video_content_placeholder.image(processed_frame_rgb, channels="RGB", use_column_width=True, caption="Hasil Deteksi Video")
-                        # Convert RGB to BGR for OpenCV VideoWriter
-                        st.session_state.processed_frames_data.append(cv2.cvtColor(np.array(processed_frame_rgb), cv2.COLOR_RGB2BGR))
-                        frame_count += 1
+                    # Frame hasil deteksi langsung di-encode ke file ini selama proses
+                    new_processed_video_path(output_video_filename)
+
+                    pipeline = None
+                    st.session_state.video_pipeline_stats = None
+                    # Deteksi lengkap per frame disimpan agar perubahan threshold cukup dirender ulang
+                    video_detections = VideoDetections(source_id=uploaded_video.name)
+                    st.session_state.video_detections = None
+                    st.session_state.video_records_conf = None
+                    # Tracker memberi ID tetap dan menghitung TBS unik per kelas
+                    tracker = new_tracker(tracking)
+                    st.session_state.video_tracking = tracking
+                    st.session_state.video_unique_counts = None
+                    # Model dipinjam dari registry selama video diproses; hot-swap tidak memutus proses ini
+                    with selected_model() as model:
+                        if config.VIDEO_PIPELINE_ENABLED:
+                            # Decode, inferensi dan anotasi+encode berjalan di thread terpisah
+                            pipeline = VideoPipeline(temp_video_path, model, conf=confidence_threshold,
+                                                     output_path=st.session_state.processed_video_path,
+                                                     sampler=sampler, keep_skipped=keep_skipped,
+                                                     video_detections=video_detections, tracker=tracker, codec=codec)
+                            frame_iterator = pipeline.frames()
+                        else:
+                            frame_iterator = detect_video_streamlit(temp_video_path, model, conf=confidence_threshold,
+                                                                    output_path=st.session_state.processed_video_path,
+                                                                    sampler=sampler, keep_skipped=keep_skipped,
+                                                                    video_detections=video_detections, tracker=tracker,
+                                                                    codec=codec)
+
+                        frame_count = 0
+                        # Pratinjau kecil dan dibatasi laju; file hasil tetap di-encode dengan resolusi penuh
+                        preview = FramePreview()
+                        for processed_frame in frame_iterator:
+                            preview_image = preview.update(processed_frame)
+                            if preview_image is not None:
+                                dynamic_video_content_placeholder.image(preview_image, use_column_width=True, caption="Hasil Deteksi Video")
+                            frame_count += 1
+
+                    if pipeline is not None:
+                        st.session_state.video_pipeline_stats = pipeline.summary()
+                    if tracker is not None:
+                        st.session_state.video_unique_counts = tracker.unique_counts(class_names)
 
                     if frame_count > 0:
+                        st.session_state.video_detections = video_detections
+                        st.session_state.video_render_conf = confidence_threshold
+                        st.session_state.video_render_codec = codec
                         st.session_state.video_detection_result = "displayed_live"
                         st.session_state.video_detection_status = "success"
                         st.session_state.download_video_ready = True # Set flag to True after successful processing
                         st.rerun() # Rerun to display download button immediately
                     else:
+                        remove_processed_video()
                         dynamic_video_content_placeholder.empty()
                         st.session_state.video_detection_result = "not_found"
                         st.session_state.video_detection_status = "no_object"
@@ -692,17 +861,43 @@ def handle_video_detection(uploaded_video, confidence_threshold):
                     dynamic_video_content_placeholder.empty()
                     st.error(f"Terjadi kesalahan saat memproses video: {e}")
                     st.exception(e)
+                    remove_processed_video()
+                    remove_temp_video()
                     st.session_state.download_video_ready = False # Ensure false on error
-                finally:
-                    if st.session_state.temp_video_path and os.path.exists(st.session_state.temp_video_path):
-                        os.remove(st.session_state.temp_video_path)
-                        st.session_state.temp_video_path = None
             else:
                 dynamic_video_content_placeholder.empty()
                 dynamic_video_content_placeholder.markdown('<div class="instruction-message">'
                                                             '<h4>Silakan unggah video terlebih dahulu.</h4>'
                                                             '</div>', unsafe_allow_html=True)
 
+        elif (st.session_state.video_detection_status == "success"
+              and st.session_state.get('video_detections') is not None
+              and (st.session_state.get('video_render_conf') != confidence_threshold
+                   or st.session_state.get('video_render_codec') != codec)
+              and st.session_state.get('temp_video_path') and os.path.exists(st.session_state.temp_video_path)):
+            # Threshold/codec berubah: render ulang dari deteksi tersimpan tanpa menjalankan YOLO lagi
+            try:
+                new_processed_video_path(output_video_filename)
+                tracker = new_tracker(st.session_state.get('video_tracking'))
+                preview = FramePreview()
+                for processed_frame in render_video_detections(st.session_state.temp_video_path,
+                                                                   st.session_state.video_detections,
+                                                                   conf=confidence_threshold,
+                                                                   output_path=st.session_state.processed_video_path,
+                                                                   tracker=tracker, codec=codec):
+                    preview_image = preview.update(processed_frame)
+                    if preview_image is not None:
+                        dynamic_video_content_placeholder.image(preview_image, use_column_width=True, caption="Hasil Deteksi Video")
+                if tracker is not None:
+                    st.session_state.video_unique_counts = tracker.unique_counts(class_names)
+                st.session_state.video_render_conf = confidence_threshold
+                st.session_state.video_render_codec = codec
+                st.rerun() # Rerun agar tombol download memakai file hasil render terbaru
+            except Exception as e:
+                remove_processed_video()
+                st.session_state.download_video_ready = False
+                st.error(f"Terjadi kesalahan saat merender ulang video: {e}")
+
         # Display initial/no-object messages based on session state
         if st.session_state.video_detection_status == "success" and st.session_state.video_detection_result == "displayed_live":
             # Video is already in dynamic_video_content_placeholder
@@ -723,7 +918,7 @@ def handle_video_detection(uploaded_video, confidence_threshold):
         st.markdown('</div>', unsafe_allow_html=True) # Close the result-container
 
         # Summary box after the main detection display area, still in col2
-        if st.session_state.video_detection_status == "success" and st.session_state.processed_frames_data:
+        if st.session_state.video_detection_status == "success" and st.session_state.get('processed_video_path'):
             st.markdown("---")
             st.markdown("### ✅ Ringkasan Deteksi Video")
             st.markdown(f"""
@@ -735,11 +930,273 @@ def handle_video_detection(uploaded_video, confidence_threshold):
                 </div>
             """, unsafe_allow_html=True)
 
+            if st.session_state.get('video_detections') is not None:
+                records_path = video_records_path(confidence_threshold)
+                st.markdown(f'<a class="download-link" href="{file_url(records_path, download=True)}" '
+                            f'download="deteksi_video.csv">📄 Data Deteksi (CSV)</a>', unsafe_allow_html=True)
+
+            unique_counts = st.session_state.get('video_unique_counts')
+            if unique_counts:
+                st.markdown("#### 🔢 Jumlah TBS Unik per Kelas")
+                st.table([{"Kelas": name, "Jumlah": count} for name, count in unique_counts.items()])
+
+            pipeline_stats = st.session_state.get('video_pipeline_stats')
+            if pipeline_stats:
+                st.markdown("#### ⏱️ Throughput per Tahap")
+                st.table([
+                    {"Tahap": stage, "Frame": stats["frames"], "Waktu (detik)": f"{stats['busy_time']:.2f}",
+                     "FPS": f"{stats['fps']:.1f}"}
+                    for stage, stats in pipeline_stats.items()
+                ])
+
+
+@st.cache_resource
+def get_job_store():
+    from job_queue import JobStore
+    return JobStore()
+
+@st.cache_resource
+def start_job_worker():
+    from job_queue import JobWorker
+
+    # Satu worker per proses: job tetap diproses walaupun tab/sesi yang mengirimnya sudah ditutup.
+    # Model tiap job dipinjam dari registry model sesuai model yang dipilih saat job dikirim.
+    return JobWorker(None, get_job_store()).start()
+
+@st.fragment(run_every=config.JOB_POLL_INTERVAL)
+def show_video_job_progress(job_id):
+    from job_queue import ACTIVE_STATUSES
+
+    # Hanya membaca progres dari antrian; pemrosesan berjalan di worker latar belakang
+    job = get_job_store().get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.rerun() # Job selesai/gagal: muat ulang halaman untuk menampilkan hasil
+
+    total = max(job['total_frames'], 1)
+    if job['status'] == "queued":
+        st.progress(0.0, text="⏳ Menunggu giliran di antrian...")
+    elif job['phase'] == "detect":
+        st.progress(min(job['frames_done'] / total, 1.0),
+                    text=f"🔍 Mendeteksi frame {job['frames_done']} / {job['total_frames']}")
+    else:
+        st.progress(min(job['rendered'] / total, 1.0),
+                    text=f"🎞️ Merender video hasil {job['rendered']} / {job['total_frames']}")
+    preview_path = get_job_store().preview_path(job_id)
+    if os.path.exists(preview_path):
+        st.image(preview_path, use_column_width=True, caption="Pratinjau")
+    st.caption("Proses berjalan di latar belakang. Tab boleh ditutup; buka kembali URL ini untuk melihat hasilnya.")
+
+def reset_video_job():
+    if 'job' in st.query_params:
+        get_job_store().cancel(st.query_params['job'])
+        del st.query_params['job']
+
+def handle_video_job(uploaded_video, confidence_threshold, sampler=None, keep_skipped=None, tracking=False, codec=None):
+    from job_queue import ACTIVE_STATUSES, OUTPUT_STEM
+    from video_output import CODECS, output_filename
+
+    store = get_job_store()
+    if config.JOB_WORKER_IN_APP:
+        start_job_worker()
+
+    # ID job disimpan di URL (?job=...) agar hasil tetap dapat dibuka setelah tab ditutup atau dimuat ulang
+    job = store.get(st.query_params['job']) if 'job' in st.query_params else None
+    if job is None and 'job' in st.query_params:
+        del st.query_params['job']
+    # Video lain diunggah: job video sebelumnya dibatalkan
+    if job is not None and uploaded_video is not None and job['params']['filename'] != uploaded_video.name:
+        reset_video_job()
+        job = None
+    if job is None and uploaded_video is None:
+        st.rerun()
+    active = job is not None and job['status'] in ACTIVE_STATUSES
+    done = job is not None and job['status'] == "done" and job['output_path'] and os.path.exists(job['output_path'])
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("#### 🎞️ Video Asli")
+        st.markdown('<div class="detection-container">', unsafe_allow_html=True)
+        st.video(uploaded_video if uploaded_video is not None else job['source_path'], format='video/mp4', start_time=0)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        button_col1, button_col2, button_col3 = st.columns(3)
+
+        with button_col1:
+            detect_video_button = st.button("🎬 Deteksi", use_container_width=True, type="primary",
+                                            disabled=active or uploaded_video is None)
+
+        with button_col2:
+            if done:
+                # File hasil di-stream oleh server unduhan
+                st.markdown(f'<a class="download-link" href="{file_url(job["output_path"], download=True)}" '
+                            f'download="{output_filename(OUTPUT_STEM, job["params"]["codec"])}">💾 Download</a>',
+                            unsafe_allow_html=True)
+            else:
+                st.markdown("<div style='height:46px;'></div>", unsafe_allow_html=True) # Approx button height
+
+        with button_col3:
+            reset_label = "⏹️ Batal" if active else "🗑️ Reset"
+            if st.button(reset_label, use_container_width=True, type="secondary", key="video_job_reset_button",
+                         disabled=job is None):
+                reset_video_job()
+                st.rerun()
+
+    if detect_video_button:
+        # Video disalin ke disk per chunk lalu dipindahkan ke folder job; UI hanya memantau progres
+        temp_video_path = spool_upload(uploaded_video, suffix=os.path.splitext(uploaded_video.name)[1] or ".mp4")
+        reset_video_job()
+        st.query_params['job'] = store.submit(temp_video_path, confidence_threshold, sampler, keep_skipped, tracking,
+                                              filename=uploaded_video.name, codec=codec, model=st.session_state.model_name)
+        st.rerun()
+
+    # Threshold/codec berubah setelah selesai: worker merender ulang dari deteksi tersimpan tanpa YOLO
+    # (kombinasi yang pernah di-render langsung dipakai ulang)
+    codec = codec or config.VIDEO_OUTPUT_CODEC
+    if done and (job['params']['conf'] != confidence_threshold or job['params']['codec'] != codec):
+        store.rerender(job['id'], confidence_threshold, codec)
+        st.rerun()
+
+    with col2:
+        st.markdown("#### ✅ Hasil Deteksi")
+        st.markdown('<div class="result-container">', unsafe_allow_html=True)
+        if active:
+            show_video_job_progress(job['id'])
+        elif done and CODECS[job['params']['codec']]['browser']:
+            st.markdown(f'<video controls style="width:100%; border-radius:8px;" src="{file_url(job["output_path"])}"></video>',
+                        unsafe_allow_html=True)
+        elif done:
+            # Codec ini tidak dapat diputar browser: tampilkan pratinjau, video penuh lewat tombol Download
+            preview_path = store.preview_path(job['id'])
+            if os.path.exists(preview_path):
+                st.image(preview_path, use_column_width=True, caption="Pratinjau")
+            st.info("Codec output ini tidak dapat diputar di browser. Unduh video untuk melihat hasil lengkap.")
+        elif job is not None and job['status'] == "failed":
+            st.error(f"Terjadi kesalahan saat memproses video: {job['error']}")
+        else:
+            st.markdown('<div class="instruction-message">'
+                        '<p>Klik tombol deteksi untuk memproses video di latar belakang.</p>'
+                        '</div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        if done:
+            result = job['result']
+            st.markdown("---")
+            st.markdown("### ✅ Ringkasan Deteksi Video")
+            st.markdown(f"""
+                <div class="simple-detection-box">
+                    <h4>Deteksi Video Berhasil!</h4>
+                    <p>{result['frames']} frame diproses, {result['inferred_frames']} di antaranya diinferensi model.</p>
+                    <p>Model yang digunakan: <strong>{job['params']['model']}</strong></p>
+                    <p>Confidence Threshold yang digunakan: <strong>{job['params']['conf']:.2f}</strong></p>
+                    <p style="font-style: italic;">Hasil visual ditampilkan di atas. Anda dapat mengunduhnya.</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+            if result.get('unique_counts'):
+                st.markdown("#### 🔢 Jumlah TBS Unik per Kelas")
+                st.table([{"Kelas": name, "Jumlah": count} for name, count in result['unique_counts'].items()])
+
+
+def handle_live_detection(confidence_threshold):
+    from live_stream import LiveDetector
+    from video_output import FramePreview
+
+    # Webcam (indeks kamera) atau URL RTSP/HTTP; file video lokal diputar berulang
+    source = st.text_input("Sumber", value=config.LIVE_SOURCE, key="live_source",
+                           help="Indeks kamera (0, 1, ...), URL RTSP/HTTP, atau path file video")
+
+    button_col1, button_col2 = st.columns(2)
+    with button_col1:
+        if st.button("▶️ Mulai", use_container_width=True, type="primary", key="live_start_button"):
+            st.session_state.live_running = True
+    with button_col2:
+        if st.button("⏹️ Stop", use_container_width=True, type="secondary", key="live_stop_button"):
+            st.session_state.live_running = False
+
+    st.markdown('<div class="result-container">', unsafe_allow_html=True)
+    frame_placeholder = st.empty()
+    metrics_placeholder = st.empty()
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    if not st.session_state.get('live_running'):
+        frame_placeholder.markdown('<div class="instruction-message">'
+                                   '<h4>Tekan Mulai untuk menjalankan deteksi langsung.</h4>'
+                                   '</div>', unsafe_allow_html=True)
+        return
+
+    # Selalu memproses frame terbaru; frame lama dibuang agar latensi tetap rendah.
+    # Tombol Stop / perubahan input memicu rerun yang menghentikan loop ini.
+    try:
+        with selected_model() as model, LiveDetector(source, model, conf=confidence_threshold) as live:
+            # Browser hanya menerima pratinjau kecil dengan laju terbatas; deteksi tetap memproses frame penuh
+            preview = FramePreview()
+            for annotated_bgr, stats in live.frames():
+                preview_image = preview.update(annotated_bgr)
+                if preview_image is None:
+                    continue
+                frame_placeholder.image(preview_image, use_column_width=True, caption="Deteksi Langsung")
+                with metrics_placeholder.container():
+                    metric_col1, metric_col2, metric_col3 = st.columns(3)
+                    metric_col1.metric("FPS", f"{stats['fps']:.1f}")
+                    metric_col2.metric("Latensi", f"{stats['latency_ms']:.0f} ms")
+                    metric_col3.metric("Frame dibuang", stats['dropped'])
+        st.session_state.live_running = False
+        st.info("Stream berakhir.")
+    except (RuntimeError, TimeoutError) as e:
+        st.session_state.live_running = False
+        st.error(f"❌ Stream live gagal: {e}")
+
+# Pengaturan sampling frame untuk video panjang
+def show_sampling_options():
+    from utils1 import FrameSampler
+
+    sampling_modes = {
+        "Semua frame": "all",
+        "Setiap frame ke-k": "stride",
+        "N inferensi per detik": "fps",
+    }
+    default_label = next(label for label, mode in sampling_modes.items() if mode == config.VIDEO_SAMPLING_MODE)
+
+    with st.expander("⚙️ Sampling Frame & Tracking"):
+        mode_label = st.radio("Mode sampling", list(sampling_modes), index=list(sampling_modes).index(default_label),
+                              horizontal=True, key="video_sampling_mode")
+        mode = sampling_modes[mode_label]
+        stride = config.VIDEO_FRAME_STRIDE
+        target_fps = config.VIDEO_INFERENCE_FPS
+        if mode == "stride":
+            stride = st.number_input("Deteksi setiap k frame", min_value=1, max_value=300, value=config.VIDEO_FRAME_STRIDE, step=1)
+        elif mode == "fps":
+            target_fps = st.number_input("Jumlah inferensi per detik video", min_value=0.1, max_value=60.0,
+                                         value=float(config.VIDEO_INFERENCE_FPS), step=0.5)
+        keep_skipped = st.checkbox("Tulis frame yang dilewati dengan deteksi terakhir", value=config.VIDEO_ANNOTATE_SKIPPED,
+                                   disabled=(mode == "all"), key="video_keep_skipped")
+        tracking = st.checkbox("Lacak TBS dan hitung jumlah unik (frame yang dilewati memakai posisi prediksi tracker)",
+                               value=config.TRACKING_ENABLED, key="video_tracking_enabled")
+
+    return FrameSampler(mode, stride, target_fps), keep_skipped, tracking
+
+# Pilihan codec file hasil video
+def show_output_options():
+    from video_output import CODECS
+
+    codec_labels = {
+        "h264": "H.264 (MP4, kecil, dapat diputar di browser)",
+        "vp9": "VP9 (WebM, paling kecil, encode lebih lambat)",
+        "mp4v": "MPEG-4 Part 2 (MP4, tanpa ffmpeg)",
+        "mjpg": "Motion JPEG (AVI, file besar)",
+    }
+    codecs = list(CODECS)
+    with st.expander("🎞️ Format Video Hasil"):
+        return st.selectbox("Codec", codecs, index=codecs.index(config.VIDEO_OUTPUT_CODEC),
+                            format_func=lambda codec: codec_labels.get(codec, codec), key="video_output_codec")
 
 # Detection page
 def show_detection_page():
     st.markdown("---")
     st.header("Deteksi Kematangan TBS")
+    model_name = show_model_selector()
+    initialize_model(model_name)
 
     # Kontrol input di bagian atas, lebih terstruktur
     with st.container():
@@ -753,7 +1210,7 @@ def show_detection_page():
                     <label class="stRadioLabel">Pilih Tipe File:</label>
                 </div>
             """, unsafe_allow_html=True)
-            file_type = st.radio("", ["Gambar", "Video"], key="file_type_radio", horizontal=True)
+            file_type = st.radio("", ["Gambar", "Video", "Live"], key="file_type_radio", horizontal=True)
 
         with col_conf:
             st.markdown("<p style='margin-bottom: 0.5rem;'><strong>Confidence Threshold:</strong></p>", unsafe_allow_html=True)
@@ -766,8 +1223,11 @@ def show_detection_page():
     if file_type == "Gambar":
         st.markdown("<h4 class='section-heading'>🖼️ Unggah Gambar Anda</h4>", unsafe_allow_html=True)
         uploaded_file = st.file_uploader("Pilih gambar untuk dianalisis (JPG/PNG):", type=["jpg", "jpeg", "png"], label_visibility="collapsed")
+        # Gambar drone beresolusi tinggi dipotong menjadi tile agar tandan kecil tidak hilang
+        sliced = st.checkbox("🛰️ Inferensi bertile (gambar drone/kanopi resolusi tinggi)", value=config.SLICE_ENABLED,
+                             key="image_sliced_enabled")
         if uploaded_file:
-            handle_image_detection(uploaded_file, confidence_threshold)
+            handle_image_detection(uploaded_file, confidence_threshold, sliced)
         else:
             col1, col2 = st.columns(2)
             with col1:
@@ -780,11 +1240,20 @@ def show_detection_page():
                                         '<p></p>' # MODIFICATION: Removed "Hasil deteksi akan muncul di sini."
                                         '</div>', unsafe_allow_html=True)
 
+    elif file_type == "Live":
+        st.markdown("<h4 class='section-heading'>📡 Kamera / Stream Langsung</h4>", unsafe_allow_html=True)
+        handle_live_detection(confidence_threshold)
+
     else: # Video
         st.markdown("<h4 class='section-heading'>🎞️ Unggah Video Anda</h4>", unsafe_allow_html=True)
         uploaded_video = st.file_uploader("Pilih video untuk dianalisis (MP4/MOV):", type=["mp4", "mov"], label_visibility="collapsed")
-        if uploaded_video:
-            handle_video_detection(uploaded_video, confidence_threshold)
+        sampler, keep_skipped, tracking = show_sampling_options()
+        codec = show_output_options()
+        if config.VIDEO_JOBS_ENABLED and (uploaded_video or 'job' in st.query_params):
+            # Video diproses di antrian job latar belakang (job_queue.py)
+            handle_video_job(uploaded_video, confidence_threshold, sampler, keep_skipped, tracking, codec)
+        elif uploaded_video:
+            handle_video_detection(uploaded_video, confidence_threshold, sampler, keep_skipped, tracking, codec)
         else:
             col1, col2 = st.columns(2)
             with col1:
@@ -838,7 +1307,8 @@ def show_about_page():
 
 # Main application logic
 def main():
-    initialize_model()
+    sweep_spool_once()
+    start_download_server()
     menu_selection = create_sidebar()
 
     show_main_banner()
@@ -850,5 +1320,9 @@ def main():
     elif menu_selection == "ℹ️ About":
         show_about_page()
 
+    if config.MODEL_PRELOAD:
+        preload_model()
+    start_metrics_server()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
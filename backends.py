@@ -0,0 +1,448 @@
+"""
+Backend inferensi CPU alternatif untuk model YOLOv8: ONNX Runtime dan OpenVINO.
+
+best.pt diekspor satu kali (hasilnya disimpan di samping file bobot) lalu dijalankan
+tanpa PyTorch. Backend "pytorch" memuat salinan best.pt yang sudah di-fuse (best_fused.pt),
+juga dibuat sekali, sehingga start tidak perlu membongkar checkpoint training dan
+menggabungkan Conv+BN lagi. Model dipanaskan dengan satu inferensi saat dimuat. Hasil prediksi meniru struktur ultralytics Results (results.boxes.data
+berisi baris [x1, y1, x2, y2, score, class]) sehingga dapat langsung dipakai oleh
+draw_boxes_on_frame.
+
+Pemeriksaan kesamaan hasil dengan PyTorch:
+    python backends.py --backend onnx --parity gambar1.jpg gambar2.jpg
+
+Membuat best_fused.pt lebih dulu (misalnya saat build image Docker):
+    python backends.py --backend pytorch
+"""
+import argparse
+import ast
+import logging
+import os
+import sys
+
+import cv2
+import numpy as np
+
+import config
+
+logger = logging.getLogger("backends")
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8", "openvino")
+# "pytorch" = checkpoint yang sudah di-fuse untuk start cepat
+EXPORT_BACKENDS = ("pytorch", "onnx", "openvino")
+
+
+class Boxes:
+    """
+    Pengganti ringan ultralytics Boxes: data berupa array (N, 6) float32.
+    """
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class DetectionResults:
+    """
+    Pengganti ringan ultralytics Results untuk satu gambar.
+    """
+    def __init__(self, data, orig_shape, names=None):
+        self.boxes = Boxes(data)
+        self.orig_shape = orig_shape
+        self.names = names
+
+
+def exported_model_path(weights, backend):
+    """
+    Lokasi cache hasil ekspor untuk file bobot dan backend tertentu.
+    """
+    stem = os.path.splitext(weights)[0]
+    if backend == "pytorch":
+        return stem + "_fused.pt"
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    raise ValueError(f"Backend ekspor tidak dikenal: {backend}. Pilih salah satu dari {EXPORT_BACKENDS}.")
+
+
+def quantized_model_path(weights):
+    """
+    Lokasi model ONNX INT8 hasil quantize.py untuk file bobot tertentu.
+    """
+    return os.path.splitext(weights)[0] + "_int8.onnx"
+
+
+def allow_yolo_checkpoints():
+    """
+    PyTorch 2.6+ memuat checkpoint dengan weights_only=True; modul ultralytics perlu
+    didaftarkan agar best.pt tetap dapat dimuat.
+    """
+    from torch.serialization import add_safe_globals
+    from ultralytics.nn.modules.conv import Conv
+    add_safe_globals([Conv])
+
+
+def export_fused_model(weights, path):
+    """
+    Menyimpan model dari checkpoint training dalam bentuk siap inferensi: Conv+BN sudah
+    digabung, float32, mode eval, tanpa EMA/optimizer. Argumen model (imgsz, task) ikut
+    disimpan sehingga hasil prediksi sama dengan best.pt, termasuk letterbox persegi
+    panjang. Ditulis ke file sementara lalu di-rename agar proses lain tidak membaca
+    file setengah jadi.
+    """
+    import torch
+    from ultralytics import YOLO
+
+    yolo = YOLO(weights)
+    model = yolo.model.fuse().float().eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save({"model": model, "train_args": dict(yolo.model.args), "fused_from": os.path.basename(weights)},
+               temp_path)
+    os.replace(temp_path, path)
+    return path
+
+
+def export_model(weights=None, backend="onnx", imgsz=None, force=False):
+    """
+    Mengekspor bobot PyTorch ke ONNX, OpenVINO IR, atau checkpoint PyTorch yang sudah
+    di-fuse ("pytorch"). Hasil ekspor disimpan di samping file bobot dan dipakai ulang
+    selama lebih baru dari file bobotnya.
+    """
+    weights = weights or config.MODEL_WEIGHTS
+    imgsz = imgsz or config.MODEL_IMGSZ
+    path = exported_model_path(weights, backend)
+    if not force and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights):
+        return path
+
+    allow_yolo_checkpoints()
+    if backend == "pytorch":
+        return export_fused_model(weights, path)
+    from ultralytics import YOLO
+    exported = YOLO(weights).export(format=backend, imgsz=imgsz, dynamic=True, half=False, verbose=False)
+    return str(exported)
+
+
+def load_pytorch_model(weights, fused=None):
+    """
+    Memuat model YOLO PyTorch. Jika fused (default config.MODEL_FUSED_CACHE), yang dimuat
+    adalah checkpoint hasil fuse (dibuat sekali jika belum ada); jika pembuatannya gagal,
+    misalnya folder bobot tidak dapat ditulis, bobot asli dimuat seperti biasa.
+    """
+    allow_yolo_checkpoints()
+    from ultralytics import YOLO
+
+    fused = config.MODEL_FUSED_CACHE if fused is None else fused
+    if fused and weights.endswith(".pt"):
+        try:
+            return YOLO(export_model(weights, "pytorch"), task="detect")
+        except Exception:
+            logger.warning("Checkpoint fuse untuk '%s' tidak tersedia, memuat bobot asli", weights, exc_info=True)
+    return YOLO(weights)
+
+
+def warmup_model(model, imgsz=None):
+    """
+    Inferensi pertama lebih lambat (fuse, alokasi memori, inisialisasi kernel); jalankan
+    sekali dengan gambar kosong agar request pertama tidak menanggungnya.
+    """
+    imgsz = imgsz or config.MODEL_IMGSZ
+    model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), conf=config.MIN_CONFIDENCE, verbose=False)
+    return model
+
+
+def letterbox(image, imgsz):
+    """
+    Mengubah ukuran gambar BGR dengan rasio tetap lalu menambahkan padding menjadi
+    imgsz x imgsz, sama seperti preprocessing YOLOv8. Mengembalikan tensor CHW RGB
+    float32 (0-1) beserta skala dan padding untuk memetakan box kembali.
+    """
+    height, width = image.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (imgsz - new_width) / 2, (imgsz - new_height) / 2
+
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+    blob = cv2.dnn.blobFromImage(image, scalefactor=1 / 255.0, swapRB=True)[0]
+    return blob, (ratio, left, top)
+
+
+def postprocess(prediction, conf, iou, meta, orig_shape, max_det=300):
+    """
+    Mengubah keluaran mentah YOLOv8 (4 + jumlah_kelas, N) menjadi array (M, 6)
+    [x1, y1, x2, y2, score, class] pada koordinat gambar asli, termasuk NMS per kelas.
+    """
+    prediction = prediction.T
+    class_scores = prediction[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(classes)), classes]
+
+    keep = scores >= conf
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+    boxes_xywh, scores, classes = prediction[keep, :4], scores[keep], classes[keep]
+
+    boxes = np.empty_like(boxes_xywh)
+    boxes[:, :2] = boxes_xywh[:, :2] - boxes_xywh[:, 2:] / 2
+    boxes[:, 2:] = boxes_xywh[:, :2] + boxes_xywh[:, 2:] / 2
+
+    # NMS per kelas: geser box tiap kelas agar tidak saling bertumpuk
+    offset = classes[:, None].astype(np.float32) * 7680
+    nms_boxes = np.concatenate([boxes[:, :2] + offset, boxes[:, 2:] - boxes[:, :2]], axis=1)
+    indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), scores.tolist(), conf, iou)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+    ratio, pad_x, pad_y = meta
+    boxes = boxes[indices]
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / ratio).clip(0, orig_shape[1])
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / ratio).clip(0, orig_shape[0])
+
+    return np.concatenate([boxes, scores[indices, None], classes[indices, None]], axis=1).astype(np.float32)
+
+
+class ExportedDetector:
+    """
+    Dasar detektor untuk model hasil ekspor. Meniru YOLO.predict: menerima satu
+    gambar BGR (ndarray atau path) atau list gambar, dan mengembalikan list
+    DetectionResults dengan urutan yang sama.
+    """
+    backend = None
+
+    def __init__(self, model_path, imgsz=None, iou=0.7, max_det=300):
+        self.model_path = model_path
+        self.imgsz = imgsz or config.MODEL_IMGSZ
+        self.iou = iou
+        self.max_det = max_det
+        self.names = {}
+        self.supports_batch = True
+
+    def _forward(self, blob):
+        raise NotImplementedError
+
+    def predict(self, source, conf=0.25, iou=None, verbose=False, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        images = [cv2.imread(image) if isinstance(image, str) else image for image in images]
+        prepared = [letterbox(image, self.imgsz) for image in images]
+
+        blobs = np.stack([blob for blob, _ in prepared])
+        if self.supports_batch:
+            outputs = self._forward(blobs)
+        else:
+            outputs = np.concatenate([self._forward(blob[None]) for blob in blobs])
+
+        iou = self.iou if iou is None else iou
+        return [
+            DetectionResults(postprocess(output, conf, iou, meta, image.shape[:2], self.max_det),
+                             image.shape[:2], self.names)
+            for output, (_, meta), image in zip(outputs, prepared, images)
+        ]
+
+    __call__ = predict
+
+
+class OnnxRuntimeDetector(ExportedDetector):
+    """
+    Menjalankan model ONNX dengan ONNX Runtime (CPUExecutionProvider).
+    """
+    backend = "onnx"
+
+    def __init__(self, model_path, imgsz=None, iou=0.7, max_det=300, num_threads=None):
+        super().__init__(model_path, imgsz, iou, max_det)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        num_threads = config.BACKEND_NUM_THREADS if num_threads is None else num_threads
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.supports_batch = not isinstance(model_input.shape[0], int)
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = ast.literal_eval(metadata["names"])
+
+    def _forward(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoDetector(ExportedDetector):
+    """
+    Menjalankan model OpenVINO IR di perangkat CPU.
+    """
+    backend = "openvino"
+
+    def __init__(self, model_path, imgsz=None, iou=0.7, max_det=300, num_threads=None):
+        super().__init__(model_path, imgsz, iou, max_det)
+        import openvino as ov
+
+        if os.path.isdir(model_path):
+            model_path = next(os.path.join(model_path, name) for name in sorted(os.listdir(model_path))
+                              if name.endswith(".xml"))
+        core = ov.Core()
+        num_threads = config.BACKEND_NUM_THREADS if num_threads is None else num_threads
+        properties = {"INFERENCE_NUM_THREADS": num_threads} if num_threads else {}
+        self.compiled_model = core.compile_model(core.read_model(model_path), "CPU", properties)
+        self.output = self.compiled_model.output(0)
+        self.supports_batch = self.compiled_model.input(0).get_partial_shape()[0].is_dynamic
+
+        metadata_path = os.path.join(os.path.dirname(model_path), "metadata.yaml")
+        if os.path.exists(metadata_path):
+            import yaml
+            with open(metadata_path) as f:
+                self.names = yaml.safe_load(f).get("names", {})
+
+    def _forward(self, blob):
+        return self.compiled_model(blob)[self.output]
+
+
+def check_class_names(model, name):
+    """
+    Memastikan kelas model sama dengan config.CLASS_NAMES (indeks kelas dipakai langsung
+    untuk nama dan warna box). ValueError jika berbeda.
+    """
+    names = getattr(model, "names", None)
+    if not names:
+        logger.warning("Model %s tidak menyimpan nama kelas; kelas tidak dapat diperiksa", name)
+        return
+    if isinstance(names, dict):
+        names = [names[i] for i in sorted(names)]
+    if list(names) != list(config.CLASS_NAMES):
+        shown = ", ".join(map(str, names[:8])) + (", ..." if len(names) > 8 else "")
+        raise ValueError(f"Model '{name}' memiliki {len(names)} kelas ({shown}), bukan kelas kematangan TBS "
+                         f"{config.CLASS_NAMES}.")
+
+
+def load_backend(backend=None, weights=None, imgsz=None, num_threads=None, warmup=None):
+    """
+    Memuat model sesuai backend ("pytorch", "onnx", "onnx-int8" atau "openvino").
+    Untuk ONNX/OpenVINO, bobot diekspor terlebih dahulu jika belum ada di cache;
+    model INT8 harus dibuat lebih dulu dengan quantize.py. Jika warmup (default
+    config.MODEL_WARMUP), model dipanaskan sebelum dikembalikan. Model yang kelasnya
+    bukan config.CLASS_NAMES ditolak dengan ValueError (lihat check_class_names).
+    """
+    backend = backend or config.MODEL_BACKEND
+    weights = weights or config.MODEL_WEIGHTS
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {backend}. Pilih salah satu dari {BACKENDS}.")
+
+    model = _load_backend(backend, weights, imgsz, num_threads)
+    check_class_names(model, weights)
+    if config.MODEL_WARMUP if warmup is None else warmup:
+        warmup_model(model)
+    return model
+
+
+def _load_backend(backend, weights, imgsz, num_threads):
+    if backend == "pytorch":
+        return load_pytorch_model(weights)
+
+    if backend == "onnx-int8":
+        model_path = quantized_model_path(weights)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model INT8 '{model_path}' belum ada. Jalankan 'python quantize.py --calib <folder>' terlebih dahulu.")
+    elif weights.endswith(".pt"):
+        model_path = export_model(weights, backend, imgsz)
+    else:
+        model_path = weights
+    detector_class = OpenVinoDetector if backend == "openvino" else OnnxRuntimeDetector
+    return detector_class(model_path, imgsz=imgsz, num_threads=num_threads)
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    Matriks IoU antara dua kumpulan box xyxy.
+    """
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+def compare_detections(reference, candidate, iou_threshold=0.9):
+    """
+    Mencocokkan deteksi kandidat dengan referensi (kelas sama, IoU >= iou_threshold).
+    Mengembalikan jumlah yang cocok, jumlah referensi/kandidat, dan selisih skor terbesar.
+    """
+    matched = 0
+    max_score_diff = 0.0
+    used = set()
+    if len(reference) and len(candidate):
+        ious = box_iou(reference[:, :4], candidate[:, :4])
+        for i in np.argsort(-reference[:, 4]):
+            same_class = candidate[:, 5] == reference[i, 5]
+            for j in np.argsort(-ious[i]):
+                if j in used or not same_class[j] or ious[i, j] < iou_threshold:
+                    continue
+                used.add(j)
+                matched += 1
+                max_score_diff = max(max_score_diff, abs(float(reference[i, 4] - candidate[j, 4])))
+                break
+    return {"reference": len(reference), "candidate": len(candidate), "matched": matched,
+            "max_score_diff": max_score_diff}
+
+
+def check_parity(images, backend="onnx", weights=None, conf=0.25, iou_threshold=0.9, score_tolerance=0.05):
+    """
+    Membandingkan hasil backend dengan PyTorch pada daftar gambar. Hasil dianggap
+    sama jika semua deteksi saling cocok dan selisih skor <= score_tolerance.
+    Kedua model dipanggil persis seperti di produksi (tanpa memaksa imgsz): PyTorch
+    memakai ukuran input checkpoint-nya sendiri, sehingga perbedaan ukuran input hasil
+    ekspor ikut terlihat sebagai perbedaan hasil.
+    """
+    # Referensi selalu checkpoint asli, bukan salinan hasil fuse
+    reference_model = load_pytorch_model(weights or config.MODEL_WEIGHTS, fused=False)
+    candidate_model = load_backend(backend, weights)
+
+    report = []
+    for image_path in images:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise FileNotFoundError(f"Gambar '{image_path}' tidak dapat dibaca.")
+        reference = reference_model.predict(image, conf=conf, verbose=False)[0]
+        candidate = candidate_model.predict(image, conf=conf, verbose=False)[0]
+        result = compare_detections(reference.boxes.data.cpu().numpy(), np.asarray(candidate.boxes.data), iou_threshold)
+        result["image"] = image_path
+        result["ok"] = (result["matched"] == result["reference"] == result["candidate"]
+                        and result["max_score_diff"] <= score_tolerance)
+        report.append(result)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor model dan pemeriksaan kesamaan hasil backend inferensi.")
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS, help="File bobot PyTorch (.pt)")
+    parser.add_argument("--backend", default="onnx", choices=EXPORT_BACKENDS)
+    parser.add_argument("--imgsz", type=int, default=config.MODEL_IMGSZ)
+    parser.add_argument("--force", action="store_true", help="Ekspor ulang walaupun cache sudah ada")
+    parser.add_argument("--parity", nargs="*", metavar="GAMBAR", help="Gambar untuk dibandingkan dengan PyTorch")
+    parser.add_argument("--conf", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    path = export_model(args.weights, args.backend, args.imgsz, force=args.force)
+    print(f"✅ Model {args.backend} tersedia di: {path}")
+
+    if args.parity:
+        report = check_parity(args.parity, args.backend, args.weights, conf=args.conf)
+        for result in report:
+            status = "OK" if result["ok"] else "BERBEDA"
+            print(f"[{status}] {result['image']}: {result['matched']}/{result['reference']} cocok, "
+                  f"{result['candidate']} deteksi backend, selisih skor maks {result['max_score_diff']:.4f}")
+        if not all(result["ok"] for result in report):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
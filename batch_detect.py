@@ -0,0 +1,325 @@
+"""
+Deteksi kematangan TBS secara batch (tanpa UI) untuk folder gambar dan video.
+
+Setiap file menghasilkan output beranotasi dan file deteksi (JSON dan/atau CSV) di
+folder output, dengan struktur subfolder yang sama seperti sumbernya. File yang sudah
+selesai dicatat di manifest.jsonl; menjalankan ulang perintah yang sama akan
+melanjutkan proses yang terputus tanpa memproses ulang file yang sudah selesai.
+
+Contoh:
+    python batch_detect.py data/panen "data/drone/*.jpg" --output hasil --workers 4 --format both
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+import config
+from worker_pool import init_worker, worker_model
+from video_output import output_filename
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+MANIFEST_NAME = "manifest.jsonl"
+CSV_COLUMNS = ["frame", "class_id", "class_name", "score", "x1", "y1", "x2", "y2", "track_id"]
+
+
+def media_type(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def _glob_root(pattern):
+    """
+    Bagian awal pola glob yang tidak mengandung karakter wildcard.
+    """
+    parts = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+
+def collect_sources(inputs):
+    """
+    Mengumpulkan file gambar/video dari daftar folder, pola glob, atau file.
+    Mengembalikan list (path absolut, path relatif untuk output) tanpa duplikat.
+    """
+    sources = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            root = item
+            paths = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+        elif glob.has_magic(item):
+            root = _glob_root(item)
+            paths = glob.glob(item, recursive=True)
+        else:
+            root = os.path.dirname(item) or "."
+            paths = [item]
+
+        for path in sorted(paths):
+            if os.path.isfile(path) and media_type(path):
+                sources.setdefault(os.path.abspath(path), os.path.relpath(path, root))
+    return sorted(sources.items(), key=lambda item: item[1])
+
+
+class DetectionFileWriter:
+    """
+    Menulis deteksi per frame secara bertahap ke JSON dan/atau CSV, sehingga video
+    panjang tidak perlu menampung semua deteksi di memori. File ditulis dengan akhiran
+    .part dan baru diganti namanya saat close() dipanggil.
+    """
+    def __init__(self, base_path, formats, source, media, fps=None):
+        self.paths = {}
+        self._json = None
+        self._csv = None
+        self._csv_writer = None
+        self._first_frame = True
+
+        if "json" in formats:
+            self.paths["json"] = base_path + ".json"
+            self._json = open(self.paths["json"] + ".part", "w", encoding="utf-8")
+            header = json.dumps({"source": source, "type": media, "fps": fps})
+            self._json.write(header[:-1] + ', "frames": [')
+        if "csv" in formats:
+            self.paths["csv"] = base_path + ".csv"
+            self._csv = open(self.paths["csv"] + ".part", "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.DictWriter(self._csv, fieldnames=CSV_COLUMNS)
+            self._csv_writer.writeheader()
+
+    def write_frame(self, frame_index, records):
+        if self._json is not None:
+            if not self._first_frame:
+                self._json.write(", ")
+            json.dump({"frame": frame_index, "detections": records}, self._json)
+            self._first_frame = False
+        if self._csv_writer is not None:
+            for record in records:
+                self._csv_writer.writerow({"frame": frame_index, **record})
+
+    def close(self, commit=True):
+        if self._json is not None:
+            self._json.write("]}")
+            self._json.close()
+        if self._csv is not None:
+            self._csv.close()
+        for path in self.paths.values():
+            if commit:
+                os.replace(path + ".part", path)
+            elif os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+
+
+def _part_path(path):
+    # Ekstensi tetap di akhir agar OpenCV memilih format/kontainer yang benar
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.part{extension}"
+
+
+def process_file(source, output_base, conf, formats, sampling=None, track=False, sliced=False):
+    """
+    Memproses satu gambar atau video dengan model worker dan menulis outputnya.
+    Mengembalikan ringkasan: jumlah frame, jumlah deteksi per kelas, dan durasi.
+    Jika track=True, deteksi video diberi ID track dan ringkasan berisi jumlah TBS unik per kelas.
+    Jika sliced=True, gambar resolusi tinggi dideteksi per tile (sliced.py).
+    """
+    from sliced import should_slice, sliced_predict
+    from tracker import ObjectTracker
+    from utils1 import FrameSampler, class_colors, class_names, detect_image, detections_to_array, \
+        detections_to_records, draw_boxes_on_frame, filter_detections, inference_conf, process_video_capture
+
+    model = worker_model()
+    started = time.perf_counter()
+    media = media_type(source)
+    os.makedirs(os.path.dirname(output_base), exist_ok=True)
+    counts = {name: 0 for name in class_names}
+    frames = 0
+    tracker = None
+
+    if media == "image":
+        image = cv2.imread(source)
+        if image is None:
+            raise ValueError(f"Gambar '{source}' tidak dapat dibaca.")
+        output_path = output_base + os.path.splitext(source)[1].lower()
+        if sliced and should_slice(image):
+            detections = filter_detections(sliced_predict(model, image, inference_conf(conf)), conf)
+            annotated = draw_boxes_on_frame(image, detections, class_names, class_colors)
+        else:
+            annotated, results = detect_image(image, model, conf=conf)
+            detections = detections_to_array(results)
+
+        writer = DetectionFileWriter(output_base, formats, source, media)
+        try:
+            writer.write_frame(0, detections_to_records(detections))
+            if not cv2.imwrite(_part_path(output_path), annotated):
+                raise IOError(f"Gagal menulis '{output_path}'.")
+        except BaseException:
+            writer.close(commit=False)
+            raise
+        writer.close()
+        os.replace(_part_path(output_path), output_path)
+        for cls in detections[:, 5].astype(int):
+            counts[class_names[cls]] += 1
+        frames = 1
+    else:
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"Video '{source}' tidak dapat dibuka.")
+        output_path = output_filename(output_base)
+        sampler = FrameSampler(**sampling) if sampling else None
+        tracker = ObjectTracker(len(class_names)) if track else None
+
+        writer = DetectionFileWriter(output_base, formats, source, media, fps=cap.get(cv2.CAP_PROP_FPS))
+        try:
+            for index, _, detections in process_video_capture(cap, model, conf, _part_path(output_path),
+                                                              sampler=sampler, tracker=tracker):
+                detections = filter_detections(detections, conf)
+                writer.write_frame(index, detections_to_records(detections))
+                for cls in detections[:, 5].astype(int):
+                    counts[class_names[cls]] += 1
+                frames += 1
+        except BaseException:
+            writer.close(commit=False)
+            if os.path.exists(_part_path(output_path)):
+                os.remove(_part_path(output_path))
+            raise
+        writer.close()
+        os.replace(_part_path(output_path), output_path)
+
+    summary = {
+        "source": source,
+        "type": media,
+        "output": output_path,
+        "detections_files": list(writer.paths.values()),
+        "frames": frames,
+        "counts": counts,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if tracker is not None:
+        summary["unique_counts"] = tracker.unique_counts(class_names)
+    return summary
+
+
+def _run_job(source, output_base, conf, formats, sampling, track=False, sliced=False):
+    # Pembungkus agar pengecualian di worker tetap membawa nama file sumber
+    try:
+        return process_file(source, output_base, conf, formats, sampling, track, sliced)
+    except Exception as e:
+        return {"source": source, "error": f"{type(e).__name__}: {e}"}
+
+
+def load_manifest(path):
+    """
+    Membaca manifest file yang sudah selesai: {path sumber: entri}.
+    """
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # Baris terakhir bisa terpotong jika proses terhenti
+                done[entry["source"]] = entry
+    return done
+
+
+def is_finished(entry, source):
+    stat = os.stat(source)
+    return (entry is not None and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime
+            and os.path.exists(entry.get("output", "")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deteksi kematangan TBS secara batch untuk gambar dan video.")
+    parser.add_argument("inputs", nargs="+", help="Folder, pola glob, atau file gambar/video")
+    parser.add_argument("--output", "-o", default="hasil_deteksi", help="Folder output")
+    parser.add_argument("--conf", type=float, default=0.3, help="Confidence threshold")
+    parser.add_argument("--format", choices=["json", "csv", "both"], default="json", help="Format file deteksi")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses worker")
+    parser.add_argument("--threads-per-worker", type=int, default=config.WORKER_THREADS,
+                        help="Batas thread torch per worker (0 = default torch)")
+    parser.add_argument("--backend", default=config.MODEL_BACKEND, help="Backend inferensi (lihat config.MODEL_BACKEND)")
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    parser.add_argument("--stride", type=int, help="Video: deteksi setiap frame ke-k")
+    parser.add_argument("--infer-fps", type=float, help="Video: jumlah inferensi per detik video")
+    parser.add_argument("--track", action="store_true",
+                        help="Video: lacak objek dan hitung jumlah TBS unik per kelas")
+    parser.add_argument("--sliced", action="store_true",
+                        help="Gambar: inferensi bertile untuk gambar resolusi tinggi (lihat config.SLICE_*)")
+    parser.add_argument("--no-resume", action="store_true", help="Proses ulang semua file walaupun sudah selesai")
+    args = parser.parse_args(argv)
+
+    formats = ("json", "csv") if args.format == "both" else (args.format,)
+    sampling = None
+    if args.stride:
+        sampling = {"mode": "stride", "stride": args.stride}
+    elif args.infer_fps:
+        sampling = {"mode": "fps", "target_fps": args.infer_fps}
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, MANIFEST_NAME)
+    if args.no_resume and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    done = load_manifest(manifest_path)
+
+    sources = collect_sources(args.inputs)
+    jobs = []
+    for source, relative_path in sources:
+        if is_finished(done.get(source), source):
+            continue
+        output_base = os.path.join(args.output, os.path.splitext(relative_path)[0] + "_deteksi")
+        jobs.append((source, output_base, args.conf, formats, sampling, args.track, args.sliced))
+
+    print(f"📂 {len(sources)} file ditemukan, {len(sources) - len(jobs)} sudah selesai, {len(jobs)} akan diproses.")
+    if not jobs:
+        return 0
+
+    failed = 0
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        def record(result):
+            nonlocal failed
+            if "error" in result:
+                failed += 1
+                print(f"❌ {result['source']}: {result['error']}")
+                return
+            stat = os.stat(result["source"])
+            result.update(size=stat.st_size, mtime=stat.st_mtime)
+            manifest.write(json.dumps(result) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+            print(f"✅ {result['source']} -> {result['output']} ({result['frames']} frame, {result['seconds']} detik)")
+
+        initargs = (args.backend, args.weights, args.threads_per_worker)
+        if args.workers <= 1:
+            init_worker(*initargs)
+            for job in jobs:
+                record(_run_job(*job))
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=init_worker, initargs=initargs) as executor:
+                futures = [executor.submit(_run_job, *job) for job in jobs]
+                for future in as_completed(futures):
+                    record(future.result())
+
+    print(f"Selesai: {len(jobs) - failed} berhasil, {failed} gagal.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Scheduler micro-batching untuk permintaan deteksi gambar yang datang bersamaan.
+
+Semua sesi Streamlit dan request API memakai model yang sama. Tanpa koordinasi, setiap
+permintaan menjalankan model.predict sendiri-sendiri. Scheduler ini menampung permintaan
+yang datang dalam jendela waktu singkat (config.BATCH_WINDOW_MS, dihitung sejak permintaan
+pertama) lalu menjalankannya dalam satu forward pass berukuran maksimal
+config.BATCH_MAX_SIZE. Setiap pemanggil menerima hasilnya sendiri lewat Future.
+
+Latensi tambahan per permintaan dibatasi oleh jendela tersebut: permintaan yang sudah
+menunggu selama batch sebelumnya berjalan langsung diproses di batch berikutnya.
+
+Dalam satu batch, gambar dikelompokkan per ukuran dan setiap kelompok dijalankan dalam
+satu forward pass. Gambar berukuran sama diletterbox ultralytics secara rect (sama seperti
+panggilan satu gambar); mencampur ukuran berbeda membuatnya beralih ke letterbox persegi
+sehingga box dan skor bergeser dibanding panggilan satu gambar.
+
+Semua jalur inferensi model bersama (utils1.detect_frames) melewati scheduler ini. Jika
+scheduler dimatikan, model_lock() menserialkan pemanggilan model per instance.
+
+Benchmark throughput dan latensi dengan N klien bersamaan:
+    python batch_scheduler.py data/gambar --clients 8 --window-ms 5 10 20
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+import config
+import metrics
+
+
+class _Request:
+    __slots__ = ("image", "conf", "future", "enqueued")
+
+    def __init__(self, image, conf):
+        self.image = image
+        self.conf = conf
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Menggabungkan permintaan deteksi dari banyak thread menjadi batch untuk satu model.
+
+        scheduler = BatchScheduler(model, window_ms=10, max_batch_size=8)
+        detections = scheduler.detect(image_bgr, conf=0.3) # array (N, 6)
+    """
+    def __init__(self, model, window_ms=None, max_batch_size=None, history=1000):
+        self.model = model
+        self.window = (config.BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch_size = max_batch_size or config.BATCH_MAX_SIZE
+
+        # Metrik: ukuran batch dan waktu tunggu di antrian untuk history permintaan terakhir
+        self.requests = 0
+        self.batches = 0
+        self._batch_sizes = deque(maxlen=history)
+        self._queue_waits = deque(maxlen=history)
+        self._stats_lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_bgr, conf=0.3):
+        """
+        Mengirim satu gambar BGR; mengembalikan Future berisi array deteksi (N, 6) dengan skor >= conf.
+        """
+        if self._closed:
+            raise RuntimeError("BatchScheduler sudah ditutup.")
+        request = _Request(image_bgr, conf)
+        self._queue.put(request)
+        return request.future
+
+    def detect(self, image_bgr, conf=0.3, timeout=None):
+        return self.submit(image_bgr, conf).result(timeout)
+
+    def _collect(self):
+        """
+        Menunggu permintaan pertama lalu mengumpulkan permintaan lain sampai jendela
+        waktu habis atau batch penuh. Mengembalikan None jika scheduler ditutup.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first.enqueued + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None) # Selesaikan batch ini dulu, berhenti di putaran berikutnya
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        from utils1 import predict_detections
+
+        started = time.perf_counter()
+        groups = {}
+        for request in batch:
+            groups.setdefault(request.image.shape, []).append(request)
+        for group in groups.values():
+            try:
+                # Satu forward pass per ukuran gambar dengan threshold terendah, lalu disaring per pemanggil
+                results = predict_detections(self.model, [request.image for request in group],
+                                             conf=min(request.conf for request in group))
+                for request, detections in zip(group, results):
+                    request.future.set_result(detections[detections[:, 4] >= request.conf])
+            except Exception as e:
+                for request in group:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self._batch_sizes.append(len(batch))
+            self._queue_waits.extend((started - request.enqueued) * 1000 for request in batch)
+
+    def stats(self):
+        """
+        Ringkasan metrik: ukuran batch (rata-rata dan histogram) serta waktu tunggu di
+        antrian (p50/p95/p99, milidetik) untuk permintaan terakhir.
+        """
+        with self._stats_lock:
+            sizes = list(self._batch_sizes)
+            waits = list(self._queue_waits)
+            summary = {"requests": self.requests, "batches": self.batches, "pending": self._queue.qsize(),
+                       "window_ms": self.window * 1000, "max_batch_size": self.max_batch_size}
+        summary["batch_size_mean"] = float(np.mean(sizes)) if sizes else 0.0
+        summary["batch_size_histogram"] = dict(sorted(Counter(sizes).items()))
+        for percentile in (50, 95, 99):
+            summary[f"queue_wait_p{percentile}_ms"] = float(np.percentile(waits, percentile)) if waits else 0.0
+        return summary
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+_model_locks = weakref.WeakKeyDictionary()
+metrics.register_queue("batch_scheduler", lambda: sum(scheduler._queue.qsize() for scheduler in list(_schedulers.values())))
+
+
+def get_batch_scheduler(model):
+    """
+    Scheduler bersama untuk model ini di seluruh proses (None jika dinonaktifkan di config).
+    """
+    if not config.BATCH_SCHEDULER_ENABLED or model is None:
+        return None
+    with _schedulers_lock:
+        scheduler = _schedulers.get(id(model))
+        if scheduler is None or scheduler.model is not model:
+            if scheduler is not None:
+                scheduler.close()
+            scheduler = _schedulers[id(model)] = BatchScheduler(model)
+        return scheduler
+
+
+def model_lock(model):
+    """
+    Lock per instance model untuk inferensi tanpa scheduler (config.BATCH_SCHEDULER_ENABLED
+    = False): model ultralytics tidak aman dipanggil dari beberapa thread sekaligus.
+    """
+    with _schedulers_lock:
+        lock = _model_locks.get(model)
+        if lock is None:
+            lock = _model_locks[model] = threading.Lock()
+        return lock
+
+
+def close_batch_scheduler(model):
+    """
+    Menutup scheduler milik model ini (misalnya setelah model diganti atau dilepas registry).
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(id(model))
+        if scheduler is None or scheduler.model is not model:
+            return
+        del _schedulers[id(model)]
+    scheduler.close()
+
+
+def benchmark(model, images, clients, window_ms_list, requests_per_client=20, conf=0.3):
+    """
+    Mengukur throughput dan latensi dengan sejumlah klien yang mengirim permintaan
+    bersamaan, tanpa scheduler (predict langsung, dikunci) dan dengan setiap jendela.
+    """
+    def run_clients(detect):
+        latencies = []
+        lock = threading.Lock()
+
+        def client(offset):
+            for i in range(requests_per_client):
+                image = images[(offset + i) % len(images)]
+                start = time.perf_counter()
+                detect(image)
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+        threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {"images_per_second": len(latencies) / elapsed,
+                **{f"latency_p{p}_ms": float(np.percentile(latencies, p)) for p in (50, 95, 99)}}
+
+    report = []
+    predict_lock = threading.Lock()
+
+    def detect_direct(image):
+        with predict_lock:
+            return model.predict(image, conf=conf, verbose=False)
+
+    report.append({"mode": "tanpa scheduler", **run_clients(detect_direct)})
+    for window_ms in window_ms_list:
+        scheduler = BatchScheduler(model, window_ms=window_ms)
+        try:
+            entry = run_clients(lambda image: scheduler.detect(image, conf))
+            stats = scheduler.stats()
+        finally:
+            scheduler.close()
+        report.append({"mode": f"jendela {window_ms} ms", **entry, "batch_size_mean": stats["batch_size_mean"]})
+    return report
+
+
+def main(argv=None):
+    import cv2
+
+    from backends import load_backend
+    from batch_detect import collect_sources, media_type
+
+    parser = argparse.ArgumentParser(description="Benchmark scheduler micro-batching dengan klien bersamaan.")
+    parser.add_argument("inputs", nargs="+", help="Folder, pola glob, atau file gambar")
+    parser.add_argument("--clients", type=int, default=8, help="Jumlah klien bersamaan")
+    parser.add_argument("--requests", type=int, default=20, help="Permintaan per klien")
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--backend", default=config.MODEL_BACKEND)
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    args = parser.parse_args(argv)
+
+    images = [cv2.imread(path) for path, _ in collect_sources(args.inputs) if media_type(path) == "image"]
+    images = [image for image in images if image is not None]
+    if not images:
+        print("Tidak ada gambar yang ditemukan.")
+        return 1
+
+    model = load_backend(args.backend, args.weights)
+    report = benchmark(model, images, args.clients, args.window_ms, args.requests)
+    print(f"{'Mode':<18} {'Gambar/detik':>13} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'Batch':>6}")
+    for entry in report:
+        batch = f"{entry['batch_size_mean']:.1f}" if "batch_size_mean" in entry else "1.0"
+        print(f"{entry['mode']:<18} {entry['images_per_second']:>13.2f} {entry['latency_p50_ms']:>9.1f} "
+              f"{entry['latency_p95_ms']:>9.1f} {entry['latency_p99_ms']:>9.1f} {batch:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,6 @@
 -------------------------------------------------
 """
 from pathlib import Path
-import sys
 
 # Get the absolute path of the current file
 file_path = Path(__file__).resolve()
@@ -17,12 +16,9 @@ file_path = Path(__file__).resolve()
 # Get the parent directory of the current file
 root_path = file_path.parent
 
-# Add the root path to the sys.path list if it is not already there
-if root_path not in sys.path:
-    sys.path.append(str(root_path))
-
-# Get the relative path of the root directory with respect to the current working directory
-ROOT = root_path.relative_to(Path.cwd())
+# Root directory as an absolute path: config is imported by CLIs and workers that may be
+# started from any working directory, so no path here depends on the cwd
+ROOT = root_path
 
 # Source
 SOURCES_LIST = ["Image", "Video", "Webcam"]
@@ -37,3 +33,189 @@ MaturityModel = str(MaturityModel)
 DETECTION_MODEL_LIST = [
     "yolov8n.pt"
 ]
+
+# Kelas model kematangan TBS, urut sesuai indeks kelas bobot. Model dengan kelas lain ditolak saat dimuat.
+CLASS_NAMES = ['kurang matang', 'matang', 'mentah', 'terlalu matang']
+
+# Bobot model yang dipakai aplikasi
+MODEL_WEIGHTS = "best.pt"
+# Backend inferensi: "pytorch", "onnx" (ONNX Runtime), "onnx-int8" (hasil quantize.py) atau "openvino"
+MODEL_BACKEND = "pytorch"
+# Ukuran input model untuk ekspor ONNX/OpenVINO
+MODEL_IMGSZ = 640
+# Jumlah thread CPU untuk backend ONNX/OpenVINO (0 = default runtime)
+BACKEND_NUM_THREADS = 0
+
+# Start cepat. Backend "pytorch" memuat salinan bobot yang sudah di-fuse (best_fused.pt),
+# dibuat sekali dan dipakai ulang selama lebih baru dari file bobot
+MODEL_FUSED_CACHE = True
+# Jalankan satu inferensi pemanasan dengan gambar kosong saat model dimuat
+MODEL_WARMUP = True
+# Muat model di thread latar belakang segera setelah halaman pertama aplikasi tampil,
+# sehingga halaman Home/About tidak menunggu torch dan halaman Deteksi tidak menunggu model
+MODEL_PRELOAD = True
+
+# Registry model bersama (model_registry.py). Model yang dapat dipilih: MODEL_WEIGHTS dan DETECTION_MODEL_LIST
+# Batas perkiraan memori semua model yang dimuat (byte); model tanpa pinjaman yang paling lama
+# tidak dipakai dilepas jika terlampaui
+MODEL_MEMORY_BUDGET = 1024 * 1024 * 1024
+# Model selain default yang tidak dipakai selama ini (detik) dilepas dari memori
+MODEL_IDLE_SECONDS = 15 * 60
+# Interval (detik) memeriksa apakah file bobot diganti di disk untuk dimuat ulang tanpa restart (0 = mati)
+MODEL_RELOAD_CHECK_SECONDS = 10
+
+# Threshold terendah yang dipakai saat inferensi (= nilai minimum slider confidence).
+# Perubahan slider hanya menyaring hasil deteksi yang sudah ada tanpa inferensi ulang.
+MIN_CONFIDENCE = 0.1
+
+# Inferensi bertile untuk gambar drone/kanopi resolusi tinggi (sliced.py)
+SLICE_ENABLED = False
+# Ukuran tile (piksel): mendekati resolusi training model (imgsz=540, dibulatkan ke 544)
+SLICE_TILE_SIZE = 544
+# Rasio tumpang tindih antar tile
+SLICE_OVERLAP = 0.2
+# Jumlah tile per panggilan model (membatasi memori puncak)
+SLICE_BATCH_SIZE = 4
+# Penggabungan duplikat di perbatasan tile: "nms" atau "wbf"
+SLICE_MERGE = "nms"
+# Ukuran overlap untuk menggabungkan duplikat: "ios" (intersection over smaller) atau "iou"
+SLICE_MATCH_METRIC = "ios"
+SLICE_MATCH_THRESHOLD = 0.5
+# Ikut menginferensi gambar utuh agar objek yang lebih besar dari tile tetap terdeteksi
+SLICE_INCLUDE_FULL = True
+# Sisi terpanjang minimal (piksel) agar tiling dipakai; gambar lebih kecil diinferensi utuh
+SLICE_MIN_SIZE = 1600
+
+# Video inference config
+# Jumlah frame yang digabung dalam satu panggilan model.predict (1 = frame per frame)
+VIDEO_BATCH_SIZE = 8
+
+# Pipeline video bertahap (decode / inferensi / anotasi+encode di thread terpisah)
+VIDEO_PIPELINE_ENABLED = True
+# Jumlah batch maksimal yang boleh menunggu di antara dua tahap
+PIPELINE_QUEUE_SIZE = 4
+# Detik tanpa frame baru sebelum pipeline dianggap macet dan dihentikan
+PIPELINE_STALL_TIMEOUT = 30
+
+# Sampling frame video: "all" (semua frame), "stride" (setiap frame ke-k) atau "fps" (N inferensi per detik)
+VIDEO_SAMPLING_MODE = "all"
+VIDEO_FRAME_STRIDE = 5
+VIDEO_INFERENCE_FPS = 2
+# True: frame yang dilewati tetap ditulis dengan deteksi terakhir; False: dilewati tanpa di-decode
+VIDEO_ANNOTATE_SKIPPED = True
+# Lompatan minimal (frame) yang memakai seek CAP_PROP_POS_FRAMES, di bawahnya memakai grab()
+VIDEO_SEEK_MIN_SKIP = 30
+
+# Tracking objek di video (tracker.py) untuk ID tetap dan jumlah TBS unik per kelas
+TRACKING_ENABLED = False
+# IoU minimal antara posisi prediksi track dan deteksi agar dianggap objek yang sama
+TRACKER_IOU_THRESHOLD = 0.3
+# Jumlah inferensi berturut-turut tanpa deteksi yang cocok sebelum track dihapus
+TRACKER_MAX_AGE = 10
+# Jumlah deteksi yang cocok sebelum track dianggap objek nyata (ditampilkan dan dihitung)
+TRACKER_MIN_HITS = 3
+
+# Pool proses untuk deteksi gambar paralel (worker_pool.py, batch_detect.py)
+# Jumlah worker (0 = jumlah core CPU dibagi WORKER_THREADS)
+WORKER_POOL_SIZE = 0
+# Batas thread intra-op torch per worker (0 = default torch)
+WORKER_THREADS = 2
+
+# Cache hasil deteksi gambar berdasarkan hash isi file
+DETECTION_CACHE_ENABLED = True
+# Batas ukuran cache di memori (byte)
+DETECTION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Folder cache di disk agar tetap ada setelah restart (None = hanya memori)
+DETECTION_CACHE_DIR = None
+# Batas ukuran cache di disk (byte)
+DETECTION_CACHE_DISK_MAX_BYTES = 512 * 1024 * 1024
+
+# Scheduler micro-batching (batch_scheduler.py): deteksi gambar dari sesi Streamlit dan
+# request API yang datang hampir bersamaan digabung menjadi satu model.predict
+BATCH_SCHEDULER_ENABLED = True
+# Jendela pengumpulan (milidetik) sejak permintaan pertama dalam batch, disarankan 5-20
+BATCH_WINDOW_MS = 10
+# Jumlah gambar maksimal dalam satu batch
+BATCH_MAX_SIZE = 8
+
+# HTTP API inferensi (api_server.py), berjalan berdampingan dengan UI Streamlit
+API_PORT = 8000
+# Jumlah request yang diproses bersamaan (0 = otomatis: BATCH_MAX_SIZE jika scheduler
+# aktif agar request dapat digabung, selain itu 1 karena model dipakai bersama)
+API_MAX_CONCURRENCY = 0
+# Jumlah permintaan yang boleh menunggu giliran; lebih dari ini ditolak dengan 503
+API_QUEUE_SIZE = 32
+# Detik maksimal menunggu di antrian sebelum ditolak dengan 503
+API_QUEUE_TIMEOUT = 30
+# Batas ukuran body request (byte) dan jumlah gambar dalam satu request batch
+API_MAX_BODY_BYTES = 50 * 1024 * 1024
+API_MAX_BATCH_IMAGES = 16
+
+# Deteksi live (halaman deteksi dan live_stream.py)
+# Sumber default: indeks kamera ("0") atau URL RTSP/HTTP
+LIVE_SOURCE = "0"
+# Detik tanpa frame baru sebelum stream dianggap terputus
+LIVE_READ_TIMEOUT = 5
+# Jumlah frame terakhir untuk menghitung FPS dan latensi
+LIVE_STATS_WINDOW = 30
+# FPS file rekaman hasil deteksi live (live_stream.py --output)
+LIVE_OUTPUT_FPS = 10
+
+# File sementara per sesi (spool.py)
+# Ukuran chunk (byte) saat menyalin video yang diunggah ke disk
+SPOOL_CHUNK_SIZE = 1024 * 1024
+STATIC_DIR = ROOT / 'static'
+# Hasil deteksi yang diunduh browser secara streaming langsung dari file ini (download_server.py)
+DOWNLOAD_DIR = STATIC_DIR / 'downloads'
+# Port server unduhan yang dijalankan aplikasi Streamlit
+DOWNLOAD_PORT = 8502
+# URL dasar folder unduhan, misalnya "https://tbs.example.com/files/" di belakang reverse proxy.
+# None = host yang sama dengan halaman aplikasi, port DOWNLOAD_PORT
+DOWNLOAD_BASE_URL = None
+# Upload/hasil yang lebih tua dari ini (detik) dihapus saat aplikasi start (sisa proses yang berhenti tiba-tiba)
+SPOOL_MAX_AGE = 24 * 3600
+
+# Antrian job video di latar belakang (job_queue.py). Status dan progres disimpan di SQLite,
+# deteksi per frame di-checkpoint ke disk, sehingga job tetap berjalan saat tab ditutup
+# dan berlanjut dari checkpoint terakhir setelah proses/container restart
+VIDEO_JOBS_ENABLED = True
+JOB_DIR = ROOT / 'jobs'
+JOB_DB_PATH = JOB_DIR / 'jobs.sqlite3'
+# Jumlah frame per checkpoint deteksi
+JOB_CHECKPOINT_FRAMES = 250
+# Interval (detik) worker memperbarui progres dan heartbeat
+JOB_HEARTBEAT_SECONDS = 2
+# Job "running" tanpa heartbeat selama ini (detik) dianggap workernya mati dan diambil alih worker lain
+JOB_STALE_SECONDS = 30
+# Interval (detik) worker memeriksa job baru dan UI memperbarui progres
+JOB_POLL_INTERVAL = 1
+# Worker berjalan sebagai thread di proses Streamlit (False = jalankan `python job_queue.py worker` terpisah)
+JOB_WORKER_IN_APP = True
+# Job yang sudah selesai/gagal/dibatalkan dan lebih tua dari ini (detik) dihapus beserta filenya
+JOB_MAX_AGE = SPOOL_MAX_AGE
+
+# Output video (video_output.py)
+# Codec file hasil: "h264" (libx264 lewat imageio-ffmpeg, file kecil dan dapat diputar browser),
+# "vp9" (WebM), "mp4v" atau "mjpg" (OpenCV, tanpa dependensi tambahan)
+VIDEO_OUTPUT_CODEC = "h264"
+# CRF encoder ffmpeg (None = default codec: 23 untuk h264, 32 untuk vp9; makin kecil makin bagus/besar)
+VIDEO_OUTPUT_CRF = None
+# Preset kecepatan libx264 (ultrafast ... veryslow)
+VIDEO_OUTPUT_PRESET = "veryfast"
+# Jumlah hasil render per job yang disimpan (threshold/codec berbeda); kombinasi yang pernah
+# di-render tidak di-encode ulang
+VIDEO_RENDER_CACHE_SIZE = 4
+# Pratinjau di UI, terpisah dari kualitas output: lebar maksimal (piksel), laju maksimal, kualitas JPEG
+PREVIEW_MAX_WIDTH = 640
+PREVIEW_MAX_FPS = 4
+PREVIEW_JPEG_QUALITY = 70
+
+# Metrik Prometheus (metrics.py). False = instrumentasi tidak dipasang sama sekali (tanpa biaya)
+METRICS_ENABLED = True
+# Port server GET /metrics untuk aplikasi Streamlit (0 = tidak dijalankan); API memakai /metrics di API_PORT
+METRICS_PORT = 9108
+# Batas bucket histogram latensi (detik)
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Rekaman deteksi (detection_records.py): jumlah baris per row group saat ditulis append-only
+RECORD_ROW_GROUP_SIZE = 64 * 1024
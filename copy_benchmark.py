@@ -0,0 +1,207 @@
+"""
+Mengukur jumlah salinan frame penuh per frame pada jalur gambar dan video.
+
+Jalur lama (PIL -> NumPy -> RGB->BGR, salinan frame di renderer, BGR->RGB untuk tampilan,
+lalu RGB->BGR lagi sebelum encode) direkonstruksi di sini sebagai pembanding. Jalur baru
+memakai satu buffer BGR kanonik hasil decode: jalur gambar memanggil load_image_bgr dan
+render_image_detections, jalur video menjalankan process_video_capture sungguhan dengan
+model tiruan pada video sintetis.
+
+Salinan dihitung oleh CopyCounter: setiap tahap yang menghasilkan buffer piksel yang tidak
+berbagi memori dengan buffer frame yang sudah ada dihitung satu salinan. Konversi di batas
+tampilan (st.image) dan encoder (VideoWriter, imencode) tidak dihitung karena memang
+satu-satunya konversi yang diperlukan.
+
+Contoh:
+    python copy_benchmark.py --size 1920x1080 --frames 60
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from render_benchmark import random_detections
+from utils1 import (class_colors, class_names, draw_boxes_on_frame, filter_detections, load_image_bgr,
+                    process_video_capture, render_image_detections)
+
+
+class CopyCounter:
+    """
+    Menghitung decode dan salinan frame. decode() mencatat buffer hasil decode; stage()
+    mencatat keluaran sebuah tahap dan menghitungnya sebagai salinan jika tidak berbagi
+    memori dengan buffer yang sudah tercatat. Objek selain array NumPy (gambar PIL)
+    selalu memiliki buffer sendiri.
+    """
+    def __init__(self, history=64):
+        self.decodes = 0
+        self.copies = 0
+        self._buffers = deque(maxlen=history)
+
+    def decode(self, buffer):
+        self.decodes += 1
+        if isinstance(buffer, np.ndarray):
+            self._buffers.append(buffer)
+        return buffer
+
+    def stage(self, output):
+        if not isinstance(output, np.ndarray) or not any(np.shares_memory(output, b) for b in self._buffers):
+            self.copies += 1
+            if isinstance(output, np.ndarray):
+                self._buffers.append(output)
+        return output
+
+
+class _NullCounter:
+    # Dipakai saat mengukur waktu agar pemeriksaan memori tidak ikut terukur
+    def decode(self, buffer):
+        return buffer
+
+    def stage(self, output):
+        return output
+
+
+class _CountingCapture:
+    # Membungkus cv2.VideoCapture agar buffer hasil decode tercatat di CopyCounter
+    def __init__(self, cap, counter):
+        self._cap = cap
+        self._counter = counter
+
+    def read(self):
+        ok, frame = self._cap.read()
+        if ok:
+            self._counter.decode(frame)
+        return ok, frame
+
+    def __getattr__(self, name):
+        return getattr(self._cap, name)
+
+
+class _StubModel:
+    # Model tiruan: deteksi tetap untuk setiap frame, tanpa biaya inferensi
+    def __init__(self, detections):
+        self.detections = detections
+
+    def predict(self, frames, conf=0.3, verbose=False):
+        count = len(frames) if isinstance(frames, list) else 1
+        return [self.detections] * count
+
+
+def image_legacy(data, detections, conf, counter):
+    image = counter.decode(Image.open(BytesIO(data)))
+    image = counter.stage(image.convert("RGB"))
+    image_np = counter.stage(np.array(image))
+    image_bgr = counter.stage(cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR))
+    # Gambar asli di kolom kiri di-decode lagi dengan PIL setiap rerun
+    counter.decode(Image.open(BytesIO(data))).load()
+    drawn = counter.stage(draw_boxes_on_frame(image_bgr, filter_detections(detections, conf),
+                                              class_names, class_colors))
+    image_rgb = counter.stage(cv2.cvtColor(drawn, cv2.COLOR_BGR2RGB))
+    result = counter.stage(Image.fromarray(image_rgb))
+    buffer = BytesIO()
+    result.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def image_current(data, detections, conf, counter):
+    image_bgr = counter.decode(load_image_bgr(data))
+    result = counter.stage(render_image_detections(image_bgr, detections, conf))
+    return cv2.imencode(".png", result)[1].tobytes()
+
+
+def video_legacy(video_path, detections, conf, counter):
+    # Renderer menyalin frame, generator mengirim RGB, app mengubahnya kembali ke BGR untuk encode
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            counter.decode(frame)
+            drawn = counter.stage(draw_boxes_on_frame(frame, filter_detections(detections, conf),
+                                                      class_names, class_colors))
+            frame_rgb = counter.stage(cv2.cvtColor(drawn, cv2.COLOR_BGR2RGB))
+            counter.stage(cv2.cvtColor(counter.stage(np.array(frame_rgb)), cv2.COLOR_RGB2BGR))
+            frames += 1
+    finally:
+        cap.release()
+    return frames
+
+
+def video_current(video_path, detections, conf, counter):
+    cap = _CountingCapture(cv2.VideoCapture(video_path), counter)
+    frames = 0
+    for _, processed_frame, _ in process_video_capture(cap, _StubModel(detections), conf, batch_size=4):
+        counter.stage(processed_frame)
+        frames += 1
+    return frames
+
+
+def write_test_video(path, frames, width, height, fps=25):
+    rng = np.random.default_rng(2)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+    writer.release()
+
+
+def _measure(function, args, per_call_frames=None):
+    counter = CopyCounter()
+    frames = function(*args, counter)
+    frames = per_call_frames or frames
+    start = time.perf_counter()
+    function(*args, _NullCounter())
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {
+        "decodes_per_frame": counter.decodes / frames,
+        "copies_per_frame": counter.copies / frames,
+        "ms_per_frame": elapsed_ms / frames,
+    }
+
+
+def benchmark(width=1920, height=1080, frames=60, boxes=30, conf=0.3):
+    detections = random_detections(boxes, width, height)
+    frame_bytes = width * height * 3
+    image = np.random.default_rng(3).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    image_data = cv2.imencode(".jpg", image)[1].tobytes()
+
+    report = [
+        {"path": "gambar lama", **_measure(image_legacy, (image_data, detections, conf), per_call_frames=1)},
+        {"path": "gambar baru", **_measure(image_current, (image_data, detections, conf), per_call_frames=1)},
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "sintetis.mp4")
+        write_test_video(video_path, frames, width, height)
+        report.append({"path": "video lama", **_measure(video_legacy, (video_path, detections, conf))})
+        report.append({"path": "video baru", **_measure(video_current, (video_path, detections, conf))})
+
+    for entry in report:
+        entry["copied_mb_per_frame"] = entry["copies_per_frame"] * frame_bytes / 2 ** 20
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mengukur salinan frame per frame pada jalur gambar dan video.")
+    parser.add_argument("--size", default="1920x1080", help="Ukuran frame LEBARxTINGGI")
+    parser.add_argument("--frames", type=int, default=60, help="Jumlah frame video sintetis")
+    parser.add_argument("--boxes", type=int, default=30, help="Jumlah box per frame")
+    args = parser.parse_args(argv)
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+    report = benchmark(width, height, args.frames, args.boxes)
+    print(f"{'Jalur':<12} {'Decode/frame':>13} {'Salinan/frame':>14} {'MB disalin':>11} {'ms/frame':>9}")
+    for entry in report:
+        print(f"{entry['path']:<12} {entry['decodes_per_frame']:>13.1f} {entry['copies_per_frame']:>14.1f} "
+              f"{entry['copied_mb_per_frame']:>11.1f} {entry['ms_per_frame']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
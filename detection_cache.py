@@ -0,0 +1,260 @@
+"""
+Cache hasil deteksi berdasarkan hash isi gambar.
+
+Kunci cache terdiri dari hash SHA-256 byte gambar, identitas model (file bobot beserta
+ukuran dan waktu modifikasinya), dan confidence threshold saat inferensi. Yang disimpan
+adalah deteksi mentah (array (N, 6) [x1, y1, x2, y2, score, class]), bukan gambar hasil
+render, sehingga render ulang tidak memerlukan inferensi. Entri yang dibuat dengan
+threshold lebih rendah juga dipakai untuk threshold yang lebih tinggi dengan menyaring
+skor deteksinya.
+
+Dua tingkat penyimpanan:
+  - memori: LRU dengan batas total ukuran (byte)
+  - disk (opsional): file .npy di config.DETECTION_CACHE_DIR yang tetap ada setelah restart.
+    Isi folder dibaca sekali saat cache dibuat lalu dicatat di indeks memori (urutan LRU dan
+    threshold per gambar), sehingga lookup dan eviksi tidak perlu membaca isi folder lagi.
+    File yang ditulis proses lain tetap ditemukan jika threshold-nya sama persis.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+
+# Perkiraan overhead per entri (kunci, objek array, node OrderedDict)
+_ENTRY_OVERHEAD = 256
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def model_identity(model):
+    """
+    String yang mengidentifikasi model: jenis backend, file bobot, ukuran dan mtime file.
+    """
+    path = getattr(model, "ckpt_path", None) or getattr(model, "model_path", None) or getattr(model, "pt_path", None)
+    identity = [type(model).__name__, str(path)]
+    if path and os.path.exists(path):
+        stat = os.stat(path)
+        identity += [str(stat.st_size), str(int(stat.st_mtime))]
+    imgsz = getattr(model, "imgsz", None)
+    if imgsz:
+        identity.append(str(imgsz))
+    return "|".join(identity)
+
+
+def _conf_key(conf):
+    return round(float(conf), 4)
+
+
+class DetectionCache:
+    """
+    Cache deteksi dua tingkat (memori LRU + disk opsional), aman dipakai lintas thread.
+    """
+    def __init__(self, max_bytes=None, disk_dir=None, disk_max_bytes=None):
+        self.max_bytes = config.DETECTION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = config.DETECTION_CACHE_DISK_MAX_BYTES if disk_max_bytes is None else disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict() # (image_hash, model_id, conf) -> detections
+        self._confs = {} # (image_hash, model_id) -> set threshold yang tersimpan
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self._disk_files = OrderedDict() # path file .npy -> ukuran, urut dari yang paling lama dipakai
+        self._disk_confs = {} # prefix file -> set threshold yang tersimpan di disk
+        self._disk_size = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_scan()
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Tingkat memori ---
+    def _memory_put(self, key, detections):
+        if key in self._entries:
+            self._size -= self._entries.pop(key).nbytes + _ENTRY_OVERHEAD
+        self._entries[key] = detections
+        self._confs.setdefault(key[:2], set()).add(key[2])
+        self._size += detections.nbytes + _ENTRY_OVERHEAD
+
+        # Buang entri yang paling lama tidak dipakai sampai ukuran di bawah batas
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            old_key, old_detections = self._entries.popitem(last=False)
+            self._size -= old_detections.nbytes + _ENTRY_OVERHEAD
+            confs = self._confs.get(old_key[:2])
+            if confs is not None:
+                confs.discard(old_key[2])
+                if not confs:
+                    del self._confs[old_key[:2]]
+
+    def _memory_get(self, image_hash, model_id, conf):
+        # Cari entri dengan threshold tertinggi yang masih <= conf
+        confs = [c for c in self._confs.get((image_hash, model_id), ()) if c <= conf]
+        if not confs:
+            return None, None
+        key = (image_hash, model_id, max(confs))
+        self._entries.move_to_end(key)
+        return key[2], self._entries[key]
+
+    # --- Tingkat disk ---
+    def _disk_prefix(self, image_hash, model_id):
+        return os.path.join(self.disk_dir, hash_bytes(f"{image_hash}|{model_id}".encode()))
+
+    def _disk_scan(self):
+        # Sekali saat start: isi indeks dari file yang ada, urut mtime (paling lama dipakai lebih dulu)
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            prefix, _, conf = entry.name[:-4].rpartition("_")
+            if not entry.name.endswith(".npy") or not prefix:
+                continue
+            try:
+                stat = entry.stat()
+                conf = float(conf)
+            except (OSError, ValueError):
+                continue
+            files.append((stat.st_mtime, entry.path, prefix, conf, stat.st_size))
+        for _, path, prefix, conf, size in sorted(files):
+            self._disk_index_add(path, prefix, conf, size)
+
+    def _disk_index_add(self, path, prefix, conf, size):
+        self._disk_index_remove(path)
+        self._disk_files[path] = size
+        self._disk_confs.setdefault(prefix, set()).add(conf)
+        self._disk_size += size
+
+    def _disk_index_remove(self, path):
+        size = self._disk_files.pop(path, None)
+        if size is None:
+            return
+        self._disk_size -= size
+        prefix, _, conf = os.path.basename(path)[:-4].rpartition("_")
+        confs = self._disk_confs.get(prefix)
+        if confs is not None:
+            confs.discard(float(conf))
+            if not confs:
+                del self._disk_confs[prefix]
+
+    def _disk_get(self, image_hash, model_id, conf):
+        prefix = self._disk_prefix(image_hash, model_id)
+        name = os.path.basename(prefix)
+        confs = [c for c in self._disk_confs.get(name, ()) if c <= conf]
+        if confs:
+            best = max(confs)
+        elif os.path.exists(f"{prefix}_{conf}.npy"):
+            # Ditulis proses lain setelah indeks dibuat
+            best = conf
+        else:
+            return None, None
+        path = f"{prefix}_{best}.npy"
+        try:
+            detections = np.load(path)
+        except (OSError, ValueError):
+            self._disk_index_remove(path)
+            return None, None
+        self._disk_index_add(path, name, best, os.path.getsize(path))
+        os.utime(path) # Urutan LRU tetap terjaga setelah restart (indeks dibangun dari mtime)
+        return best, detections
+
+    def _disk_put(self, key, detections):
+        prefix = self._disk_prefix(*key[:2])
+        path = f"{prefix}_{key[2]}.npy"
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, detections)
+        os.replace(temp_path, path)
+        self._disk_index_add(path, os.path.basename(prefix), key[2], os.path.getsize(path))
+        self._disk_evict()
+
+    def _disk_evict(self):
+        # Buang file yang paling lama tidak dipakai sampai total ukuran di bawah batas
+        while self._disk_size > self.disk_max_bytes and len(self._disk_files) > 1:
+            path = next(iter(self._disk_files))
+            self._disk_index_remove(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # --- API publik ---
+    def get(self, image_hash, model_id, conf):
+        """
+        Deteksi tersimpan untuk gambar dan model ini dengan skor >= conf, atau None.
+        """
+        conf = _conf_key(conf)
+        with self._lock:
+            cached_conf, detections = self._memory_get(image_hash, model_id, conf)
+            if detections is None and self.disk_dir:
+                cached_conf, detections = self._disk_get(image_hash, model_id, conf)
+                if detections is not None:
+                    self._memory_put((image_hash, model_id, cached_conf), detections)
+            if detections is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        if cached_conf < conf:
+            detections = detections[detections[:, 4] >= conf]
+        return detections
+
+    def put(self, image_hash, model_id, conf, detections):
+        """
+        Menyimpan deteksi mentah hasil inferensi dengan threshold conf.
+        """
+        key = (image_hash, model_id, _conf_key(conf))
+        detections = np.ascontiguousarray(detections, dtype=np.float32)
+        detections.setflags(write=False)
+        with self._lock:
+            self._memory_put(key, detections)
+            if self.disk_dir:
+                self._disk_put(key, detections)
+
+    def get_or_detect(self, image_bytes, model, conf, detect, variant=None):
+        """
+        Mengambil deteksi dari cache atau menjalankan detect() (mengembalikan array (N, 6))
+        lalu menyimpannya. variant membedakan mode inferensi lain untuk model yang sama
+        (misalnya parameter tiling).
+        """
+        image_hash = hash_bytes(image_bytes)
+        model_id = model_identity(model)
+        if variant:
+            model_id = f"{model_id}|{variant}"
+        detections = self.get(image_hash, model_id, conf)
+        if detections is None:
+            detections = detect()
+            self.put(image_hash, model_id, conf, detections)
+        return detections
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._confs.clear()
+            self._size = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_detection_cache():
+    """
+    Cache deteksi bersama untuk seluruh proses (None jika dinonaktifkan di config).
+    """
+    global _cache
+    if not config.DETECTION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DetectionCache(disk_dir=config.DETECTION_CACHE_DIR)
+        return _cache
@@ -0,0 +1,292 @@
+"""
+Rekaman deteksi dalam bentuk kolom (array NumPy) untuk analisis dan ekspor Parquet/CSV.
+
+Satu baris = satu deteksi:
+  source_id    nama sumber (file gambar/video); disimpan sebagai kode int32 ke daftar sumber
+  frame_index  indeks frame dalam video (0 untuk gambar)
+  timestamp    posisi frame dalam video (detik; 0 untuk gambar)
+  class_id     indeks kelas (class_name ditambahkan saat ekspor)
+  score        confidence
+  x1, y1, x2, y2  box dalam piksel gambar asli
+
+DetectionRecords menampung baris di array per kolom yang diperbesar dua kali lipat saat
+penuh, dan deteksi satu frame ditambahkan sekaligus dari array (N, 6) tanpa objek Python
+per baris. Untuk video panjang, DetectionRecordWriter menulis baris ke file secara
+append-only per row group (config.RECORD_ROW_GROUP_SIZE baris), sehingga memori tetap kecil
+berapa pun jumlah barisnya:
+
+    with DetectionRecordWriter("kebun.parquet") as writer:
+        for index, frame, detections in process_video_capture(cap, model):
+            writer.append("kebun.mp4", detections, index, index / fps)
+
+utils1.VideoDetections (UI Streamlit dan VideoPipeline) juga menambahkan deteksi setiap
+frame yang diinferensi langsung ke DetectionRecords, sehingga ekspor hanya menyaring kolom.
+
+pyarrow (Parquet) dan pandas (to_pandas) baru di-import saat ekspor.
+"""
+import os
+
+import numpy as np
+
+import config
+
+# Kolom numerik dan tipe array-nya (source_id disimpan sebagai kode di kolom "source")
+FIELDS = (
+    ("source", np.int32),
+    ("frame_index", np.int64),
+    ("timestamp", np.float64),
+    ("class_id", np.int16),
+    ("score", np.float32),
+    ("x1", np.float32),
+    ("y1", np.float32),
+    ("x2", np.float32),
+    ("y2", np.float32),
+)
+BOX_FIELDS = ("x1", "y1", "x2", "y2")
+
+
+def _class_names():
+    from utils1 import class_names
+    return class_names
+
+
+def _dictionary(codes, values):
+    import pyarrow as pa
+    return pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(values, type=pa.string()))
+
+
+class DetectionRecords:
+    """
+    Tabel deteksi berbasis array per kolom. Kode sumber tetap sama selama objek dipakai,
+    termasuk setelah clear().
+    """
+    def __init__(self, capacity=1024):
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in FIELDS}
+        self._size = 0
+        self.sources = []
+        self._source_codes = {}
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, rows):
+        needed = self._size + rows
+        capacity = len(self._columns["source"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def source_code(self, source_id):
+        code = self._source_codes.get(source_id)
+        if code is None:
+            code = self._source_codes[source_id] = len(self.sources)
+            self.sources.append(source_id)
+        return code
+
+    def append(self, source_id, detections, frame_index=0, timestamp=0.0):
+        """
+        Menambahkan semua deteksi satu frame/gambar dari array (N, 6) atau (N, 7)
+        [x1, y1, x2, y2, score, class, ...]. Mengembalikan jumlah baris yang ditambahkan.
+        """
+        count = len(detections)
+        if count == 0:
+            return 0
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        columns = self._columns
+        columns["source"][rows] = self.source_code(source_id)
+        columns["frame_index"][rows] = frame_index
+        columns["timestamp"][rows] = timestamp
+        for i, name in enumerate(BOX_FIELDS):
+            columns[name][rows] = detections[:, i]
+        columns["score"][rows] = detections[:, 4]
+        columns["class_id"][rows] = detections[:, 5]
+        self._size += count
+        return count
+
+    def append_chunk(self, source_id, frame_indices, counts, detections, fps=None):
+        """
+        Menambahkan banyak frame sekaligus dalam bentuk kolom: frame_indices (F,), jumlah
+        deteksi per frame counts (F,), dan detections (sum(counts), 6) berurutan per frame.
+        Timestamp = frame_index / fps (0 jika fps tidak diketahui).
+        """
+        count = len(detections)
+        if count == 0:
+            return 0
+        frame_indices = np.repeat(np.asarray(frame_indices, dtype=np.int64), counts)
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        columns = self._columns
+        columns["source"][rows] = self.source_code(source_id)
+        columns["frame_index"][rows] = frame_indices
+        columns["timestamp"][rows] = frame_indices / fps if fps else 0.0
+        for i, name in enumerate(BOX_FIELDS):
+            columns[name][rows] = detections[:, i]
+        columns["score"][rows] = detections[:, 4]
+        columns["class_id"][rows] = detections[:, 5]
+        self._size += count
+        return count
+
+    @classmethod
+    def from_video_detections(cls, source_id, video_detections, fps=None, conf=None):
+        """
+        Rekaman dari VideoDetections: hanya frame yang benar-benar diinferensi (frame lain
+        memakai ulang deteksi frame sebelumnya). fps adalah fps video sumber (default
+        video_detections.source_fps); conf (opsional) menyaring deteksi dengan threshold tersebut.
+        """
+        return video_detections.records.filtered(conf, fps or video_detections.source_fps, source_id)
+
+    def filtered(self, conf=None, fps=None, source_id=None):
+        """
+        Salinan berisi baris dengan skor >= conf (semua baris jika conf None). Jika fps
+        diberikan, timestamp dihitung ulang dari frame_index. source_id (opsional) menjadi
+        satu-satunya sumber semua baris.
+        """
+        columns = self.columns()
+        keep = columns["score"] >= conf if conf is not None else np.ones(self._size, dtype=bool)
+        records = DetectionRecords(0)
+        records._columns = {name: column[keep] for name, column in columns.items()}
+        records._size = int(np.count_nonzero(keep))
+        if fps:
+            records._columns["timestamp"] = records._columns["frame_index"] / fps
+        if source_id is None:
+            records.sources = list(self.sources)
+            records._source_codes = dict(self._source_codes)
+        else:
+            records._columns["source"][:] = records.source_code(source_id)
+        return records
+
+    def detections(self, start=0, stop=None):
+        """
+        Array deteksi (N, 6) float32 [x1, y1, x2, y2, score, class] dari baris start:stop.
+        """
+        stop = self._size if stop is None else stop
+        return np.stack([self._columns[name][start:stop] for name in (*BOX_FIELDS, "score", "class_id")],
+                        axis=1).astype(np.float32, copy=False)
+
+    def clear(self):
+        self._size = 0
+
+    def columns(self):
+        """
+        Dict nama kolom -> array (view, tanpa salinan) berisi baris yang terisi.
+        """
+        return {name: column[:self._size] for name, column in self._columns.items()}
+
+    def to_arrow(self):
+        """
+        pyarrow.Table dengan source_id dan class_name sebagai kolom dictionary.
+        """
+        import pyarrow as pa
+
+        columns = self.columns()
+        class_ids = columns["class_id"]
+        names = list(_class_names())
+        if len(class_ids) and class_ids.max() >= len(names):
+            names += [str(i) for i in range(len(names), int(class_ids.max()) + 1)]
+        arrays = {
+            "source_id": _dictionary(columns["source"], self.sources),
+            "frame_index": columns["frame_index"],
+            "timestamp": columns["timestamp"],
+            "class_id": class_ids,
+            "class_name": _dictionary(class_ids.astype(np.int32), names),
+            "score": columns["score"],
+        }
+        arrays.update((name, columns[name]) for name in BOX_FIELDS)
+        return pa.table(arrays)
+
+    def to_pandas(self):
+        return self.to_arrow().to_pandas()
+
+    def to_parquet(self, path, compression="zstd"):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path, compression=compression)
+
+    def to_csv(self, path):
+        import pyarrow.csv as pacsv
+        pacsv.write_csv(_plain_table(self.to_arrow()), path)
+
+
+def _plain_table(table):
+    # CSV tidak mendukung kolom dictionary: ubah ke string
+    import pyarrow as pa
+
+    schema = pa.schema([pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                        for field in table.schema])
+    return table.cast(schema)
+
+
+class DetectionRecordWriter:
+    """
+    Penulis rekaman deteksi append-only ke Parquet atau CSV (dipilih dari ekstensi path).
+    Baris ditampung di buffer kolom lalu ditulis per row_group_size baris. File ditulis ke
+    path + ".part" dan baru dipindahkan ke path saat close(), sehingga file yang ada selalu lengkap.
+    """
+    def __init__(self, path, row_group_size=None, compression="zstd"):
+        self.path = str(path)
+        self.format = "csv" if self.path.lower().endswith(".csv") else "parquet"
+        self.row_group_size = row_group_size or config.RECORD_ROW_GROUP_SIZE
+        self.compression = compression
+        self.rows = 0
+        self._buffer = DetectionRecords(self.row_group_size)
+        self._writer = None
+        self._part_path = self.path + ".part"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def append(self, source_id, detections, frame_index=0, timestamp=0.0):
+        self.rows += self._buffer.append(source_id, detections, frame_index, timestamp)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def append_chunk(self, source_id, frame_indices, counts, detections, fps=None):
+        self.rows += self._buffer.append_chunk(source_id, frame_indices, counts, detections, fps)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def _open(self, schema):
+        if self.format == "csv":
+            import pyarrow.csv as pacsv
+            return pacsv.CSVWriter(self._part_path, schema)
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self._part_path, schema, compression=self.compression)
+
+    def flush(self):
+        """
+        Menulis isi buffer ke file sebagai satu row group.
+        """
+        if self._writer is not None and len(self._buffer) == 0:
+            return
+        table = self._buffer.to_arrow()
+        if self.format == "csv":
+            table = _plain_table(table)
+        if self._writer is None:
+            self._writer = self._open(table.schema)
+        self._writer.write_table(table)
+        self._buffer.clear()
+
+    def close(self):
+        """
+        Menulis sisa buffer dan menyelesaikan file (file tetap dibuat walau tanpa baris).
+        """
+        self.flush()
+        self._writer.close()
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
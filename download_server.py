@@ -0,0 +1,71 @@
+"""
+Server unduhan hasil deteksi (video, CSV) dari config.DOWNLOAD_DIR.
+
+Handler statis Streamlit (app/static) menolak file di atas 200 MB dan mengirim ekstensi di
+luar daftar amannya (.mp4, .webm, .avi, .csv) sebagai text/plain dengan nosniff, sehingga
+video hasil yang panjang tidak dapat diunduh maupun diputar. Server ini memakai
+tornado.web.StaticFileHandler di thread sendiri (config.DOWNLOAD_PORT):
+  - file dikirim per chunk tanpa batas ukuran, dengan dukungan Range (pemutar <video> dapat seek)
+  - Content-Type sesuai ekstensi file
+  - ?download=1 menambahkan Content-Disposition: attachment (atribut download pada <a>
+    diabaikan browser untuk URL beda origin)
+  - tanpa daftar isi folder; nama folder token acak (spool.new_download_path) berperan
+    sebagai kunci akses
+
+URL file dibuat dengan spool.download_url.
+"""
+import asyncio
+import logging
+import mimetypes
+import os
+import threading
+
+import config
+
+logger = logging.getLogger("download_server")
+
+# Tidak semua sistem mendaftarkan tipe ini di mimetypes
+for _extension, _mime in ((".mp4", "video/mp4"), (".webm", "video/webm"), (".avi", "video/x-msvideo"),
+                          (".csv", "text/csv")):
+    mimetypes.add_type(_mime, _extension)
+
+
+def make_app(directory=None):
+    import tornado.web
+
+    class DownloadHandler(tornado.web.StaticFileHandler):
+        def set_extra_headers(self, path):
+            if self.get_argument("download", None) is not None:
+                self.set_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+
+    directory = str(directory or config.DOWNLOAD_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return tornado.web.Application([(r"/files/(.*)", DownloadHandler, {"path": directory})])
+
+
+def start_download_server(port=None, host=""):
+    """
+    Menjalankan server unduhan di thread latar belakang dengan event loop sendiri.
+    Mengembalikan thread-nya, atau None jika port sudah dipakai proses lain.
+    """
+    from tornado.httpserver import HTTPServer
+    from tornado.netutil import bind_sockets
+
+    port = port or config.DOWNLOAD_PORT
+    try:
+        # Socket dibuka di thread pemanggil agar port yang sudah dipakai langsung terlihat
+        sockets = bind_sockets(port, host or None)
+    except OSError as e:
+        logger.warning("Server unduhan tidak dapat dijalankan di port %s: %s", port, e)
+        return None
+
+    def serve():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        server = HTTPServer(make_app())
+        server.add_sockets(sockets)
+        asyncio.get_event_loop().run_forever()
+
+    thread = threading.Thread(target=serve, name="download-server", daemon=True)
+    thread.start()
+    logger.info("Server unduhan berjalan di port %d", port)
+    return thread
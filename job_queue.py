@@ -0,0 +1,669 @@
+"""
+Antrian job video di latar belakang dengan checkpoint per indeks frame dan resume.
+
+Job disimpan di SQLite (config.JOB_DB_PATH), tanpa broker eksternal. Worker (thread di
+proses Streamlit, atau proses terpisah `python job_queue.py worker`) mengambil job secara
+atomik lalu menjalankan dua fase:
+  1. detect : frame diinferensi per batch; deteksi lengkap (threshold terendah) ditulis
+              ke disk setiap config.JOB_CHECKPOINT_FRAMES frame, bersama indeks frame
+              berikutnya (next_frame) di database. Setelah selesai, semua deteksi ditulis ke
+              detections.parquet di folder job (detection_records.py); jika file itu belum
+              ada saat fase render dimulai, ekspor dijalankan di sana.
+  2. render : video hasil di-encode dari deteksi tersimpan (decode + gambar + encode,
+              tanpa model) langsung ke folder unduhan (lihat spool.py).
+Jika proses mati di tengah job, heartbeat job berhenti diperbarui. Setelah
+config.JOB_STALE_SECONDS, worker lain (atau proses yang baru start) mengambil alih dan
+melanjutkan fase detect dari next_frame. Perubahan threshold setelah job selesai cukup
+menjalankan ulang fase render.
+
+UI hanya mengirim job, membaca progres, dan mengambil artefak yang sudah jadi.
+
+Contoh:
+    python job_queue.py worker --metrics-port 9109
+    python job_queue.py submit data/kebun.mp4 --conf 0.4 --track
+    python job_queue.py status <job_id>
+    python job_queue.py export <job_id> deteksi.csv
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import secrets
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import ExitStack, closing, contextmanager, nullcontext
+
+import cv2
+import numpy as np
+
+import config
+import metrics
+from spool import new_download_path
+from video_output import CODECS, FramePreview, output_filename
+
+logger = logging.getLogger("job_queue")
+
+ACTIVE_STATUSES = ("queued", "running")
+OUTPUT_STEM = "hasil_deteksi_video"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    params TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    output_path TEXT,
+    total_frames INTEGER NOT NULL DEFAULT 0,
+    next_frame INTEGER NOT NULL DEFAULT 0,
+    frames_done INTEGER NOT NULL DEFAULT 0,
+    rendered INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    """
+    Job dibatalkan, diambil alih worker lain, atau worker dihentikan saat job berjalan.
+    """
+
+
+def _remove_output(output_path):
+    # Hapus artefak beserta folder token unduhannya
+    if output_path:
+        shutil.rmtree(os.path.dirname(output_path), ignore_errors=True)
+
+
+def render_key(params):
+    # Hasil render ditentukan oleh threshold dan codec (deteksi job tidak berubah)
+    return f"{params['conf']:.4f}:{params['codec']}"
+
+
+class JobStore:
+    """
+    Tabel job di SQLite. Setiap operasi membuka koneksinya sendiri sehingga aman
+    dipakai dari banyak thread dan proses sekaligus.
+    """
+    def __init__(self, path=None):
+        self.path = str(path or config.JOB_DB_PATH)
+        self.directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(self.directory, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _execute(self, sql, args=()):
+        with closing(self._connect()) as db:
+            return db.execute(sql, args).rowcount
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        # Job yang dibuat sebelum pilihan codec ada memakai codec default
+        job["params"].setdefault("codec", config.VIDEO_OUTPUT_CODEC)
+        job["params"].setdefault("model", config.MODEL_WEIGHTS)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def preview_path(self, job_id):
+        # JPEG pratinjau kecil yang diperbarui worker selama job berjalan
+        return os.path.join(self.job_dir(job_id), "preview.jpg")
+
+    def records_path(self, job_id):
+        # Semua deteksi job (detection_records.py), ditulis setelah fase detect selesai
+        return os.path.join(self.job_dir(job_id), "detections.parquet")
+
+    def submit(self, source_path, conf=0.3, sampler=None, keep_skipped=None, tracking=False, filename=None,
+               codec=None, model=None):
+        """
+        Mendaftarkan job baru. File source_path dipindahkan ke folder job agar tetap ada
+        sampai job dihapus. model adalah nama model di registry model (default
+        config.MODEL_WEIGHTS). Mengembalikan ID job (acak, tidak dapat ditebak).
+        """
+        from utils1 import FrameSampler
+
+        sampler = sampler or FrameSampler.from_config()
+        params = {
+            "conf": conf,
+            "sampling_mode": sampler.mode,
+            "stride": sampler.stride,
+            "target_fps": sampler.target_fps,
+            "keep_skipped": config.VIDEO_ANNOTATE_SKIPPED if keep_skipped is None else bool(keep_skipped),
+            "tracking": bool(tracking),
+            "codec": codec or config.VIDEO_OUTPUT_CODEC,
+            "model": model or config.MODEL_WEIGHTS,
+            "filename": filename or os.path.basename(source_path),
+        }
+
+        job_id = secrets.token_urlsafe(12)
+        directory = self.job_dir(job_id)
+        os.makedirs(directory)
+        job_source = os.path.join(directory, "source" + (os.path.splitext(source_path)[1] or ".mp4"))
+        shutil.move(source_path, job_source)
+
+        now = time.time()
+        self._execute("INSERT INTO jobs (id, status, phase, params, source_path, created_at, updated_at) "
+                      "VALUES (?, 'queued', 'detect', ?, ?, ?, ?)",
+                      (job_id, json.dumps(params), job_source, now, now))
+        return job_id
+
+    def get(self, job_id):
+        with closing(self._connect()) as db:
+            return self._to_job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, limit=50):
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def queued(self):
+        """
+        Jumlah job yang menunggu diambil worker.
+        """
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim(self, worker):
+        """
+        Mengambil job tertua yang menunggu, atau job "running" yang heartbeat-nya sudah
+        basi (workernya mati), dan menandainya milik worker ini. None jika tidak ada.
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?) "
+                                 "ORDER BY created_at LIMIT 1", (now - config.JOB_STALE_SECONDS,)).fetchone()
+                job = None
+                if row is not None:
+                    db.execute("UPDATE jobs SET status = 'running', worker = ?, heartbeat_at = ?, updated_at = ?, "
+                               "error = NULL WHERE id = ?", (worker, now, now, row["id"]))
+                    job = db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return self._to_job(job)
+
+    def update(self, job_id, worker, **fields):
+        """
+        Memperbarui progres job milik worker sekaligus heartbeat-nya. JobCancelled jika
+        job sudah tidak dipegang worker ini (dibatalkan atau diambil alih).
+        """
+        fields["heartbeat_at"] = fields["updated_at"] = time.time()
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        updated = self._execute(f"UPDATE jobs SET {assignments} WHERE id = ? AND worker = ? AND status = 'running'",
+                                (*fields.values(), job_id, worker))
+        if not updated:
+            raise JobCancelled(job_id)
+
+    def finish(self, job_id, worker, output_path, result):
+        self.update(job_id, worker, status="done", phase="done", output_path=output_path, result=result)
+
+    def fail(self, job_id, worker, error):
+        try:
+            self.update(job_id, worker, status="failed", error=error)
+        except JobCancelled:
+            pass
+
+    def release(self, job_id, worker):
+        """
+        Mengembalikan job ke antrian (worker berhenti); dilanjutkan dari checkpoint terakhir.
+        """
+        self._execute("UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? "
+                      "WHERE id = ? AND worker = ? AND status = 'running'", (time.time(), job_id, worker))
+
+    def cancel(self, job_id):
+        return bool(self._execute("UPDATE jobs SET status = 'cancelled', updated_at = ? "
+                                  "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id)))
+
+    def rerender(self, job_id, conf, codec=None):
+        """
+        Menjalankan ulang fase render job yang sudah selesai dengan threshold/codec baru.
+        Deteksi tersimpan dipakai ulang, model tidak dijalankan lagi. Jika kombinasi yang
+        sama pernah di-render dan filenya masih ada, hasil itu langsung dipakai tanpa encode.
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] != "done":
+            return False
+        params = {**job["params"], "conf": conf, "codec": codec or job["params"]["codec"]}
+        renders = job["result"].get("renders", {})
+        cached = renders.get(render_key(params))
+        if cached and os.path.exists(cached["output_path"]):
+            result = {**cached, "renders": renders}
+            return bool(self._execute("UPDATE jobs SET params = ?, output_path = ?, result = ?, updated_at = ? "
+                                      "WHERE id = ? AND status = 'done'",
+                                      (json.dumps(params), cached["output_path"], json.dumps(result), time.time(),
+                                       job_id)))
+        return bool(self._execute("UPDATE jobs SET status = 'queued', phase = 'render', params = ?, rendered = 0, "
+                                  "worker = NULL, updated_at = ? WHERE id = ? AND status = 'done'",
+                                  (json.dumps(params), time.time(), job_id)))
+
+    def purge(self, max_age=None):
+        """
+        Menghapus job selesai/gagal yang lebih tua dari max_age detik (default
+        config.JOB_MAX_AGE) dan job yang dibatalkan, beserta semua filenya.
+        """
+        now = time.time()
+        max_age = config.JOB_MAX_AGE if max_age is None else max_age
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT id, output_path, result FROM jobs WHERE (status IN ('done', 'failed') AND updated_at < ?) "
+                              "OR (status = 'cancelled' AND updated_at < ?)",
+                              (now - max_age, now - config.JOB_STALE_SECONDS)).fetchall()
+            for row in rows:
+                shutil.rmtree(self.job_dir(row["id"]), ignore_errors=True)
+                _remove_output(row["output_path"])
+                renders = json.loads(row["result"]).get("renders", {}) if row["result"] else {}
+                for render in renders.values():
+                    _remove_output(render["output_path"])
+                db.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        return len(rows)
+
+
+def save_checkpoint(directory, video_detections):
+    """
+    Menulis satu potongan deteksi (VideoDetections) ke disk secara atomik.
+    """
+    path = os.path.join(directory, f"detections_{video_detections.frame_indices[0]:09d}.npz")
+    detections = [frame_detections for _, frame_detections, _ in video_detections.frames()]
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f, indices=np.array(video_detections.frame_indices, dtype=np.int64),
+                 inferred=np.array(video_detections.inferred, dtype=bool),
+                 counts=np.array([len(d) for d in detections], dtype=np.int64),
+                 detections=np.concatenate(detections).astype(np.float32) if detections else np.zeros((0, 6), np.float32))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoints(directory, next_frame):
+    """
+    Memuat semua potongan deteksi sebelum next_frame menjadi satu VideoDetections.
+    Potongan sesudahnya (ditulis tepat sebelum proses mati, belum tercatat di database)
+    dihapus karena akan dideteksi ulang.
+    """
+    from utils1 import VideoDetections
+
+    video_detections = VideoDetections()
+    for path in glob.glob(os.path.join(directory, "detections_*.npz.tmp")):
+        os.remove(path)
+    for path in sorted(glob.glob(os.path.join(directory, "detections_*.npz"))):
+        with np.load(path) as chunk:
+            if len(chunk["indices"]) == 0 or chunk["indices"][0] >= next_frame:
+                os.remove(path)
+                continue
+            for index, inferred, detections in zip(chunk["indices"], chunk["inferred"],
+                                                   np.split(chunk["detections"], np.cumsum(chunk["counts"])[:-1])):
+                video_detections.add(int(index), detections, bool(inferred))
+    return video_detections
+
+
+def export_records(job, directory, path):
+    """
+    Menulis deteksi semua frame yang diinferensi dari potongan checkpoint job ke file
+    Parquet/CSV. Potongan dibaca satu per satu dan ditulis append-only, tanpa memuat
+    seluruh deteksi job ke memori. Mengembalikan jumlah baris.
+    """
+    from detection_records import DetectionRecordWriter
+
+    cap = cv2.VideoCapture(job["source_path"])
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    with DetectionRecordWriter(path) as writer:
+        for chunk_path in sorted(glob.glob(os.path.join(directory, "detections_*.npz"))):
+            with np.load(chunk_path) as chunk:
+                # Frame yang dilewati sampler memakai ulang deteksi sebelumnya: tidak dicatat lagi
+                inferred = chunk["inferred"]
+                detections = chunk["detections"][np.repeat(inferred, chunk["counts"])]
+                writer.append_chunk(job["params"]["filename"], chunk["indices"][inferred], chunk["counts"][inferred],
+                                    detections, fps)
+    return writer.rows
+
+
+def _open_source(job):
+    # Video sumber job dan FrameSampler sesuai parameter job
+    from utils1 import FrameSampler
+
+    cap = cv2.VideoCapture(job["source_path"])
+    if not cap.isOpened():
+        cap.release()
+        raise IOError("Gagal membuka file video. Pastikan format video didukung dan file tidak rusak.")
+    params = job["params"]
+    sampler = FrameSampler(params["sampling_mode"], params["stride"], params["target_fps"])
+    return cap, sampler.bind(cap.get(cv2.CAP_PROP_FPS))
+
+
+def _output_fps(job, sampler):
+    return sampler.source_fps if job["params"]["keep_skipped"] else sampler.output_fps(sampler.source_fps)
+
+
+class JobWorker:
+    """
+    Thread yang mengambil job dari JobStore dan menjalankannya satu per satu.
+
+        worker = JobWorker(model).start() # model tetap untuk semua job
+        worker = JobWorker(None).start()  # model tiap job dipinjam dari registry model
+        ...
+        worker.stop() # job yang sedang berjalan dikembalikan ke antrian
+    """
+    def __init__(self, model, store=None, poll_interval=None, batch_size=None):
+        self.model = model
+        self.store = store or JobStore()
+        self.poll_interval = poll_interval or config.JOB_POLL_INTERVAL
+        self.batch_size = max(1, int(batch_size or config.VIDEO_BATCH_SIZE))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._stop_event = threading.Event()
+        self._thread = None
+        metrics.register_queue("video_jobs", self.store.queued)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="video-job-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self):
+        while self._thread.is_alive():
+            self._thread.join(1)
+
+    def _loop(self):
+        self.store.purge()
+        while not self._stop_event.is_set():
+            try:
+                job = self.store.claim(self.worker_id)
+            except sqlite3.Error:
+                logger.exception("Gagal mengambil job dari antrian")
+                job = None
+            if job is None:
+                self._stop_event.wait(self.poll_interval)
+                continue
+            self.run(job)
+            self.store.purge()
+
+    def run(self, job):
+        """
+        Menjalankan satu job yang sudah di-claim sampai selesai, gagal, atau dibatalkan.
+        """
+        logger.info("Menjalankan job %s (fase %s, mulai frame %d)", job["id"], job["phase"], job["next_frame"])
+        try:
+            if job["phase"] == "detect":
+                with ExitStack() as stack:
+                    # Memuat model (torch dingin) bisa lebih lama dari JOB_STALE_SECONDS
+                    with self._heartbeat(job):
+                        model = stack.enter_context(self._acquire_model(job))
+                    video_detections = self._detect(job, model)
+            else:
+                video_detections = load_checkpoints(self.store.job_dir(job["id"]), job["next_frame"])
+            # Juga di fase render: worker bisa mati setelah fase detect selesai, sebelum ekspor
+            records_path = self.store.records_path(job["id"])
+            if not os.path.exists(records_path):
+                export_records(job, self.store.job_dir(job["id"]), records_path)
+            self._render(job, video_detections)
+        except JobCancelled:
+            logger.info("Job %s dihentikan", job["id"])
+        except Exception as e:
+            logger.exception("Job %s gagal", job["id"])
+            self.store.fail(job["id"], self.worker_id, f"{type(e).__name__}: {e}")
+
+    def _check_stop(self, job):
+        if self._stop_event.is_set():
+            self.store.release(job["id"], self.worker_id)
+            raise JobCancelled(job["id"])
+
+    @contextmanager
+    def _heartbeat(self, job):
+        # Heartbeat dari thread terpisah selama operasi panjang tanpa titik progres
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(config.JOB_HEARTBEAT_SECONDS):
+                try:
+                    self.store.update(job["id"], self.worker_id)
+                except JobCancelled:
+                    return
+                except sqlite3.Error:
+                    logger.warning("Gagal memperbarui heartbeat job %s", job["id"], exc_info=True)
+
+        thread = threading.Thread(target=beat, name="video-job-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _acquire_model(self, job):
+        if self.model is not None:
+            return nullcontext(self.model)
+        from model_registry import get_model_registry
+        return get_model_registry().acquire(job["params"]["model"])
+
+    def _detect(self, job, model):
+        from utils1 import VideoDetections, detect_frames, filter_detections, inference_conf, pair_batch_results, read_frame_batches
+
+        params = job["params"]
+        directory = self.store.job_dir(job["id"])
+        cap, sampler = _open_source(job)
+        keep_skipped = params["keep_skipped"]
+        video_detections = load_checkpoints(directory, job["next_frame"])
+        last_detections = video_detections.frame_detections(-1) if len(video_detections) else None
+        position = job["next_frame"]
+        self.store.update(job["id"], self.worker_id, total_frames=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                          frames_done=position)
+
+        chunk = VideoDetections()
+        preview = FramePreview()
+        last_update = time.monotonic()
+        try:
+            for batch in metrics.instrument_iter("decode", read_frame_batches(cap, self.batch_size, sampler,
+                                                                              keep_skipped, start=position)):
+                self._check_stop(job)
+                batch_detections = detect_frames(model, [frame for _, frame, infer in batch if infer],
+                                            inference_conf(params["conf"]))
+                pairs = pair_batch_results(batch, batch_detections, last_detections)
+                last_detections = pairs[-1][2]
+                for index, _, detections, infer in pairs:
+                    chunk.add(index, detections, infer)
+                metrics.count_frames("job", len(pairs))
+                position = pairs[-1][0] + 1
+                if preview.due():
+                    _, frame, detections, _ = pairs[-1]
+                    self._write_preview(job, preview.update(frame, filter_detections(detections, params["conf"])))
+
+                if len(chunk) >= config.JOB_CHECKPOINT_FRAMES:
+                    self._checkpoint(job, directory, chunk, video_detections, position)
+                    chunk = VideoDetections()
+                    last_update = time.monotonic()
+                elif time.monotonic() - last_update >= config.JOB_HEARTBEAT_SECONDS:
+                    self.store.update(job["id"], self.worker_id, frames_done=position)
+                    last_update = time.monotonic()
+            if len(chunk):
+                self._checkpoint(job, directory, chunk, video_detections, position)
+        finally:
+            cap.release()
+
+        video_detections.fps = _output_fps(job, sampler)
+        self.store.update(job["id"], self.worker_id, phase="render", frames_done=position)
+        return video_detections
+
+    def _write_preview(self, job, image):
+        path = self.store.preview_path(job["id"])
+        with open(path + ".tmp", "wb") as f:
+            f.write(image)
+        os.replace(path + ".tmp", path)
+
+    def _checkpoint(self, job, directory, chunk, video_detections, position):
+        # Tulis potongan ke disk dulu, baru catat next_frame: checkpoint yang tercatat selalu lengkap
+        save_checkpoint(directory, chunk)
+        for index, detections, infer in chunk.frames():
+            video_detections.add(index, detections, infer)
+        self.store.update(job["id"], self.worker_id, next_frame=chunk.frame_indices[-1] + 1, frames_done=position)
+
+    def _render(self, job, video_detections):
+        from tracker import ObjectTracker
+        from utils1 import class_names, render_video_detections
+
+        params = job["params"]
+        if video_detections.fps is None:
+            cap, sampler = _open_source(job)
+            cap.release()
+            video_detections.fps = _output_fps(job, sampler)
+
+        output_path = new_download_path(output_filename(OUTPUT_STEM, params["codec"]))
+        partial_path = os.path.join(os.path.dirname(output_path), output_filename("render.part", params["codec"]))
+        tracker = ObjectTracker(len(class_names)) if params["tracking"] else None
+        self.store.update(job["id"], self.worker_id, phase="render", rendered=0, total_frames=len(video_detections))
+
+        rendered = 0
+        preview = FramePreview()
+        frames = render_video_detections(job["source_path"], video_detections, params["conf"], partial_path, tracker,
+                                         params["codec"])
+        try:
+            last_update = time.monotonic()
+            for frame in frames:
+                rendered += 1
+                if preview.due():
+                    self._write_preview(job, preview.update(frame))
+                if time.monotonic() - last_update >= config.JOB_HEARTBEAT_SECONDS:
+                    self._check_stop(job)
+                    self.store.update(job["id"], self.worker_id, rendered=rendered)
+                    last_update = time.monotonic()
+        except BaseException:
+            frames.close()
+            _remove_output(output_path)
+            raise
+        frames.close()
+        os.replace(partial_path, output_path)
+
+        render = {
+            "output_path": output_path,
+            "codec": params["codec"],
+            "frames": rendered,
+            "inferred_frames": int(sum(video_detections.inferred)),
+            "unique_counts": tracker.unique_counts(class_names) if tracker is not None else None,
+        }
+        # Cache hasil render per threshold/codec; yang tertua dihapus jika melebihi batas
+        renders = dict((job["result"] or {}).get("renders", {}))
+        renders.pop(render_key(params), None)
+        renders[render_key(params)] = render
+        evicted = list(renders)[:-max(1, config.VIDEO_RENDER_CACHE_SIZE)]
+        evicted_paths = [renders.pop(key)["output_path"] for key in evicted]
+        try:
+            self.store.finish(job["id"], self.worker_id, output_path, {**render, "renders": renders})
+        except JobCancelled:
+            _remove_output(output_path)
+            raise
+        for path in evicted_paths:
+            _remove_output(path)
+
+
+def _print_job(job):
+    progress = f"{job['frames_done']}/{job['total_frames']}" if job["phase"] == "detect" else \
+        f"{job['rendered']}/{job['total_frames']}"
+    print(f"{job['id']}  {job['status']:<9} {job['phase']:<6} {progress:>13}  {job['params']['filename']}")
+    if job["error"]:
+        print(f"    error: {job['error']}")
+    if job["status"] == "done":
+        print(f"    hasil: {job['output_path']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Antrian job deteksi video di latar belakang.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="Menjalankan worker sampai dihentikan (Ctrl+C)")
+    worker_parser.add_argument("--backend", default=config.MODEL_BACKEND)
+    worker_parser.add_argument("--weights", help="Bobot tetap untuk semua job (default: model pilihan tiap job "
+                                                "dimuat lewat registry model)")
+    worker_parser.add_argument("--metrics-port", type=int, default=0,
+                               help="Port server GET /metrics Prometheus (0 = tidak dijalankan)")
+
+    submit_parser = subparsers.add_parser("submit", help="Mengirim video ke antrian")
+    submit_parser.add_argument("video")
+    submit_parser.add_argument("--conf", type=float, default=0.3)
+    submit_parser.add_argument("--track", action="store_true", help="Lacak TBS dan hitung jumlah unik")
+    submit_parser.add_argument("--codec", choices=sorted(CODECS), default=config.VIDEO_OUTPUT_CODEC)
+    submit_parser.add_argument("--model", default=config.MODEL_WEIGHTS, help="Nama model di registry model")
+
+    status_parser = subparsers.add_parser("status", help="Menampilkan status job (semua job jika tanpa ID)")
+    status_parser.add_argument("job_id", nargs="?")
+
+    cancel_parser = subparsers.add_parser("cancel", help="Membatalkan job")
+    cancel_parser.add_argument("job_id")
+
+    export_parser = subparsers.add_parser("export", help="Menyimpan deteksi job ke Parquet/CSV (dari ekstensi path)")
+    export_parser.add_argument("job_id")
+    export_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    store = JobStore()
+    if args.command == "worker":
+        from backends import load_backend
+
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        metrics.start_http_server(args.metrics_port)
+        model = load_backend(args.backend, args.weights) if args.weights else None
+        worker = JobWorker(model, store).start()
+        try:
+            worker.join()
+        except KeyboardInterrupt:
+            worker.stop()
+    elif args.command == "submit":
+        # Video asli tetap ada; salinannya yang dipindahkan ke folder job
+        extension = os.path.splitext(args.video)[1]
+        copy_path = os.path.join(store.directory, f"upload_{secrets.token_hex(8)}{extension}")
+        shutil.copyfile(args.video, copy_path)
+        print(store.submit(copy_path, args.conf, tracking=args.track, filename=os.path.basename(args.video),
+                           codec=args.codec, model=args.model))
+    elif args.command == "status":
+        jobs = [store.get(args.job_id)] if args.job_id else store.list()
+        if not jobs or jobs[0] is None:
+            print("Job tidak ditemukan.")
+            return 1
+        for job in jobs:
+            _print_job(job)
+    elif args.command == "cancel":
+        if not store.cancel(args.job_id):
+            print("Job tidak ditemukan atau sudah selesai.")
+            return 1
+    elif args.command == "export":
+        job = store.get(args.job_id)
+        if job is None:
+            print("Job tidak ditemukan.")
+            return 1
+        print(f"{export_records(job, store.job_dir(job['id']), args.path)} deteksi ditulis ke {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Deteksi live dari webcam atau stream RTSP/HTTP.
+
+Frame dibaca terus-menerus oleh thread terpisah yang hanya menyimpan frame terbaru.
+Jika inferensi lebih lambat dari kamera, frame lama yang belum sempat diproses dibuang,
+sehingga latensi (waktu tangkap sampai hasil anotasi siap) tetap terbatas dan tidak
+menumpuk seperti pada loop cap.read() biasa.
+
+Sumber dapat berupa indeks kamera ("0"), URL RTSP/HTTP, atau file video lokal yang
+diputar berulang sesuai FPS aslinya (untuk pengujian tanpa kamera).
+
+Contoh:
+    python live_stream.py 0 --conf 0.4
+    python live_stream.py rtsp://10.0.0.5/stream1 --output rekaman.mp4
+    python live_stream.py data/contoh.mp4 --duration 30
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+import config
+import metrics
+
+
+def open_capture(source):
+    """
+    Membuka sumber live: indeks kamera (angka) atau URL/path.
+    """
+    source = str(source)
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Sumber live '{source}' tidak dapat dibuka.")
+    # Buffer driver sekecil mungkin agar frame yang dibaca adalah frame terbaru
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class LatestFrameReader:
+    """
+    Thread pembaca yang hanya menyimpan frame terbaru. Frame yang tertimpa sebelum
+    diambil oleh read() dihitung sebagai frame yang dibuang.
+    """
+    def __init__(self, source, loop=None):
+        self.source = str(source)
+        self.is_file = os.path.isfile(self.source)
+        self.loop = self.is_file if loop is None else loop
+        self.cap = open_capture(source)
+        self.captured = 0
+        self.dropped = 0
+
+        # File video dibaca sesuai FPS aslinya agar berperilaku seperti kamera
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self._frame_interval = 1 / fps if self.is_file and fps and fps > 0 else 0
+
+        self._frame = None
+        self._captured_at = None
+        self._sequence = 0
+        self._taken = 0
+        self._ended = False
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-reader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        rewound = False
+        try:
+            while not self._stop_event.is_set():
+                ok, frame = self.cap.read()
+                if not ok:
+                    if self.loop and self.is_file and not rewound:
+                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        rewound = True
+                        continue
+                    break
+                rewound = False
+                captured_at = time.perf_counter()
+
+                with self._condition:
+                    if self._sequence > self._taken:
+                        self.dropped += 1
+                    self._frame = frame
+                    self._captured_at = captured_at
+                    self._sequence += 1
+                    self.captured += 1
+                    self._condition.notify_all()
+
+                if self._frame_interval:
+                    next_time += self._frame_interval
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+                    else:
+                        next_time = time.perf_counter()
+        finally:
+            self.cap.release()
+            with self._condition:
+                self._ended = True
+                self._condition.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Frame terbaru yang belum diambil: (frame BGR, waktu tangkap perf_counter),
+        atau None jika stream berakhir. TimeoutError jika tidak ada frame baru.
+        """
+        timeout = config.LIVE_READ_TIMEOUT if timeout is None else timeout
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._sequence > self._taken or self._ended, timeout):
+                raise TimeoutError(f"Tidak ada frame baru dari '{self.source}' selama {timeout} detik.")
+            if self._sequence <= self._taken:
+                return None
+            self._taken = self._sequence
+            return self._frame, self._captured_at
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=config.LIVE_READ_TIMEOUT)
+
+
+class LiveStats:
+    """
+    FPS dan latensi end-to-end dari window frame terakhir.
+    """
+    def __init__(self, window=None):
+        window = window or config.LIVE_STATS_WINDOW
+        self.frames = 0
+        self._times = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+
+    def update(self, captured_at):
+        now = time.perf_counter()
+        self.frames += 1
+        self._times.append(now)
+        self._latencies.append((now - captured_at) * 1000)
+
+    @property
+    def fps(self):
+        if len(self._times) < 2:
+            return 0.0
+        return (len(self._times) - 1) / (self._times[-1] - self._times[0])
+
+    def summary(self):
+        return {
+            "frames": self.frames,
+            "fps": self.fps,
+            "latency_ms": self._latencies[-1] if self._latencies else 0.0,
+            "latency_p95_ms": float(np.percentile(self._latencies, 95)) if self._latencies else 0.0,
+        }
+
+
+def detect_frame(model, frame, conf=0.3):
+    """
+    Deteksi satu frame lewat scheduler micro-batching (jika aktif) agar model yang
+    dipakai bersama tidak dipanggil dari banyak thread sekaligus.
+    """
+    from utils1 import detect_frames
+    return detect_frames(model, [frame], conf)[0]
+
+
+class LiveDetector:
+    """
+    Deteksi pada frame terbaru dari sumber live.
+
+        with LiveDetector("0", model, conf=0.3) as live:
+            for annotated_bgr, stats in live.frames():
+                ...
+    """
+    def __init__(self, source, model, conf=0.3, loop=None):
+        self.model = model
+        self.conf = conf
+        self.stats = LiveStats()
+        self.reader = LatestFrameReader(source, loop)
+
+    def frames(self):
+        """
+        Generator (frame BGR beranotasi, statistik). Berhenti saat stream berakhir.
+        """
+        from utils1 import class_colors, class_names, draw_boxes_on_frame
+
+        while True:
+            item = self.reader.read()
+            if item is None:
+                return
+            frame, captured_at = item
+            detections = detect_frame(self.model, frame, self.conf)
+            annotated = draw_boxes_on_frame(frame, detections, class_names, class_colors, inplace=True)
+            self.stats.update(captured_at)
+            metrics.count_frames("live")
+            yield annotated, self.summary()
+
+    def summary(self):
+        return {**self.stats.summary(), "captured": self.reader.captured, "dropped": self.reader.dropped}
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    from backends import load_backend
+    from utils1 import open_video_writer
+
+    parser = argparse.ArgumentParser(description="Deteksi kematangan TBS dari webcam atau stream RTSP/HTTP.")
+    parser.add_argument("source", nargs="?", default=config.LIVE_SOURCE,
+                        help="Indeks kamera, URL RTSP/HTTP, atau file video (diputar berulang)")
+    parser.add_argument("--conf", type=float, default=0.3, help="Confidence threshold")
+    parser.add_argument("--backend", default=config.MODEL_BACKEND)
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    parser.add_argument("--no-loop", action="store_true", help="File video tidak diputar berulang")
+    parser.add_argument("--duration", type=float, help="Berhenti setelah N detik")
+    parser.add_argument("--output", help="Simpan frame hasil deteksi ke file video")
+    parser.add_argument("--show", action="store_true", help="Tampilkan jendela OpenCV (tekan q untuk berhenti)")
+    args = parser.parse_args(argv)
+
+    model = load_backend(args.backend, args.weights)
+    writer = None
+    started = time.perf_counter()
+    last_report = started
+    try:
+        with LiveDetector(args.source, model, conf=args.conf, loop=False if args.no_loop else None) as live:
+            for annotated, stats in live.frames():
+                if args.output:
+                    if writer is None:
+                        height, width = annotated.shape[:2]
+                        writer = open_video_writer(args.output, config.LIVE_OUTPUT_FPS, width, height)
+                    writer.write(annotated)
+                if args.show:
+                    cv2.imshow("Deteksi TBS", annotated)
+                    if cv2.waitKey(1) == ord("q"):
+                        break
+
+                now = time.perf_counter()
+                if now - last_report >= 1:
+                    print(f"FPS {stats['fps']:5.1f} | latensi {stats['latency_ms']:6.1f} ms "
+                          f"(p95 {stats['latency_p95_ms']:6.1f}) | dibuang {stats['dropped']}")
+                    last_report = now
+                if args.duration and now - started >= args.duration:
+                    break
+            summary = live.summary()
+    except KeyboardInterrupt:
+        summary = None
+    finally:
+        if writer is not None:
+            writer.release()
+        if args.show:
+            cv2.destroyAllWindows()
+
+    if summary:
+        print(f"Selesai: {summary['frames']} frame diproses, {summary['captured']} ditangkap, "
+              f"{summary['dropped']} dibuang.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Metrik ringan untuk pipeline deteksi, diekspos dalam format teks Prometheus.
+
+Yang dicatat:
+  tbs_stage_seconds{stage}          histogram latensi per panggilan tahap: detect_image, image_e2e,
+                                    video_e2e, decode (per batch frame), inference (per panggilan
+                                    model), draw, encode (per frame). Waktu memuat model dicatat
+                                    di tbs_model_load_seconds.
+  tbs_frames_total{stage}           frame yang diinferensi model (inference) dan frame yang selesai
+                                    diproses per sumber (video, job, live)
+  tbs_detections_total{class}       deteksi hasil inferensi per kelas (threshold config.MIN_CONFIDENCE)
+  tbs_model_load_seconds{backend}   histogram waktu memuat model di registry
+  tbs_queue_depth{queue}            isi antrian saat metrik dibaca (scheduler micro-batching,
+                                    pipeline video, job video, API)
+
+Endpoint: GET /metrics di api_server.py, dan server HTTP kecil (start_http_server) untuk
+aplikasi Streamlit (config.METRICS_PORT) dan worker job (python job_queue.py worker --metrics-port).
+
+Jika config.METRICS_ENABLED = False, decorator timed() mengembalikan fungsi aslinya dan
+instrument_*() mengembalikan objek aslinya, sehingga tidak ada biaya tambahan di jalur panas.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+logger = logging.getLogger("metrics")
+
+ENABLED = config.METRICS_ENABLED
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets or config.METRICS_BUCKETS))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # Bucket pertama yang memuat value (bukan kumulatif); dijumlahkan saat render
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class GaugeFunction:
+    """
+    Gauge yang nilainya dibaca dari fungsi saat metrik di-render (tanpa biaya di jalur panas).
+    """
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def register(self, function, *label_values):
+        with self._lock:
+            self._functions[label_values] = function
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            functions = sorted(self._functions.items())
+        for key, function in functions:
+            try:
+                value = function()
+            except Exception:
+                logger.exception("Gagal membaca gauge %s%s", self.name, key)
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+stage_seconds = Histogram("tbs_stage_seconds", "Latensi per panggilan tahap pipeline deteksi (detik)", ("stage",))
+frames_total = Counter("tbs_frames_total", "Jumlah frame yang diproses per tahap", ("stage",))
+detections_total = Counter("tbs_detections_total",
+                           "Jumlah deteksi hasil inferensi per kelas (sebelum threshold slider)", ("class",))
+model_load_seconds = Histogram("tbs_model_load_seconds", "Waktu memuat model (detik)", ("backend",))
+queue_depth = GaugeFunction("tbs_queue_depth", "Jumlah item yang sedang menunggu di antrian", ("queue",))
+
+METRICS = (stage_seconds, frames_total, detections_total, model_load_seconds, queue_depth)
+
+
+def render():
+    """
+    Semua metrik dalam format teks Prometheus.
+    """
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def observe_stage(stage, seconds):
+    if ENABLED:
+        stage_seconds.observe(seconds, stage)
+
+
+def count_frames(stage, frames=1):
+    if ENABLED:
+        frames_total.inc(frames, stage)
+
+
+def count_detections(detections):
+    """
+    Menambah tbs_detections_total per kelas dari array deteksi (N, 6).
+    """
+    if not ENABLED or len(detections) == 0:
+        return
+    import numpy as np
+    from utils1 import class_names
+
+    classes, counts = np.unique(detections[:, 5].astype(np.int64), return_counts=True)
+    for class_id, count in zip(classes, counts):
+        class_id = int(class_id)
+        name = class_names[class_id] if 0 <= class_id < len(class_names) else str(class_id)
+        detections_total.inc(int(count), name)
+
+
+def register_queue(name, function):
+    """
+    Mendaftarkan fungsi yang mengembalikan isi antrian name; dibaca setiap kali metrik di-render.
+    """
+    if ENABLED:
+        queue_depth.register(function, name)
+
+
+def timed(stage):
+    """
+    Decorator: mencatat durasi setiap panggilan fungsi di tbs_stage_seconds{stage}. Untuk
+    fungsi generator, durasi dihitung dari item pertama diminta sampai generator selesai.
+    Jika metrik dimatikan, fungsi dikembalikan apa adanya.
+    """
+    def decorator(function):
+        if not ENABLED:
+            return function
+
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    yield from function(*args, **kwargs)
+                finally:
+                    stage_seconds.observe(time.perf_counter() - start, stage)
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stage_seconds.observe(time.perf_counter() - start, stage)
+        return wrapper
+    return decorator
+
+
+def instrument_iter(stage, iterator):
+    """
+    Iterator yang mencatat waktu menghasilkan setiap item (misalnya satu batch frame hasil decode).
+    """
+    if not ENABLED:
+        return iterator
+
+    def timed_items():
+        items = iter(iterator)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                stage_seconds.observe(time.perf_counter() - start, stage)
+                yield item
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    return timed_items()
+
+
+class _TimedWriter:
+    def __init__(self, writer):
+        self._writer = writer
+
+    def isOpened(self):
+        return self._writer.isOpened()
+
+    def write(self, frame):
+        start = time.perf_counter()
+        self._writer.write(frame)
+        stage_seconds.observe(time.perf_counter() - start, "encode")
+
+    def release(self):
+        self._writer.release()
+
+
+def instrument_writer(writer):
+    """
+    Penulis video (antarmuka cv2.VideoWriter) yang mencatat waktu encode per frame.
+    """
+    return _TimedWriter(writer) if ENABLED else writer
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host=""):
+    """
+    Menjalankan server GET /metrics di thread latar belakang. Mengembalikan server, atau
+    None jika metrik dimatikan atau port sudah dipakai proses lain.
+    """
+    if not ENABLED or not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Server metrik tidak dapat dijalankan di port %s: %s", port, e)
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Metrik tersedia di http://%s:%d/metrics", host or "0.0.0.0", port)
+    return server
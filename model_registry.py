@@ -0,0 +1,336 @@
+"""
+Registry model deteksi bersama untuk seluruh proses (sesi Streamlit, worker job, API).
+
+Model yang dapat dipilih adalah config.MODEL_WEIGHTS dan config.DETECTION_MODEL_LIST
+(lihat model_names). Model dimuat saat pertama diminta lalu dipakai bersama oleh semua
+pemakai; pemakaian dicatat sebagai pinjaman selama permintaan berjalan:
+
+    registry = get_model_registry()
+    with registry.acquire("best.pt") as model:
+        detections = detect_image_all(image_file, model)
+
+Hot-swap: swap() memuat bobot baru di luar lock, lalu mengganti model dalam satu langkah.
+Permintaan yang sedang berjalan selesai dengan model lama, dan model lama (beserta
+scheduler micro-batching-nya) dilepas setelah pinjaman terakhirnya dikembalikan. File bobot
+yang ditimpa di disk terdeteksi dari mtime-nya (setiap config.MODEL_RELOAD_CHECK_SECONDS)
+dan dimuat ulang di background dengan cara yang sama.
+
+Model yang tidak dipinjam lebih lama dari config.MODEL_IDLE_SECONDS dilepas, kecuali model
+default. Jika total perkiraan memori model melebihi config.MODEL_MEMORY_BUDGET, model tanpa
+pinjaman dilepas mulai dari yang paling lama tidak dipakai (model default terakhir).
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import config
+import metrics
+
+logger = logging.getLogger("model_registry")
+
+
+def model_names():
+    """
+    Nama model yang dapat dipilih: model default lalu isi config.DETECTION_MODEL_LIST yang
+    file bobotnya ada di disk.
+    """
+    names = [config.MODEL_WEIGHTS]
+    names += [name for name in config.DETECTION_MODEL_LIST if name not in names and find_weights(name)]
+    return names
+
+
+def find_weights(name):
+    """
+    Path file bobot untuk nama model, dicari di config.DETECTION_MODEL_DIR, folder proyek
+    (config.ROOT), lalu relatif terhadap folder kerja. None jika tidak ada.
+    """
+    for candidate in (os.path.join(config.DETECTION_MODEL_DIR, name), os.path.join(config.ROOT, name), name):
+        if os.path.exists(candidate):
+            return str(candidate)
+    return None
+
+
+def resolve_weights(name):
+    """
+    Seperti find_weights, tetapi FileNotFoundError jika bobot tidak ada. Nama yang tidak
+    ditemukan tidak diteruskan ke ultralytics, yang akan mengunduh bobot resmi (COCO, 80 kelas).
+    """
+    path = find_weights(name)
+    if path is None:
+        raise FileNotFoundError(f"File bobot model '{name}' tidak ditemukan di {config.DETECTION_MODEL_DIR}, "
+                                f"{config.ROOT} maupun folder kerja.")
+    return path
+
+
+def _load(backend, weights):
+    from backends import load_backend
+    return load_backend(backend, weights)
+
+
+def _path_bytes(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def model_bytes(model, weights=None):
+    """
+    Perkiraan memori model: ukuran parameter dan buffer untuk model PyTorch, ukuran file
+    model untuk backend ONNX/OpenVINO.
+    """
+    module = getattr(model, "model", None)
+    if hasattr(module, "parameters") and hasattr(module, "buffers"):
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    path = getattr(model, "model_path", None) or weights
+    return _path_bytes(path) if path else 0
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class _Entry:
+    def __init__(self, key, weights, model):
+        self.key = key
+        self.weights = weights
+        self.model = model
+        self.mtime = _mtime(weights)
+        self.size_bytes = model_bytes(model, weights)
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.last_check = time.monotonic()
+        self.leases = 0
+        self.retired = False
+        self.reloading = False
+
+
+class ModelRegistry:
+    """
+    Model bersama per (nama, backend). Aman dipakai lintas thread: pemuatan model yang
+    sama hanya terjadi sekali, pemuatan model berbeda dapat berjalan bersamaan.
+    """
+    def __init__(self, loader=None, memory_budget=None, idle_seconds=None, reload_interval=None):
+        self.loader = loader or _load
+        self.memory_budget = config.MODEL_MEMORY_BUDGET if memory_budget is None else memory_budget
+        self.idle_seconds = config.MODEL_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.reload_interval = config.MODEL_RELOAD_CHECK_SECONDS if reload_interval is None else reload_interval
+
+        self.loads = 0
+        self.swaps = 0
+        self.evictions = 0
+        self._entries = {}
+        # Entri yang sudah diganti/dilepas tetapi masih dipinjam permintaan yang sedang berjalan
+        self._retired = []
+        self._load_locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name=None, backend=None):
+        return name or config.MODEL_WEIGHTS, backend or config.MODEL_BACKEND
+
+    def _create(self, key, weights=None):
+        name, backend = key
+        weights = weights or resolve_weights(name)
+        started = time.perf_counter()
+        entry = _Entry(key, weights, self.loader(backend, weights))
+        elapsed = time.perf_counter() - started
+        if metrics.ENABLED:
+            metrics.model_load_seconds.observe(elapsed, backend)
+        logger.info("Model %s (%s) dimuat dari %s dalam %.1f detik", name, backend, weights, elapsed)
+        return entry
+
+    def _load(self, key):
+        with self._lock:
+            load_lock = self._load_locks[key]
+        with load_lock:
+            with self._lock:
+                if key in self._entries:
+                    return
+            entry = self._create(key)
+            with self._lock:
+                self._entries[key] = entry
+                self.loads += 1
+        self.evict(exclude=key)
+
+    def _checkout(self, key):
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.leases += 1
+                    entry.last_used = time.monotonic()
+                    break
+            self._load(key)
+        self._check_reload(entry)
+        return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            dispose = entry.retired and entry.leases == 0
+            if dispose:
+                self._retired.remove(entry)
+        if dispose:
+            self._dispose(entry)
+
+    def _retire(self, entry):
+        # Dipanggil dengan self._lock dipegang. Mengembalikan True jika entri dapat langsung dilepas.
+        entry.retired = True
+        if entry.leases:
+            self._retired.append(entry)
+            return False
+        return True
+
+    @staticmethod
+    def _dispose(entry):
+        from batch_scheduler import close_batch_scheduler
+
+        close_batch_scheduler(entry.model)
+        logger.info("Model %s (%s) dilepas", *entry.key)
+        entry.model = None
+
+    @contextmanager
+    def acquire(self, name=None, backend=None):
+        """
+        Meminjam model (dimuat jika belum ada) selama blok with. Model yang sedang
+        dipinjam tidak dilepas oleh eviction, dan hot-swap tidak memutus pemakaiannya.
+        """
+        entry = self._checkout(self._key(name, backend))
+        try:
+            yield entry.model
+        finally:
+            self._release(entry)
+
+    def get(self, name=None, backend=None):
+        """
+        Model saat ini untuk nama dan backend tersebut (dimuat jika belum ada), tanpa
+        pinjaman. Untuk pemakaian selama permintaan berjalan, gunakan acquire().
+        """
+        entry = self._checkout(self._key(name, backend))
+        self._release(entry)
+        return entry.model
+
+    def peek(self, name=None, backend=None):
+        """
+        Model yang sudah dimuat, atau None tanpa memuatnya.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(name, backend))
+            return entry.model if entry is not None else None
+
+    def swap(self, name=None, weights=None, backend=None):
+        """
+        Memuat bobot baru (default: file bobot nama model) lalu menggantikan model lama
+        secara atomik. Permintaan baru langsung memakai model baru; yang sedang berjalan
+        menyelesaikan pekerjaannya dengan model lama. Mengembalikan model baru.
+        """
+        key = self._key(name, backend)
+        with self._lock:
+            load_lock = self._load_locks[key]
+        with load_lock:
+            entry = self._create(key, weights)
+            with self._lock:
+                old = self._entries.get(key)
+                self._entries[key] = entry
+                self.swaps += 1
+                dispose = old is not None and self._retire(old)
+        if dispose:
+            self._dispose(old)
+        self.evict(exclude=key)
+        return entry.model
+
+    def _check_reload(self, entry):
+        # File bobot ditimpa di disk: muat ulang di background, permintaan ini tetap memakai model lama
+        if not self.reload_interval or entry.retired:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if entry.reloading or now - entry.last_check < self.reload_interval:
+                return
+            entry.last_check = now
+            mtime = _mtime(entry.weights)
+            if mtime is None or mtime == entry.mtime:
+                return
+            entry.reloading = True
+            # Dicatat sekarang agar bobot yang gagal dimuat tidak dicoba terus-menerus
+            entry.mtime = mtime
+        threading.Thread(target=self._reload, args=(entry,), name="model-reload", daemon=True).start()
+
+    def _reload(self, entry):
+        name, backend = entry.key
+        try:
+            self.swap(name, entry.weights, backend)
+            logger.info("Bobot %s berubah, model %s diganti", entry.weights, name)
+        except Exception:
+            logger.exception("Gagal memuat ulang bobot %s, model lama tetap dipakai", entry.weights)
+        finally:
+            entry.reloading = False
+
+    def evict(self, exclude=None):
+        """
+        Melepas model tanpa pinjaman yang idle terlalu lama, lalu model tanpa pinjaman yang
+        paling lama tidak dipakai selama total memori melebihi anggaran. Mengembalikan
+        jumlah model yang dilepas.
+        """
+        default_key = self._key()
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if (key not in (exclude, default_key) and entry.leases == 0 and self.idle_seconds
+                        and now - entry.last_used > self.idle_seconds):
+                    evicted.append(self._entries.pop(key))
+
+            total = sum(entry.size_bytes for entry in self._entries.values())
+            candidates = sorted((entry for key, entry in self._entries.items() if key != exclude and entry.leases == 0),
+                                key=lambda entry: (entry.key == default_key, entry.last_used))
+            for entry in candidates:
+                if not self.memory_budget or total <= self.memory_budget:
+                    break
+                self._entries.pop(entry.key)
+                total -= entry.size_bytes
+                evicted.append(entry)
+
+            evicted = [entry for entry in evicted if self._retire(entry)]
+            self.evictions += len(evicted)
+        for entry in evicted:
+            self._dispose(entry)
+        return len(evicted)
+
+    def stats(self):
+        """
+        Ringkasan model yang dimuat: nama, backend, file bobot, perkiraan memori, jumlah
+        pinjaman aktif, dan detik sejak terakhir dipakai.
+        """
+        now = time.monotonic()
+        with self._lock:
+            models = [{"name": entry.key[0], "backend": entry.key[1], "weights": entry.weights,
+                       "memory_mb": entry.size_bytes / 2 ** 20, "leases": entry.leases,
+                       "idle_seconds": now - entry.last_used}
+                      for entry in self._entries.values()]
+            return {"models": models, "retired": len(self._retired), "loads": self.loads, "swaps": self.swaps,
+                    "evictions": self.evictions, "memory_budget_mb": self.memory_budget / 2 ** 20}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Registry model bersama untuk seluruh proses.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
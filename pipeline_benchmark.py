@@ -0,0 +1,371 @@
+"""
+Benchmark pipeline deteksi: setiap tahap secara terpisah dan jalur gambar/video end-to-end.
+
+Tahap yang diukur per resolusi:
+  decode_image      load_image_bgr dari byte JPEG
+  predict           model.predict satu gambar
+  predict_batch     model.predict satu batch config.VIDEO_BATCH_SIZE frame (per frame)
+  draw_boxes        draw_boxes_on_frame (dengan salinan, seperti render_image_detections)
+  color_convert     BGR -> RGB di batas tampilan
+  encode_png        cv2.imencode PNG untuk tombol download gambar
+  decode_video      cv2.VideoCapture.read per frame
+  encode_video      penulis video output (video_output.py) per frame, codec --codec
+  image_e2e         decode -> detect_image_all (tanpa cache) -> render -> PNG
+  video_e2e         process_video_capture: decode, inferensi, anotasi dan encode ke file
+  video_pipeline    VideoPipeline (tahap di thread terpisah) untuk video yang sama
+
+Input sintetis dibuat untuk setiap --sizes; gambar dan video contoh dapat ditambahkan dengan
+--images dan --videos. Setiap hasil berisi throughput, latensi p50/p95/p99 dan RSS puncak
+proses selama tahap berjalan. --output menyimpan hasil sebagai JSON (beserta commit git,
+platform dan konfigurasi) dan --compare membandingkannya dengan JSON dari commit lain.
+--stub memakai model tiruan sehingga benchmark dapat berjalan tanpa best.pt.
+
+Contoh:
+    python pipeline_benchmark.py --stub --sizes 640x480 1920x1080 --output hasil.json
+    python pipeline_benchmark.py --videos contoh.mp4 --compare hasil.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+from render_benchmark import random_detections
+from utils1 import (class_colors, class_names, detect_image_all, draw_boxes_on_frame, load_image_bgr,
+                    predict_detections, predict_frames, process_video_capture, render_image_detections)
+from video_output import open_output_writer, output_filename
+from video_pipeline import VideoPipeline
+
+PERCENTILES = (50, 95, 99)
+
+
+class StubModel:
+    """
+    Model tiruan: boxes deteksi acak sesuai ukuran frame, dengan latensi tetap per
+    gambar (latency_ms) untuk meniru biaya inferensi.
+    """
+    def __init__(self, boxes=20, latency_ms=0.0):
+        self.boxes = boxes
+        self.latency = latency_ms / 1000
+        self._detections = {}
+
+    def predict(self, source, conf=0.25, verbose=False, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        if self.latency:
+            time.sleep(self.latency * len(frames))
+        results = []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            if (width, height) not in self._detections:
+                self._detections[width, height] = random_detections(self.boxes, width, height)
+            detections = self._detections[width, height]
+            results.append(detections[detections[:, 4] >= conf])
+        return results
+
+
+class PeakRss:
+    """
+    RSS puncak proses (MB) selama blok with. Dengan psutil, RSS diambil setiap interval
+    detik di thread terpisah; tanpa psutil, dipakai ru_maxrss (puncak sejak proses mulai).
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self, process):
+        while True:
+            self.peak_mb = max(self.peak_mb, process.memory_info().rss / 2 ** 20)
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        try:
+            import psutil
+        except ImportError:
+            return self
+        self._thread = threading.Thread(target=self._sample, args=(psutil.Process(),), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        else:
+            import resource
+            self.peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return False
+
+
+def summarize(latencies_ms, units, elapsed):
+    """
+    Ringkasan hasil: units (gambar/frame) per detik dan persentil latensi per unit.
+    """
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    summary = {"units": units, "elapsed_s": elapsed, "throughput_per_s": units / elapsed if elapsed > 0 else 0.0,
+               "mean_ms": float(latencies.mean()) if len(latencies) else 0.0}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_ms"] = float(np.percentile(latencies, percentile)) if len(latencies) else 0.0
+    return summary
+
+
+def time_calls(function, repeat, warmup=2, units_per_call=1):
+    """
+    Menjalankan function() warmup kali tanpa diukur lalu repeat kali. Latensi per unit
+    = durasi panggilan dibagi units_per_call.
+    """
+    for _ in range(warmup):
+        function()
+    latencies = []
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            latencies.append((time.perf_counter() - start) * 1000 / units_per_call)
+        elapsed = time.perf_counter() - started
+    return {**summarize(latencies, repeat * units_per_call, elapsed), "peak_rss_mb": rss.peak_mb}
+
+
+def time_iterator(iterator):
+    """
+    Mengukur jeda antar item sebuah generator (satu item = satu frame) sampai habis.
+    """
+    latencies = []
+    with PeakRss() as rss:
+        started = last = time.perf_counter()
+        for _ in iterator:
+            now = time.perf_counter()
+            latencies.append((now - last) * 1000)
+            last = now
+        elapsed = time.perf_counter() - started
+    return {**summarize(latencies, len(latencies), elapsed), "peak_rss_mb": rss.peak_mb}
+
+
+def synthetic_image(width, height, seed=0):
+    # Noise yang di-blur: lebih mirip foto daripada noise murni, sehingga biaya encode realistis
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (max(height // 16, 1), max(width // 16, 1), 3), dtype=np.uint8)
+    return cv2.GaussianBlur(cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC), (5, 5), 0)
+
+
+def write_synthetic_video(path, width, height, frames, fps=25):
+    # Gambar sintetis yang bergeser setiap frame untuk meniru gerakan kamera
+    image = synthetic_image(width, height)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for index in range(frames):
+        writer.write(np.roll(image, index * 4, axis=1))
+    writer.release()
+    return path
+
+
+def iter_video_frames(path, limit=None):
+    cap = cv2.VideoCapture(path)
+    try:
+        count = 0
+        while limit is None or count < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def image_stages(model, image_bgr, repeat, warmup, conf=0.3):
+    """
+    Tahap jalur gambar secara terpisah dan end-to-end untuk satu gambar BGR.
+    """
+    data = cv2.imencode(".jpg", image_bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+    detections = predict_detections(model, [image_bgr], config.MIN_CONFIDENCE)[0]
+    batch = [image_bgr] * max(1, config.VIDEO_BATCH_SIZE)
+    drawn = render_image_detections(image_bgr, detections, conf)
+    drawn = image_bgr if drawn is None else drawn
+
+    def image_e2e():
+        decoded = load_image_bgr(data)
+        result = render_image_detections(decoded, detect_image_all(data, model, decoded), conf)
+        if result is not None:
+            cv2.imencode(".png", result)
+
+    return {
+        "decode_image": time_calls(lambda: load_image_bgr(data), repeat, warmup),
+        "predict": time_calls(lambda: predict_frames(model, [image_bgr], config.MIN_CONFIDENCE), repeat, warmup),
+        "predict_batch": time_calls(lambda: predict_frames(model, batch, config.MIN_CONFIDENCE), repeat, warmup,
+                                    units_per_call=len(batch)),
+        "draw_boxes": time_calls(lambda: draw_boxes_on_frame(image_bgr, detections[detections[:, 4] >= conf],
+                                                             class_names, class_colors), repeat, warmup),
+        "color_convert": time_calls(lambda: cv2.cvtColor(drawn, cv2.COLOR_BGR2RGB), repeat, warmup),
+        "encode_png": time_calls(lambda: cv2.imencode(".png", drawn), repeat, warmup),
+        "image_e2e": time_calls(image_e2e, repeat, warmup),
+    }
+
+
+def video_stages(model, video_path, frame_limit, codec=None, conf=0.3):
+    """
+    Tahap jalur video secara terpisah dan end-to-end untuk satu file video.
+    """
+    frames = list(iter_video_frames(video_path, frame_limit))
+    if not frames:
+        raise IOError(f"Video '{video_path}' tidak dapat dibaca.")
+    height, width = frames[0].shape[:2]
+    results = {}
+
+    results["decode_video"] = time_iterator(iter_video_frames(video_path))
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, output_filename("encode", codec))
+        writer = open_output_writer(output_path, 25, width, height, codec)
+        latencies = []
+        with PeakRss() as rss:
+            started = time.perf_counter()
+            for frame in frames:
+                start = time.perf_counter()
+                writer.write(frame)
+                latencies.append((time.perf_counter() - start) * 1000)
+            writer.release()
+            elapsed = time.perf_counter() - started
+        results["encode_video"] = {**summarize(latencies, len(frames), elapsed), "peak_rss_mb": rss.peak_mb}
+
+        output_path = os.path.join(directory, output_filename("e2e", codec))
+        results["video_e2e"] = time_iterator(
+            processed for _, processed, _ in process_video_capture(cv2.VideoCapture(video_path), model, conf,
+                                                                   output_path, codec=codec))
+        output_path = os.path.join(directory, output_filename("pipeline", codec))
+        pipeline = VideoPipeline(video_path, model, conf=conf, output_path=output_path, codec=codec)
+        results["video_pipeline"] = time_iterator(pipeline.frames())
+    return results
+
+
+def benchmark(model, sizes, images=(), videos=(), repeat=30, warmup=2, frames=60, codec=None):
+    """
+    Menjalankan semua tahap untuk input sintetis per ukuran dan input contoh.
+    Mengembalikan list hasil {"input", "stage", ...ringkasan}.
+    """
+    # Cache deteksi dimatikan agar gambar yang sama tetap diinferensi setiap kali
+    config.DETECTION_CACHE_ENABLED = False
+    report = []
+
+    def add(input_name, stages):
+        for stage, result in stages.items():
+            report.append({"input": input_name, "stage": stage, **result})
+
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height in sizes:
+            name = f"sintetis {width}x{height}"
+            add(name, image_stages(model, synthetic_image(width, height), repeat, warmup))
+            video_path = write_synthetic_video(os.path.join(directory, f"{width}x{height}.mp4"), width, height, frames)
+            add(name, video_stages(model, video_path, frames, codec))
+    for path in images:
+        image_bgr = cv2.imread(path)
+        if image_bgr is None:
+            raise IOError(f"Gambar '{path}' tidak dapat dibaca.")
+        add(os.path.basename(path), image_stages(model, image_bgr, repeat, warmup))
+    for path in videos:
+        add(os.path.basename(path), video_stages(model, path, frames, codec))
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(model_name):
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "model": model_name,
+        "backend": config.MODEL_BACKEND,
+        "video_batch_size": config.VIDEO_BATCH_SIZE,
+        "batch_scheduler": config.BATCH_SCHEDULER_ENABLED,
+        "video_output_codec": config.VIDEO_OUTPUT_CODEC,
+    }
+
+
+def compare(report, baseline):
+    """
+    Membandingkan hasil dengan JSON baseline per (input, stage): rasio throughput dan p50.
+    """
+    previous = {(entry["input"], entry["stage"]): entry for entry in baseline["results"]}
+    rows = []
+    for entry in report:
+        old = previous.get((entry["input"], entry["stage"]))
+        if old is None:
+            continue
+        rows.append({
+            "input": entry["input"], "stage": entry["stage"],
+            "throughput_ratio": entry["throughput_per_s"] / old["throughput_per_s"] if old["throughput_per_s"] else 0.0,
+            "p50_ratio": entry["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 0.0,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tahap dan end-to-end pipeline deteksi gambar/video.")
+    parser.add_argument("--sizes", nargs="*", default=["640x480", "1280x720", "1920x1080"],
+                        help="Resolusi input sintetis LEBARxTINGGI")
+    parser.add_argument("--images", nargs="*", default=[], help="Gambar contoh")
+    parser.add_argument("--videos", nargs="*", default=[], help="Video contoh")
+    parser.add_argument("--repeat", type=int, default=30, help="Jumlah pengukuran per tahap gambar")
+    parser.add_argument("--warmup", type=int, default=2, help="Jumlah panggilan pemanasan per tahap gambar")
+    parser.add_argument("--frames", type=int, default=60, help="Jumlah frame video sintetis (dan maksimal frame encode_video untuk video contoh)")
+    parser.add_argument("--codec", default=None, help="Codec encode_video (default config.VIDEO_OUTPUT_CODEC)")
+    parser.add_argument("--stub", action="store_true", help="Model tiruan, tanpa file bobot")
+    parser.add_argument("--stub-ms", type=float, default=0.0, help="Latensi model tiruan per gambar (ms)")
+    parser.add_argument("--stub-boxes", type=int, default=20, help="Jumlah box per gambar model tiruan")
+    parser.add_argument("--backend", default=config.MODEL_BACKEND)
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    parser.add_argument("--compare", help="JSON hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        model, model_name = StubModel(args.stub_boxes, args.stub_ms), f"stub ({args.stub_ms:g} ms)"
+    else:
+        from backends import load_backend
+        model, model_name = load_backend(args.backend, args.weights), args.weights
+    sizes = [tuple(int(value) for value in size.lower().split("x")) for size in args.sizes]
+
+    report = benchmark(model, sizes, args.images, args.videos, args.repeat, args.warmup, args.frames, args.codec)
+    print(f"{'Input':<22} {'Tahap':<15} {'Unit/detik':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'RSS (MB)':>9}")
+    for entry in report:
+        print(f"{entry['input']:<22} {entry['stage']:<15} {entry['throughput_per_s']:>11.1f} {entry['p50_ms']:>9.2f} "
+              f"{entry['p95_ms']:>9.2f} {entry['p99_ms']:>9.2f} {entry['peak_rss_mb']:>9.1f}")
+
+    result = {"environment": environment(model_name), "results": report}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nDibandingkan dengan commit {baseline['environment'].get('commit')} (rasio > 1 = throughput naik)")
+        print(f"{'Input':<22} {'Tahap':<15} {'Throughput':>11} {'p50':>7}")
+        for row in compare(report, baseline):
+            print(f"{row['input']:<22} {row['stage']:<15} {row['throughput_ratio']:>10.2f}x {row['p50_ratio']:>6.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
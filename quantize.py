@@ -0,0 +1,237 @@
+"""
+Kuantisasi INT8 (post-training static quantization) untuk model deteksi TBS.
+
+Langkah:
+  1. best.pt diekspor ke ONNX FP32 (memakai cache backends.export_model).
+  2. Aktivasi dikalibrasi dengan gambar dari folder kalibrasi, lalu bobot dan aktivasi
+     dikuantisasi ke INT8 dengan ONNX Runtime (format QDQ).
+  3. Laporan membandingkan mAP per kelas kematangan, latensi, dan ukuran model
+     untuk PyTorch FP32, ONNX FP32, dan ONNX INT8.
+
+Contoh:
+    python quantize.py --calib data/kalibrasi --data data.yaml
+
+Model INT8 disimpan sebagai best_int8.onnx dan dapat dipakai aplikasi dengan
+MODEL_BACKEND = "onnx-int8" di config.py.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import config
+from backends import export_model, letterbox, load_backend, quantized_model_path, OnnxRuntimeDetector
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def list_images(folder, limit=None):
+    paths = sorted(path for path in glob.glob(os.path.join(folder, "**", "*"), recursive=True)
+                   if path.lower().endswith(IMAGE_EXTENSIONS))
+    return paths[:limit] if limit else paths
+
+
+class CalibrationReader:
+    """
+    Menyediakan gambar kalibrasi (sudah di-letterbox) untuk quantize_static.
+    """
+    def __init__(self, image_paths, input_name, imgsz):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._iterator = iter(image_paths)
+
+    def get_next(self):
+        for path in self._iterator:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            blob, _ = letterbox(image, self.imgsz)
+            return {self.input_name: blob[None]}
+        return None
+
+    def rewind(self):
+        self._iterator = iter(self.image_paths)
+
+
+def detect_head_nodes(model_path):
+    """
+    Nama node pasca-pemrosesan di head Detect (modul terakhir) di luar cabang konvolusi
+    cv2/cv3. Node ini dibiarkan FP32 karena sangat sensitif terhadap kuantisasi
+    (DFL, sigmoid, concat).
+    """
+    import onnx
+
+    model = onnx.load(model_path)
+    module_ids = [int(m.group(1)) for node in model.graph.node
+                  for m in [re.match(r"/model\.(\d+)/", node.name)] if m]
+    if not module_ids:
+        return []
+    head_prefix = f"/model.{max(module_ids)}/"
+    return [node.name for node in model.graph.node
+            if node.name.startswith(head_prefix)
+            and not re.match(re.escape(head_prefix) + r"cv\d", node.name)]
+
+
+def quantize_model(weights=None, calib_dir=None, output_path=None, imgsz=None, num_calib=100, per_channel=True):
+    """
+    Membuat model ONNX INT8 dari bobot PyTorch dengan kalibrasi statis.
+    Mengembalikan path model INT8.
+    """
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    weights = weights or config.MODEL_WEIGHTS
+    imgsz = imgsz or config.MODEL_IMGSZ
+    output_path = output_path or quantized_model_path(weights)
+
+    images = list_images(calib_dir, num_calib)
+    if not images:
+        raise FileNotFoundError(f"Tidak ada gambar kalibrasi di '{calib_dir}'.")
+
+    fp32_path = export_model(weights, "onnx", imgsz)
+    preprocessed_path = os.path.splitext(fp32_path)[0] + "_preprocessed.onnx"
+    quant_pre_process(fp32_path, preprocessed_path, skip_symbolic_shape=True)
+
+    input_name = ort.InferenceSession(preprocessed_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    try:
+        quantize_static(
+            preprocessed_path,
+            output_path,
+            CalibrationReader(images, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=detect_head_nodes(preprocessed_path),
+        )
+    finally:
+        os.remove(preprocessed_path)
+    return output_path
+
+
+def measure_latency(model, images, warmup=3, **predict_kwargs):
+    """
+    Median dan p95 latensi prediksi satu gambar (milidetik).
+    """
+    frames = [image for image in (cv2.imread(path) for path in images) if image is not None]
+    for frame in frames[:warmup]:
+        model.predict(frame, verbose=False, **predict_kwargs)
+    timings = []
+    for frame in frames:
+        start = time.perf_counter()
+        model.predict(frame, verbose=False, **predict_kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": float(np.median(timings)), "p95_ms": float(np.percentile(timings, 95))}
+
+
+def evaluate_map(model_path, data_yaml, imgsz):
+    """
+    mAP50 dan mAP50-95 per kelas dengan validator ultralytics (mendukung .pt dan .onnx).
+    """
+    from ultralytics import YOLO
+    from utils1 import class_names
+
+    metrics = YOLO(model_path, task="detect").val(data=data_yaml, imgsz=imgsz, batch=1, plots=False, verbose=False)
+    per_class = {}
+    for index, class_id in enumerate(metrics.box.ap_class_index):
+        per_class[class_names[int(class_id)]] = {
+            "mAP50": float(metrics.box.ap50[index]),
+            "mAP50-95": float(metrics.box.ap[index]),
+        }
+    return {"mAP50": float(metrics.box.map50), "mAP50-95": float(metrics.box.map), "per_class": per_class}
+
+
+def model_size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def build_report(weights, int8_path, images, data_yaml=None, imgsz=None):
+    imgsz = imgsz or config.MODEL_IMGSZ
+    fp32_path = export_model(weights, "onnx", imgsz)
+    variants = {
+        "pytorch-fp32": (weights, load_backend("pytorch", weights), {"imgsz": imgsz}),
+        "onnx-fp32": (fp32_path, OnnxRuntimeDetector(fp32_path, imgsz=imgsz), {}),
+        "onnx-int8": (int8_path, OnnxRuntimeDetector(int8_path, imgsz=imgsz), {}),
+    }
+    report = {"imgsz": imgsz, "images": len(images), "data": data_yaml, "variants": {}}
+    for name, (path, model, predict_kwargs) in variants.items():
+        entry = {"path": path, "size_mb": model_size_mb(path)}
+        entry.update(measure_latency(model, images, **predict_kwargs))
+        if data_yaml:
+            entry["accuracy"] = evaluate_map(path, data_yaml, imgsz)
+        report["variants"][name] = entry
+    return report
+
+
+def format_report(report):
+    """
+    Laporan dalam format Markdown.
+    """
+    lines = [
+        "# Laporan Kuantisasi INT8",
+        "",
+        f"Ukuran input: {report['imgsz']} | Gambar untuk latensi: {report['images']}",
+        "",
+        "| Varian | Ukuran (MB) | Latensi median (ms) | Latensi p95 (ms) | mAP50 | mAP50-95 |",
+        "|---|---|---|---|---|---|",
+    ]
+    for name, entry in report["variants"].items():
+        accuracy = entry.get("accuracy")
+        map50 = f"{accuracy['mAP50']:.3f}" if accuracy else "-"
+        map5095 = f"{accuracy['mAP50-95']:.3f}" if accuracy else "-"
+        lines.append(f"| {name} | {entry['size_mb']:.1f} | {entry['median_ms']:.1f} | {entry['p95_ms']:.1f} | {map50} | {map5095} |")
+
+    if report.get("data"):
+        lines += ["", "## mAP50-95 per Kelas Kematangan", ""]
+        names = list(report["variants"])
+        lines.append("| Kelas | " + " | ".join(names) + " |")
+        lines.append("|---" * (len(names) + 1) + "|")
+        class_labels = next(iter(report["variants"].values()))["accuracy"]["per_class"]
+        for label in class_labels:
+            values = [report["variants"][name]["accuracy"]["per_class"].get(label, {}).get("mAP50-95") for name in names]
+            lines.append(f"| {label} | " + " | ".join("-" if v is None else f"{v:.3f}" for v in values) + " |")
+    else:
+        lines += ["", "_mAP tidak dihitung: jalankan dengan --data data.yaml untuk evaluasi akurasi._"]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kuantisasi INT8 model deteksi TBS dan laporan akurasi vs kecepatan.")
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    parser.add_argument("--calib", required=True, help="Folder gambar kalibrasi")
+    parser.add_argument("--data", help="data.yaml dataset validasi untuk menghitung mAP per kelas")
+    parser.add_argument("--imgsz", type=int, default=config.MODEL_IMGSZ)
+    parser.add_argument("--num-calib", type=int, default=100, help="Jumlah gambar kalibrasi maksimal")
+    parser.add_argument("--no-per-channel", action="store_true", help="Kuantisasi bobot per-tensor")
+    parser.add_argument("--output", help="Path model INT8 (default: <weights>_int8.onnx)")
+    parser.add_argument("--report", default="quantization_report", help="Prefix file laporan (.json dan .md)")
+    args = parser.parse_args(argv)
+
+    int8_path = quantize_model(args.weights, args.calib, args.output, args.imgsz, args.num_calib,
+                               per_channel=not args.no_per_channel)
+    print(f"✅ Model INT8 disimpan di: {int8_path}")
+
+    report = build_report(args.weights, int8_path, list_images(args.calib, args.num_calib), args.data, args.imgsz)
+    with open(args.report + ".json", "w") as f:
+        json.dump(report, f, indent=2)
+    markdown = format_report(report)
+    with open(args.report + ".md", "w") as f:
+        f.write(markdown)
+    print(markdown)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark renderer bounding box: draw_boxes_on_frame lama vs baru.
+
+Implementasi lama (salin frame penuh, .tolist() per baris tensor, cv2.getTextSize per
+box) disimpan di sini sebagai pembanding. Frame sintetis berisi N box acak diukur untuk
+renderer lama, renderer baru (salinan), renderer baru in-place, dan renderer baru
+dengan buffer out milik pemanggil. Jika torch terpasang, deteksi dibungkus seperti
+ultralytics Results dengan tensor torch (input asli renderer lama). Hasil gambar lama
+dan baru juga diperiksa identik.
+
+Contoh:
+    python render_benchmark.py --boxes 10 50 200 --size 1920x1080 --repeat 200
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from utils1 import class_colors, class_names, draw_boxes_on_frame
+
+
+class _Boxes:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Results:
+    # Pengganti ultralytics Results: boxes.data berupa tensor torch jika tersedia
+    def __init__(self, detections):
+        try:
+            import torch
+            data = torch.from_numpy(detections)
+        except (ImportError, AttributeError):
+            data = detections
+        self.boxes = _Boxes(data)
+
+
+def draw_boxes_legacy(frame, results, class_names, class_colors):
+    # Renderer sebelum versi vektor: konversi .tolist() dan getTextSize per box
+    frame_with_boxes = frame.copy()
+    for result in results.boxes.data:
+        x1, y1, x2, y2, score, cls = result.tolist()
+        class_id = int(cls)
+        label = f"{class_names[class_id]} ({score * 100:.1f}%)"
+        color = class_colors.get(class_id, (255, 255, 255))
+        cv2.rectangle(frame_with_boxes, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+        (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
+        cv2.rectangle(frame_with_boxes, (int(x1), int(y1) - text_height - 10),
+                      (int(x1) + text_width + 6, int(y1)), color, -1)
+        cv2.putText(frame_with_boxes, label, (int(x1) + 3, int(y1) - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
+    return frame_with_boxes
+
+
+def random_detections(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, width - 120, count)
+    y1 = rng.uniform(30, height - 120, count)
+    sizes = rng.uniform(40, 120, (count, 2))
+    scores = rng.uniform(0.3, 1.0, count)
+    classes = rng.integers(0, len(class_names), count)
+    return np.stack([x1, y1, x1 + sizes[:, 0], y1 + sizes[:, 1], scores, classes], axis=1).astype(np.float32)
+
+
+def _time_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def benchmark(box_counts, width=1920, height=1080, repeat=200):
+    frame = np.random.default_rng(1).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    buffer = np.empty_like(frame)
+    scratch = frame.copy()
+    report = []
+    for count in box_counts:
+        detections = _Results(random_detections(count, width, height))
+        if not np.array_equal(draw_boxes_legacy(frame, detections, class_names, class_colors),
+                              draw_boxes_on_frame(frame, detections, class_names, class_colors)):
+            raise AssertionError(f"Hasil renderer baru berbeda dengan renderer lama ({count} box).")
+
+        entry = {
+            "boxes": count,
+            "legacy_ms": _time_ms(lambda: draw_boxes_legacy(frame, detections, class_names, class_colors), repeat),
+            "copy_ms": _time_ms(lambda: draw_boxes_on_frame(frame, detections, class_names, class_colors), repeat),
+            "out_ms": _time_ms(lambda: draw_boxes_on_frame(frame, detections, class_names, class_colors,
+                                                           out=buffer), repeat),
+            # Menggambar berulang di buffer yang sama: hanya mengukur biaya gambar tanpa salinan
+            "inplace_ms": _time_ms(lambda: draw_boxes_on_frame(scratch, detections, class_names, class_colors,
+                                                               inplace=True), repeat),
+        }
+        entry["speedup"] = entry["legacy_ms"] / entry["inplace_ms"] if entry["inplace_ms"] else 0.0
+        report.append(entry)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark renderer bounding box.")
+    parser.add_argument("--boxes", type=int, nargs="+", default=[10, 50, 200], help="Jumlah box per frame")
+    parser.add_argument("--size", default="1920x1080", help="Ukuran frame LEBARxTINGGI")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+    report = benchmark(args.boxes, width, height, args.repeat)
+    print(f"{'Box':>5} {'Lama (ms)':>10} {'Salinan (ms)':>13} {'Buffer out (ms)':>16} {'In-place (ms)':>14} {'Speedup':>8}")
+    for entry in report:
+        print(f"{entry['boxes']:>5} {entry['legacy_ms']:>10.3f} {entry['copy_ms']:>13.3f} {entry['out_ms']:>16.3f} "
+              f"{entry['inplace_ms']:>14.3f} {entry['speedup']:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
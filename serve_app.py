@@ -0,0 +1,53 @@
+"""
+Menjalankan UI Streamlit setelah model default dimuat dan dipanaskan.
+
+`streamlit run app.py` baru memuat model saat sesi browser pertama menjalankan skrip, sehingga
+pengunjung pertama menanggung waktu muat dan warm-up. Launcher ini memuat model default
+(config.MODEL_WEIGHTS, backend config.MODEL_BACKEND) lewat registry model di proses yang sama
+sebelum server Streamlit membuka port. Warm-up dilakukan oleh backends.load_backend sesuai
+config.MODEL_WARMUP. Streamlit menjalankan app.py di proses ini, jadi semua sesi langsung
+memakai model yang sudah siap dari registry.
+
+Argumen lain diteruskan ke `streamlit run`:
+    python serve_app.py --server.port=5000 --server.address=0.0.0.0
+"""
+import logging
+import sys
+import time
+
+import config
+
+logger = logging.getLogger("serve_app")
+
+
+def warm_start():
+    """
+    Memuat model default ke registry. Mengembalikan True jika berhasil; jika gagal, UI tetap
+    dijalankan dan sesi menampilkan pesan galat saat model diminta.
+    """
+    from model_registry import get_model_registry
+
+    started = time.perf_counter()
+    try:
+        get_model_registry().get(config.MODEL_WEIGHTS, config.MODEL_BACKEND)
+    except Exception:
+        logger.exception("Gagal memuat model %s saat start", config.MODEL_WEIGHTS)
+        return False
+    logger.info("Model %s (%s) siap dalam %.1f detik", config.MODEL_WEIGHTS, config.MODEL_BACKEND,
+                time.perf_counter() - started)
+    return True
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = sys.argv[1:] if argv is None else list(argv)
+    warm_start()
+
+    from streamlit.web import cli as stcli
+
+    sys.argv = ["streamlit", "run", "app.py", *args]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
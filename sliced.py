@@ -0,0 +1,189 @@
+"""
+Inferensi bertile (sliced inference) untuk gambar drone/kanopi beresolusi tinggi.
+
+Gambar 4000-6000 px yang langsung diperkecil ke ukuran input model membuat tandan kecil
+hilang. Di sini gambar dipotong menjadi tile yang saling tumpang tindih (ukuran kira-kira
+sama dengan resolusi training), tile dijalankan ke model per batch, box dipetakan kembali
+ke koordinat gambar penuh, lalu duplikat di perbatasan tile digabung dengan NMS atau WBF
+(weighted boxes fusion).
+
+Tile berupa view dari gambar asli (tanpa salinan) dan hanya batch_size tile yang
+diproses sekaligus, sehingga memori puncak tidak bergantung pada jumlah tile.
+
+Contoh:
+    python sliced.py drone.jpg --tile 544 --overlap 0.2 --merge wbf --output hasil.jpg
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import config
+
+MERGE_METHODS = ("nms", "wbf")
+MATCH_METRICS = ("iou", "ios")
+
+
+def slice_windows(width, height, tile_size=None, overlap=None):
+    """
+    Daftar window (x1, y1, x2, y2) yang menutup seluruh gambar dengan tumpang tindih
+    overlap (rasio terhadap tile_size). Tile terakhir di setiap sumbu digeser agar
+    rata dengan tepi gambar.
+    """
+    tile_size = tile_size or config.SLICE_TILE_SIZE
+    overlap = config.SLICE_OVERLAP if overlap is None else overlap
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def _overlap(box, boxes, metric):
+    top_left = np.maximum(box[:2], boxes[:, :2])
+    bottom_right = np.minimum(box[2:4], boxes[:, 2:4])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+    area = np.prod(box[2:4] - box[:2])
+    areas = np.prod(boxes[:, 2:4] - boxes[:, :2], axis=1)
+    if metric == "ios":
+        # Intersection over smaller: box yang terpotong tepi tile tetap cocok dengan box utuhnya
+        return intersection / (np.minimum(area, areas) + 1e-9)
+    return intersection / (area + areas - intersection + 1e-9)
+
+
+def merge_detections(detections, method=None, metric=None, threshold=None):
+    """
+    Menggabungkan deteksi duplikat (N, 6) per kelas.
+      - "nms": box dengan skor tertinggi di setiap kelompok dipertahankan
+      - "wbf": koordinat kelompok dirata-rata dengan bobot skor, skor = skor tertinggi
+    Kelompok dibentuk secara greedy dari box berskor tertinggi dengan overlap >= threshold.
+    """
+    method = method or config.SLICE_MERGE
+    metric = metric or config.SLICE_MATCH_METRIC
+    threshold = config.SLICE_MATCH_THRESHOLD if threshold is None else threshold
+    if method not in MERGE_METHODS:
+        raise ValueError(f"Metode merge tidak dikenal: {method}. Pilih salah satu dari {MERGE_METHODS}.")
+    if metric not in MATCH_METRICS:
+        raise ValueError(f"Metrik overlap tidak dikenal: {metric}. Pilih salah satu dari {MATCH_METRICS}.")
+    if len(detections) == 0:
+        return detections
+
+    merged = []
+    for class_id in np.unique(detections[:, 5]):
+        group = detections[detections[:, 5] == class_id]
+        group = group[np.argsort(-group[:, 4], kind="stable")]
+        remaining = np.ones(len(group), dtype=bool)
+        for i in range(len(group)):
+            if not remaining[i]:
+                continue
+            members = i + np.flatnonzero((_overlap(group[i], group[i:], metric) >= threshold) & remaining[i:])
+            remaining[members] = False
+            if method == "wbf" and len(members) > 1:
+                weights = group[members, 4]
+                box = (group[members, :4] * weights[:, None]).sum(axis=0) / weights.sum()
+                merged.append([*box, group[i, 4], class_id])
+            else:
+                merged.append(group[i])
+    merged = np.asarray(merged, dtype=np.float32).reshape(-1, 6)
+    return merged[np.argsort(-merged[:, 4], kind="stable")]
+
+
+def _predict_tiles(model, tiles, conf):
+    # Lewat scheduler micro-batching jika aktif (model dipakai bersama antar thread)
+    from utils1 import detect_frames
+    return [detections.copy() for detections in detect_frames(model, tiles, conf)]
+
+
+def sliced_predict(model, image_bgr, conf=0.3, tile_size=None, overlap=None, batch_size=None,
+                   merge=None, include_full=None):
+    """
+    Deteksi bertile pada satu gambar BGR. Mengembalikan array deteksi (N, 6) pada
+    koordinat gambar penuh. Jika include_full=True, gambar utuh juga diinferensi sekali
+    agar objek yang lebih besar dari tile tetap terdeteksi.
+    """
+    batch_size = max(1, int(batch_size or config.SLICE_BATCH_SIZE))
+    include_full = config.SLICE_INCLUDE_FULL if include_full is None else include_full
+    height, width = image_bgr.shape[:2]
+    windows = slice_windows(width, height, tile_size, overlap)
+
+    parts = []
+    if include_full and len(windows) > 1:
+        parts.extend(_predict_tiles(model, [image_bgr], conf))
+
+    for start in range(0, len(windows), batch_size):
+        batch_windows = windows[start:start + batch_size]
+        # Slice NumPy: view ke gambar asli, bukan salinan
+        tiles = [image_bgr[y1:y2, x1:x2] for x1, y1, x2, y2 in batch_windows]
+        for (x1, y1, _, _), detections in zip(batch_windows, _predict_tiles(model, tiles, conf)):
+            detections[:, [0, 2]] += x1
+            detections[:, [1, 3]] += y1
+            parts.append(detections)
+
+    detections = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+    if len(windows) == 1:
+        return detections
+    return merge_detections(detections, merge)
+
+
+def should_slice(image_bgr):
+    """
+    True jika sisi terpanjang gambar >= config.SLICE_MIN_SIZE.
+    """
+    return max(image_bgr.shape[:2]) >= config.SLICE_MIN_SIZE
+
+
+def main(argv=None):
+    import cv2
+
+    from backends import load_backend
+    from utils1 import class_colors, class_names, detections_to_array, draw_boxes_on_frame
+
+    parser = argparse.ArgumentParser(description="Deteksi bertile untuk gambar resolusi tinggi.")
+    parser.add_argument("image", help="File gambar")
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--tile", type=int, default=config.SLICE_TILE_SIZE, help="Ukuran tile (piksel)")
+    parser.add_argument("--overlap", type=float, default=config.SLICE_OVERLAP, help="Rasio tumpang tindih tile")
+    parser.add_argument("--batch-size", type=int, default=config.SLICE_BATCH_SIZE, help="Jumlah tile per batch")
+    parser.add_argument("--merge", choices=MERGE_METHODS, default=config.SLICE_MERGE)
+    parser.add_argument("--no-full", action="store_true", help="Jangan inferensi gambar utuh")
+    parser.add_argument("--backend", default=config.MODEL_BACKEND)
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    parser.add_argument("--output", help="Simpan gambar beranotasi")
+    args = parser.parse_args(argv)
+
+    image = cv2.imread(args.image)
+    if image is None:
+        print(f"Gambar '{args.image}' tidak dapat dibaca.")
+        return 1
+    model = load_backend(args.backend, args.weights)
+
+    start = time.perf_counter()
+    full = detections_to_array(model.predict(image, conf=args.conf, verbose=False)[0])
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    detections = sliced_predict(model, image, args.conf, args.tile, args.overlap, args.batch_size,
+                                args.merge, include_full=not args.no_full)
+    sliced_time = time.perf_counter() - start
+
+    tiles = len(slice_windows(image.shape[1], image.shape[0], args.tile, args.overlap))
+    print(f"Gambar {image.shape[1]}x{image.shape[0]}, {tiles} tile")
+    print(f"{'Mode':<10} {'Deteksi':>8} {'Waktu (s)':>10}  " + "  ".join(class_names))
+    for name, dets, elapsed in (("utuh", full, full_time), ("bertile", detections, sliced_time)):
+        counts = np.bincount(dets[:, 5].astype(int), minlength=len(class_names))
+        print(f"{name:<10} {len(dets):>8} {elapsed:>10.2f}  " + "  ".join(str(c) for c in counts))
+
+    if args.output:
+        cv2.imwrite(args.output, draw_boxes_on_frame(image, detections, class_names, class_colors))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+File sementara per sesi Streamlit: upload yang di-spool ke disk dan hasil unduhan yang di-stream.
+
+Video yang diunggah disalin ke disk per chunk (config.SPOOL_CHUNK_SIZE), tanpa membuat
+salinan bytes utuh di memori. Hasil deteksi ditulis ke config.DOWNLOAD_DIR, yang disajikan
+server unduhan (download_server.py). Browser mengunduhnya per chunk (dengan dukungan
+Range), dan isi file tidak pernah masuk ke session state atau media manager Streamlit di
+setiap rerun.
+
+Setiap file dicatat di SessionFiles milik sesi. Ketika sesi berakhir dan Streamlit
+membuang session state-nya, finalizer menghapus semua file sesi tersebut. Sisa file
+dari proses yang berhenti tiba-tiba dihapus oleh sweep_stale_files() saat aplikasi start.
+"""
+import os
+import secrets
+import shutil
+import tempfile
+import time
+import weakref
+from urllib.parse import quote
+
+import config
+
+UPLOAD_PREFIX = "tbs_upload_"
+
+
+def _remove_path(path):
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+        # Folder token hasil unduhan ikut dihapus jika sudah kosong
+        directory = os.path.dirname(os.path.abspath(path))
+        if os.path.dirname(directory) == os.path.abspath(config.DOWNLOAD_DIR):
+            os.rmdir(directory)
+    except OSError:
+        pass
+
+
+def _remove_all(paths):
+    for path in list(paths):
+        _remove_path(path)
+    paths.clear()
+
+
+class SessionFiles:
+    """
+    File sementara milik satu sesi. Semua file yang dicatat dihapus saat objek ini
+    dibuang (sesi berakhir) atau saat proses berhenti normal.
+    """
+    def __init__(self):
+        self.paths = set()
+        self._finalizer = weakref.finalize(self, _remove_all, self.paths)
+
+    def track(self, path):
+        self.paths.add(path)
+        return path
+
+    def remove(self, path):
+        if path:
+            self.paths.discard(path)
+            _remove_path(path)
+
+    def cleanup(self):
+        _remove_all(self.paths)
+
+
+def spool_upload(uploaded_file, suffix="", chunk_size=None):
+    """
+    Menyalin file yang diunggah (objek file) ke file sementara per chunk.
+    Mengembalikan path file tersebut.
+    """
+    chunk_size = chunk_size or config.SPOOL_CHUNK_SIZE
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, prefix=UPLOAD_PREFIX, suffix=suffix) as temp_file:
+        shutil.copyfileobj(uploaded_file, temp_file, chunk_size)
+    return temp_file.name
+
+
+def new_download_path(filename):
+    """
+    Path baru DOWNLOAD_DIR/<token acak>/filename. Token tidak dapat ditebak sehingga
+    file hanya dapat diunduh oleh sesi yang menerima URL-nya.
+    """
+    directory = os.path.join(config.DOWNLOAD_DIR, secrets.token_urlsafe(16))
+    os.makedirs(directory)
+    return os.path.join(directory, filename)
+
+
+def download_url(path, base_url, download=False):
+    """
+    URL file di DOWNLOAD_DIR pada server unduhan (download_server.py). base_url adalah URL
+    folder /files/ server tersebut. download=True meminta browser menyimpan file
+    (Content-Disposition: attachment), bukan memutar/menampilkannya.
+    """
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(config.DOWNLOAD_DIR))
+    url = base_url.rstrip("/") + "/" + quote(relative.replace(os.sep, "/"))
+    return url + "?download=1" if download else url
+
+
+def sweep_stale_files(max_age=None):
+    """
+    Menghapus upload sementara dan hasil unduhan yang lebih tua dari max_age detik
+    (default config.SPOOL_MAX_AGE). Mengembalikan jumlah file yang dihapus.
+    """
+    max_age = config.SPOOL_MAX_AGE if max_age is None else max_age
+    cutoff = time.time() - max_age
+    candidates = [os.path.join(tempfile.gettempdir(), name)
+                  for name in os.listdir(tempfile.gettempdir()) if name.startswith(UPLOAD_PREFIX)]
+    if os.path.isdir(config.DOWNLOAD_DIR):
+        for token in os.listdir(config.DOWNLOAD_DIR):
+            directory = os.path.join(config.DOWNLOAD_DIR, token)
+            if os.path.isdir(directory):
+                candidates.extend(os.path.join(directory, name) for name in os.listdir(directory))
+
+    removed = 0
+    for path in candidates:
+        try:
+            if os.path.getmtime(path) < cutoff:
+                _remove_path(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,30 @@
+import json
+
+from tornado.testing import AsyncHTTPTestCase
+
+import api_server
+
+
+class FailingRegistry:
+    def get(self, name=None, backend=None):
+        raise FileNotFoundError("File bobot model 'best.pt' tidak ditemukan")
+
+
+class ReadyErrorTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.service = api_server.DetectionService()
+        return api_server.make_app(self.service)
+
+    def test_ready_reports_load_error(self):
+        original = api_server.get_model_registry
+        api_server.get_model_registry = FailingRegistry
+        try:
+            self.service.load()
+        finally:
+            api_server.get_model_registry = original
+
+        response = self.fetch("/ready")
+        assert response.code == 503
+        payload = json.loads(response.body)
+        assert payload["status"] == "error"
+        assert payload["error"] == "FileNotFoundError: File bobot model 'best.pt' tidak ditemukan"
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+import pytest
+
+import backends
+import config
+
+BOXES = np.array([[10, 10, 60, 80, 0.9, 1], [100, 40, 150, 120, 0.6, 2]], dtype=np.float32)
+
+
+class Tensor:
+    def __init__(self, data):
+        self.data = data
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+
+class FakeModel:
+    """
+    Model palsu yang mencatat argumen predict dan mengembalikan box tetap.
+    """
+    def __init__(self, boxes, tensor=False):
+        self.boxes = boxes
+        self.tensor = tensor
+        self.calls = []
+
+    def predict(self, image, **kwargs):
+        self.calls.append(kwargs)
+        data = Tensor(self.boxes) if self.tensor else self.boxes
+        return [backends.DetectionResults(data, image.shape[:2])]
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "kebun.jpg"
+    cv2.imwrite(str(path), np.zeros((160, 200, 3), dtype=np.uint8))
+    return str(path)
+
+
+def run_parity(monkeypatch, image_path, candidate_boxes, backend="onnx", **kwargs):
+    reference = FakeModel(BOXES, tensor=True)
+    candidate = FakeModel(candidate_boxes)
+    monkeypatch.setattr(backends, "load_pytorch_model", lambda weights, fused=None: reference)
+    monkeypatch.setattr(backends, "load_backend", lambda backend, weights: candidate)
+    report = backends.check_parity([image_path], backend, "best.pt", **kwargs)
+    return report, reference, candidate
+
+
+def test_parity_ok_for_identical_detections(monkeypatch, image_path):
+    report, _, _ = run_parity(monkeypatch, image_path, BOXES.copy())
+    assert report[0]["ok"]
+    assert report[0]["matched"] == 2
+
+
+def test_parity_calls_models_like_production(monkeypatch, image_path):
+    # imgsz tidak boleh dipaksa: produksi memakai ukuran input bawaan checkpoint
+    for backend in ("onnx", "pytorch"):
+        _, reference, candidate = run_parity(monkeypatch, image_path, BOXES.copy(), backend)
+        assert "imgsz" not in reference.calls[0]
+        assert "imgsz" not in candidate.calls[0]
+
+
+def test_parity_reports_missing_and_shifted_boxes(monkeypatch, image_path):
+    shifted = BOXES[:1].copy()
+    shifted[0, :4] += 15
+    report, _, _ = run_parity(monkeypatch, image_path, shifted)
+    assert not report[0]["ok"]
+    assert report[0]["matched"] == 0
+    assert report[0]["candidate"] == 1
+
+
+def test_parity_score_tolerance(monkeypatch, image_path):
+    scores = BOXES.copy()
+    scores[:, 4] -= 0.1
+    report, _, _ = run_parity(monkeypatch, image_path, scores, score_tolerance=0.05)
+    assert report[0]["matched"] == 2
+    assert report[0]["max_score_diff"] == pytest.approx(0.1, abs=1e-6)
+    assert not report[0]["ok"]
+
+
+def test_parity_unreadable_image(monkeypatch, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        run_parity(monkeypatch, str(tmp_path / "hilang.jpg"), BOXES.copy())
+
+
+class NamedModel:
+    def __init__(self, names):
+        self.names = names
+
+
+def test_class_names_accepted_for_maturity_model():
+    backends.check_class_names(NamedModel(dict(enumerate(config.CLASS_NAMES))), "best.pt")
+    backends.check_class_names(NamedModel(list(config.CLASS_NAMES)), "best.onnx")
+
+
+def test_class_names_rejected_for_other_models():
+    coco = NamedModel({i: f"kelas{i}" for i in range(80)})
+    with pytest.raises(ValueError, match="80 kelas"):
+        backends.check_class_names(coco, "yolov8n.pt")
+    with pytest.raises(ValueError):
+        backends.check_class_names(NamedModel(list(reversed(config.CLASS_NAMES))), "best.pt")
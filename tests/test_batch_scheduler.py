@@ -0,0 +1,94 @@
+import threading
+import time
+
+import numpy as np
+
+import config
+from backends import DetectionResults
+from batch_scheduler import BatchScheduler, get_batch_scheduler, model_lock
+from utils1 import detect_frames
+
+
+class ShapeModel:
+    """
+    Model palsu yang mencatat ukuran gambar per panggilan predict; satu box per gambar
+    dengan skor dari kecerahan gambar.
+    """
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.overlap = False
+        self._lock = threading.Lock()
+
+    def predict(self, images, conf=0.25, verbose=False):
+        images = images if isinstance(images, list) else [images]
+        with self._lock:
+            self.active += 1
+            self.overlap |= self.active > 1
+            self.calls.append([image.shape for image in images])
+        time.sleep(0.005)
+        results = []
+        for image in images:
+            score = float(image.mean()) / 255
+            data = np.array([[1, 2, 30, 40, score, 1]], dtype=np.float32)
+            results.append(DetectionResults(data[data[:, 4] >= conf], image.shape[:2]))
+        with self._lock:
+            self.active -= 1
+        return results
+
+
+def image(height, width, level):
+    return np.full((height, width, 3), level, dtype=np.uint8)
+
+
+def test_batch_is_split_by_image_shape():
+    model = ShapeModel()
+    scheduler = BatchScheduler(model, window_ms=200, max_batch_size=8)
+    try:
+        images = [image(120, 160, 200), image(90, 160, 100), image(120, 160, 150), image(90, 160, 250)]
+        futures = [scheduler.submit(frame, conf=0.1) for frame in images]
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        scheduler.close()
+
+    # Satu forward pass per ukuran, setiap panggilan hanya berisi satu ukuran
+    assert sorted(len(shapes) for shapes in model.calls) == [2, 2]
+    assert all(len(set(shapes)) == 1 for shapes in model.calls)
+    assert [round(float(r[0, 4]) * 255) for r in results] == [200, 100, 150, 250]
+
+
+def test_per_request_threshold():
+    model = ShapeModel()
+    scheduler = BatchScheduler(model, window_ms=200, max_batch_size=8)
+    try:
+        low = scheduler.submit(image(64, 64, 100), conf=0.1)
+        high = scheduler.submit(image(64, 64, 100), conf=0.5)
+        assert len(low.result(timeout=5)) == 1
+        assert len(high.result(timeout=5)) == 0
+    finally:
+        scheduler.close()
+
+
+def test_detect_frames_goes_through_scheduler(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_SCHEDULER_ENABLED", True)
+    model = ShapeModel()
+    frames = [image(48, 64, 50 * i) for i in range(1, 5)]
+    results = detect_frames(model, frames, conf=0.01)
+    scheduler = get_batch_scheduler(model)
+    assert scheduler.requests == 4
+    assert len(results) == 4
+    scheduler.close()
+
+
+def test_detect_frames_serialized_without_scheduler(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_SCHEDULER_ENABLED", False)
+    model = ShapeModel()
+    assert model_lock(model) is model_lock(model)
+    threads = [threading.Thread(target=detect_frames, args=(model, [image(48, 64, 80)] * 4, 0.01))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(model.calls) == 8
+    assert not model.overlap
@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+
+from detection_cache import DetectionCache, hash_bytes, model_identity
+
+IMAGE = b"gambar-tbs"
+DETECTIONS = np.array([[0, 0, 10, 10, 0.9, 1],
+                       [5, 5, 20, 20, 0.4, 2],
+                       [8, 8, 30, 30, 0.2, 0]], dtype=np.float32)
+
+
+class FakeModel:
+    def __init__(self, ckpt_path):
+        self.ckpt_path = ckpt_path
+
+
+class Detector:
+    """
+    detect() palsu yang menghitung berapa kali inferensi dijalankan.
+    """
+    def __init__(self, detections=DETECTIONS):
+        self.detections = detections
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.detections
+
+
+def weights(tmp_path, content=b"bobot-v1"):
+    path = tmp_path / "best.pt"
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_miss_then_hit(tmp_path):
+    cache = DetectionCache()
+    model = FakeModel(weights(tmp_path))
+    detect = Detector()
+    first = cache.get_or_detect(IMAGE, model, 0.3, detect)
+    second = cache.get_or_detect(IMAGE, model, 0.3, detect)
+    assert detect.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(first, second)
+    # Gambar lain: miss
+    cache.get_or_detect(b"gambar-lain", model, 0.3, detect)
+    assert detect.calls == 2
+
+
+def test_lower_conf_entry_reused_for_higher_conf():
+    cache = DetectionCache()
+    cache.put("a", "model", 0.1, DETECTIONS)
+    np.testing.assert_array_equal(cache.get("a", "model", 0.3), DETECTIONS[:2])
+    np.testing.assert_array_equal(cache.get("a", "model", 0.5), DETECTIONS[:1])
+    # Threshold lebih rendah dari entri yang tersimpan: tidak bisa dipakai
+    cache.put("b", "model", 0.5, DETECTIONS[:1])
+    assert cache.get("b", "model", 0.3) is None
+    # Entri dengan threshold tertinggi yang masih <= conf dipilih
+    cache.put("a", "model", 0.4, DETECTIONS[:1])
+    np.testing.assert_array_equal(cache.get("a", "model", 0.45), DETECTIONS[:1])
+
+
+def test_model_change_invalidates_key(tmp_path):
+    cache = DetectionCache()
+    path = weights(tmp_path)
+    identity = model_identity(FakeModel(path))
+    detect = Detector()
+    cache.get_or_detect(IMAGE, FakeModel(path), 0.3, detect)
+
+    # Bobot diganti di path yang sama (ukuran berbeda): identitas dan kunci berubah
+    weights(tmp_path, b"bobot-v2-lebih-besar")
+    assert model_identity(FakeModel(path)) != identity
+    cache.get_or_detect(IMAGE, FakeModel(path), 0.3, detect)
+    assert detect.calls == 2
+
+    # Mode inferensi lain untuk model yang sama juga memakai kunci sendiri
+    cache.get_or_detect(IMAGE, FakeModel(path), 0.3, detect, variant="tile=544")
+    assert detect.calls == 3
+    cache.get_or_detect(IMAGE, FakeModel(path), 0.3, detect, variant="tile=544")
+    assert detect.calls == 3
+
+
+def test_disk_entries_survive_new_instance(tmp_path):
+    disk_dir = str(tmp_path / "cache")
+    cache = DetectionCache(disk_dir=disk_dir)
+    cache.put("a", "model", 0.2, DETECTIONS)
+
+    restarted = DetectionCache(disk_dir=disk_dir)
+    assert len(restarted) == 0
+    np.testing.assert_array_equal(restarted.get("a", "model", 0.3), DETECTIONS[:2])
+    assert restarted.hits == 1
+    # Setelah dibaca dari disk, entri juga ada di memori
+    assert len(restarted) == 1
+    assert restarted.get("a", "other-model", 0.3) is None
+
+
+def test_file_written_by_other_process_is_found(tmp_path):
+    disk_dir = str(tmp_path / "cache")
+    reader = DetectionCache(disk_dir=disk_dir)
+    DetectionCache(disk_dir=disk_dir).put("a", "model", 0.3, DETECTIONS[:2])
+    np.testing.assert_array_equal(reader.get("a", "model", 0.3), DETECTIONS[:2])
+
+
+def test_memory_lru_eviction():
+    entry_size = DETECTIONS.nbytes + 256
+    cache = DetectionCache(max_bytes=2 * entry_size)
+    cache.put("a", "model", 0.3, DETECTIONS)
+    cache.put("b", "model", 0.3, DETECTIONS)
+    cache.get("a", "model", 0.3) # "a" baru dipakai, "b" dibuang lebih dulu
+    cache.put("c", "model", 0.3, DETECTIONS)
+    assert len(cache) == 2
+    assert cache.size_bytes <= 2 * entry_size
+    assert cache.get("b", "model", 0.3) is None
+    assert cache.get("a", "model", 0.3) is not None
+    assert cache.get("c", "model", 0.3) is not None
+
+
+def test_disk_eviction(tmp_path):
+    disk_dir = str(tmp_path / "cache")
+    cache = DetectionCache(disk_dir=disk_dir)
+    cache.put("a", "model", 0.3, DETECTIONS)
+    file_size = os.path.getsize(next(iter(cache._disk_files)))
+
+    cache = DetectionCache(max_bytes=0, disk_dir=disk_dir, disk_max_bytes=2 * file_size)
+    cache.put("b", "model", 0.3, DETECTIONS)
+    cache.put("c", "model", 0.3, DETECTIONS)
+    assert len(os.listdir(disk_dir)) == 2
+    assert cache.get("a", "model", 0.3) is None
+    assert cache.get("c", "model", 0.3) is not None
+
+
+def test_hash_bytes_depends_on_content():
+    assert hash_bytes(IMAGE) == hash_bytes(bytes(IMAGE))
+    assert hash_bytes(IMAGE) != hash_bytes(IMAGE + b"\0")
@@ -0,0 +1,104 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import config
+from detection_records import DetectionRecords, DetectionRecordWriter
+from utils1 import VideoDetections
+
+
+def frame_detections(frame_index, count=3):
+    rows = [[10 * i, 20 * i, 10 * i + 5, 20 * i + 5, 0.2 + 0.25 * i, (frame_index + i) % 4] for i in range(count)]
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def test_writer_flushes_several_row_groups(tmp_path):
+    path = tmp_path / "kebun.parquet"
+    with DetectionRecordWriter(path, row_group_size=10) as writer:
+        for index in range(25):
+            writer.append("kebun.mp4", frame_detections(index), index, index / 10)
+        # Row group yang sudah penuh langsung ditulis ke file .part
+        assert len(writer._buffer) < 10
+    assert writer.rows == 75
+    assert not (tmp_path / "kebun.parquet.part").exists()
+
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_rows == 75
+    assert metadata.num_row_groups >= 7
+    table = pq.read_table(path)
+    assert table.column("frame_index").to_pylist() == np.repeat(np.arange(25), 3).tolist()
+    np.testing.assert_allclose(table.column("timestamp").to_numpy(), np.repeat(np.arange(25), 3) / 10)
+
+
+def test_writer_append_chunk_and_csv(tmp_path):
+    path = tmp_path / "kebun.csv"
+    detections = np.concatenate([frame_detections(index) for index in range(4)])
+    with DetectionRecordWriter(path, row_group_size=5) as writer:
+        writer.append_chunk("kebun.mp4", [0, 3, 6, 9], [3, 3, 3, 3], detections, fps=3)
+    lines = path.read_text().splitlines()
+    assert len(lines) == 13 # Header hanya sekali walau ada beberapa row group
+    assert lines[0].split(",")[:5] == ['"source_id"', '"frame_index"', '"timestamp"', '"class_id"', '"class_name"']
+
+
+def test_writer_abort_leaves_no_file(tmp_path):
+    path = tmp_path / "kebun.parquet"
+    try:
+        with DetectionRecordWriter(path, row_group_size=2) as writer:
+            writer.append("kebun.mp4", frame_detections(0), 0)
+            raise RuntimeError("proses gagal")
+    except RuntimeError:
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_dictionary_columns(tmp_path):
+    records = DetectionRecords(capacity=2)
+    records.append("a.jpg", frame_detections(0))
+    records.append("b.jpg", frame_detections(1))
+    records.append("a.jpg", np.array([[0, 0, 1, 1, 0.9, 6]], dtype=np.float32)) # Kelas di luar class_names
+
+    table = records.to_arrow()
+    for name in ("source_id", "class_name"):
+        assert pa.types.is_dictionary(table.schema.field(name).type)
+    source = table.column("source_id").combine_chunks()
+    assert source.dictionary.to_pylist() == ["a.jpg", "b.jpg"]
+    assert source.indices.to_pylist() == [0, 0, 0, 1, 1, 1, 0]
+    class_name = table.column("class_name").combine_chunks()
+    assert class_name.dictionary.to_pylist() == config.CLASS_NAMES + ["4", "5", "6"]
+    assert table.column("class_name").to_pylist() == ["kurang matang", "matang", "mentah",
+                                                      "matang", "mentah", "terlalu matang", "6"]
+
+    # Parquet mempertahankan tipe dictionary, CSV menulis string biasa
+    records.to_parquet(tmp_path / "rekaman.parquet")
+    assert pa.types.is_dictionary(pq.read_table(tmp_path / "rekaman.parquet").schema.field("class_name").type)
+    records.to_csv(tmp_path / "rekaman.csv")
+    assert '"a.jpg"' in (tmp_path / "rekaman.csv").read_text()
+
+
+def test_video_detections_append_to_records():
+    video_detections = VideoDetections(source_id="kebun.mp4", source_fps=10)
+    for index in range(9):
+        inferred = index % 3 == 0
+        detections = frame_detections(index) if inferred else last
+        video_detections.add(index, detections, inferred)
+        last = detections
+
+    # Hanya frame yang diinferensi yang menambah baris
+    assert len(video_detections) == 9
+    assert len(video_detections.records) == 9
+    frames = list(video_detections.frames())
+    assert [index for index, _, _ in frames] == list(range(9))
+    for index, detections, _ in frames:
+        np.testing.assert_array_equal(detections, frame_detections(index - index % 3))
+    # Frame yang memakai ulang deteksi sebelumnya berbagi array yang sama
+    assert frames[1][1] is frames[0][1]
+    np.testing.assert_array_equal(video_detections.frame_detections(-1), frame_detections(6))
+
+    records = DetectionRecords.from_video_detections("kebun.mp4", video_detections, conf=0.4)
+    table = records.to_arrow()
+    assert table.column("frame_index").to_pylist() == [0, 0, 3, 3, 6, 6]
+    assert min(table.column("score").to_pylist()) >= 0.4
+    np.testing.assert_allclose(table.column("timestamp").to_numpy(), [0, 0, 0.3, 0.3, 0.6, 0.6])
+    assert table.column("source_id").to_pylist() == ["kebun.mp4"] * 6
+    # Rekaman asli tidak berubah
+    assert len(video_detections.records) == 9
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+import pytest
+
+import config
+from utils1 import FrameSampler, read_frame_batches
+
+
+def inferred(sampler, frames):
+    return [index for index in range(frames) if sampler.should_infer(index)]
+
+
+class FakeCapture:
+    """
+    VideoCapture palsu: frame ke-i berisi nilai i, mendukung read, grab dan seek.
+    """
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+        self.decoded = 0
+        self.seeks = []
+
+    def read(self):
+        if self.position >= self.frames:
+            return False, None
+        frame = np.full((2, 2, 3), self.position % 256, dtype=np.uint8)
+        self.position += 1
+        self.decoded += 1
+        return True, frame
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.position += 1
+        return True
+
+    def set(self, prop, value):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        self.seeks.append(value)
+        self.position = int(value)
+        return True
+
+
+@pytest.mark.parametrize("sampler, expected", [
+    (FrameSampler("all"), list(range(12))),
+    (FrameSampler("stride", 1), list(range(12))),
+    (FrameSampler("stride", 3), [0, 3, 6, 9]),
+    (FrameSampler("stride", 5), [0, 5, 10]),
+    (FrameSampler("fps", target_fps=10).bind(30), [0, 3, 6, 9]),
+    (FrameSampler("fps", target_fps=15).bind(30), [0, 2, 4, 6, 8, 10]),
+    # Pecahan: 25 fps -> 10 inferensi/detik bergantian tiap 3 dan 2 frame
+    (FrameSampler("fps", target_fps=10).bind(25), [0, 3, 5, 8, 10]),
+    # Target >= fps sumber: semua frame
+    (FrameSampler("fps", target_fps=60).bind(30), list(range(12))),
+])
+def test_should_infer_indices(sampler, expected):
+    assert inferred(sampler, 12) == expected
+
+
+def test_fractional_fps_below_one():
+    assert inferred(FrameSampler("fps", target_fps=0.1).bind(30), 1000) == [0, 300, 600, 900]
+    assert inferred(FrameSampler("fps", target_fps=0.5).bind(29.97), 200) == [0, 60, 120, 180]
+
+
+@pytest.mark.parametrize("sampler", [
+    FrameSampler("all"),
+    FrameSampler("stride", 4),
+    FrameSampler("fps", target_fps=10).bind(30),
+    FrameSampler("fps", target_fps=10).bind(25),
+    FrameSampler("fps", target_fps=7).bind(29.97),
+    FrameSampler("fps", target_fps=0.1).bind(30),
+    FrameSampler("fps", target_fps=2.5).bind(24),
+])
+def test_next_inference_index_matches_should_infer(sampler):
+    frames = 2000
+    indices = inferred(sampler, frames)
+    for index in range(indices[-1]):
+        expected = next(i for i in indices if i > index)
+        assert sampler.next_inference_index(index) == expected, index
+
+
+@pytest.mark.parametrize("sampler, source_fps, expected", [
+    (FrameSampler("all"), 30, 30),
+    (FrameSampler("stride", 1), 30, 30),
+    (FrameSampler("stride", 3), 30, 10),
+    (FrameSampler("stride", 4), 25, 6.25),
+    (FrameSampler("fps", target_fps=10).bind(30), 30, 10),
+    (FrameSampler("fps", target_fps=0.5).bind(30), 30, 0.5),
+    (FrameSampler("fps", target_fps=60).bind(30), 30, 30),
+])
+def test_output_fps(sampler, source_fps, expected):
+    assert sampler.output_fps(source_fps) == pytest.approx(expected)
+
+
+def test_bind_without_fps_defaults_to_30():
+    assert FrameSampler("fps", target_fps=10).bind(0).source_fps == 30.0
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        FrameSampler("acak")
+
+
+def test_batches_keep_skipped_frames_bounded():
+    cap = FakeCapture(50)
+    batches = list(read_frame_batches(cap, 8, FrameSampler("stride", 7), keep_skipped=True))
+    assert [len(batch) for batch in batches] == [8, 8, 8, 8, 8, 8, 2]
+    rows = [row for batch in batches for row in batch]
+    assert [index for index, _, _ in rows] == list(range(50))
+    assert [index for index, _, infer in rows if infer] == [0, 7, 14, 21, 28, 35, 42, 49]
+    assert all(frame[0, 0, 0] == index for index, frame, _ in rows)
+
+
+@pytest.mark.parametrize("seek_min_skip", [1, 1000])
+def test_batches_without_skipped_frames(monkeypatch, seek_min_skip):
+    # seek_min_skip=1: selalu seek; 1000: selalu grab
+    monkeypatch.setattr(config, "VIDEO_SEEK_MIN_SKIP", seek_min_skip)
+    cap = FakeCapture(50)
+    batches = list(read_frame_batches(cap, 3, FrameSampler("fps", target_fps=10).bind(25), keep_skipped=False))
+    rows = [row for batch in batches for row in batch]
+    expected = [i for i in range(50) if FrameSampler("fps", target_fps=10).bind(25).should_infer(i)]
+    assert [index for index, _, _ in rows] == expected
+    assert all(infer for _, _, infer in rows)
+    assert all(frame[0, 0, 0] == index for index, frame, _ in rows)
+    assert all(len(batch) <= 3 for batch in batches)
+    # Frame yang dilewati tidak di-decode
+    assert cap.decoded == len(expected)
+    assert bool(cap.seeks) == (seek_min_skip == 1)
+
+
+def test_batches_resume_from_start():
+    cap = FakeCapture(20)
+    rows = [row for batch in read_frame_batches(cap, 4, FrameSampler("stride", 3), keep_skipped=True, start=9)
+            for row in batch]
+    assert cap.seeks == [9]
+    assert [index for index, _, _ in rows] == list(range(9, 20))
+    assert [index for index, _, infer in rows if infer] == [9, 12, 15, 18]
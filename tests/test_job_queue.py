@@ -0,0 +1,225 @@
+import contextlib
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import config
+import job_queue
+from backends import DetectionResults
+from job_queue import JobCancelled, JobStore, JobWorker, load_checkpoints
+from utils1 import FrameSampler
+
+FRAMES = 40
+SIZE = (160, 120)
+
+
+class Crash(BaseException):
+    """
+    Proses worker mati di tengah job (bukan Exception: job tidak ditandai gagal).
+    """
+
+
+class FakeModel:
+    """
+    Model palsu yang deterministik: satu box per frame, posisi dan kelas dari kecerahan frame.
+    Jika crash_after diisi, panggilan sesudah panggilan ke-crash_after melempar Crash.
+    """
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.calls = 0
+        self.frames = 0
+
+    def predict(self, frames, conf=0.25, verbose=False):
+        self.calls += 1
+        if self.crash_after is not None and self.calls > self.crash_after:
+            raise Crash()
+        frames = frames if isinstance(frames, list) else [frames]
+        self.frames += len(frames)
+        results = []
+        for frame in frames:
+            level = float(frame.mean())
+            data = np.array([[level / 4, level / 8, level / 4 + 30, level / 8 + 20, 0.9, int(level) % 4]],
+                            dtype=np.float32)
+            results.append(DetectionResults(data, frame.shape[:2]))
+        return results
+
+
+@pytest.fixture(autouse=True)
+def job_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(config, "JOB_CHECKPOINT_FRAMES", 8)
+    monkeypatch.setattr(config, "BATCH_SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(config, "VIDEO_RENDER_CACHE_SIZE", 4)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs" / "jobs.sqlite3")
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "kebun.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, SIZE)
+    for i in range(FRAMES):
+        writer.write(np.full((SIZE[1], SIZE[0], 3), (i * 6) % 256, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def submit(store, video, tmp_path, name, conf=0.3):
+    # submit memindahkan file sumber, jadi setiap job mendapat salinannya sendiri
+    source = str(tmp_path / name)
+    shutil.copy(video, source)
+    return store.submit(source, conf=conf, sampler=FrameSampler("stride", 3), keep_skipped=True, codec="mjpg")
+
+
+def make_stale(store, job_id):
+    stale = time.time() - config.JOB_STALE_SECONDS - 1
+    store._execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (stale, job_id))
+
+
+def test_stale_running_job_is_taken_over(store, video, tmp_path):
+    job_id = submit(store, video, tmp_path, "a.avi")
+    assert store.claim("worker-a")["id"] == job_id
+
+    # Heartbeat masih baru: job tidak boleh diambil worker lain
+    assert store.claim("worker-b") is None
+
+    make_stale(store, job_id)
+    job = store.claim("worker-b")
+    assert job["id"] == job_id
+    assert job["worker"] == "worker-b"
+    assert job["status"] == "running"
+
+    # Worker lama yang ternyata masih hidup berhenti saat memperbarui progres
+    with pytest.raises(JobCancelled):
+        store.update(job_id, "worker-a", frames_done=1)
+    store.update(job_id, "worker-b", frames_done=1)
+
+
+def test_update_after_cancel_raises(store, video, tmp_path):
+    job_id = submit(store, video, tmp_path, "a.avi")
+    store.claim("worker-a")
+    assert store.cancel(job_id)
+    with pytest.raises(JobCancelled):
+        store.update(job_id, "worker-a", frames_done=1)
+    assert store.get(job_id)["status"] == "cancelled"
+    assert store.claim("worker-b") is None
+
+
+def detections_of(store, job_id):
+    job = store.get(job_id)
+    video_detections = load_checkpoints(store.job_dir(job_id), job["next_frame"])
+    return (list(video_detections.frame_indices), list(video_detections.inferred),
+            [d.tolist() for _, d, _ in video_detections.frames()])
+
+
+def test_checkpoint_resume_matches_uninterrupted_run(store, video, tmp_path):
+    reference_id = submit(store, video, tmp_path, "a.avi")
+    resumed_id = submit(store, video, tmp_path, "b.avi")
+
+    worker = JobWorker(FakeModel(), store, batch_size=4)
+    worker.run(store.claim(worker.worker_id))
+    assert store.get(reference_id)["status"] == "done"
+
+    # Worker pertama mati setelah beberapa batch; checkpoint yang sudah tertulis tetap ada
+    crashing = JobWorker(FakeModel(crash_after=5), store, batch_size=4)
+    with pytest.raises(Crash):
+        crashing.run(store.claim(crashing.worker_id))
+    interrupted = store.get(resumed_id)
+    assert interrupted["status"] == "running"
+    assert 0 < interrupted["next_frame"] < FRAMES
+
+    make_stale(store, resumed_id)
+    model = FakeModel()
+    worker = JobWorker(model, store, batch_size=4)
+    job = store.claim(worker.worker_id)
+    assert job["id"] == resumed_id
+    worker.run(job)
+
+    resumed = store.get(resumed_id)
+    assert resumed["status"] == "done"
+    assert resumed["next_frame"] == FRAMES
+    # Frame sebelum checkpoint tidak diinferensi ulang
+    assert model.frames < -(-FRAMES // 3)
+    assert detections_of(store, resumed_id) == detections_of(store, reference_id)
+    assert resumed["result"]["frames"] == store.get(reference_id)["result"]["frames"] == FRAMES
+
+
+def test_rerender_reuses_render_cache(store, video, tmp_path):
+    job_id = submit(store, video, tmp_path, "a.avi", conf=0.3)
+    worker = JobWorker(FakeModel(), store, batch_size=4)
+    worker.run(store.claim(worker.worker_id))
+    first_output = store.get(job_id)["output_path"]
+
+    # Threshold baru: fase render dijalankan lagi tanpa model
+    assert store.rerender(job_id, 0.5)
+    job = store.get(job_id)
+    assert (job["status"], job["phase"]) == ("queued", "render")
+    model = FakeModel()
+    worker = JobWorker(model, store, batch_size=4)
+    worker.run(store.claim(worker.worker_id))
+    job = store.get(job_id)
+    assert job["status"] == "done"
+    assert model.calls == 0
+    assert job["output_path"] != first_output
+    assert set(job["result"]["renders"]) == {job_queue.render_key({"conf": 0.3, "codec": "mjpg"}),
+                                             job_queue.render_key({"conf": 0.5, "codec": "mjpg"})}
+
+    # Kembali ke threshold awal: hasil render lama dipakai langsung, tanpa antrian dan encode
+    mtime = os.path.getmtime(first_output)
+    assert store.rerender(job_id, 0.3)
+    job = store.get(job_id)
+    assert job["status"] == "done"
+    assert job["output_path"] == first_output
+    assert job["params"]["conf"] == 0.3
+    assert os.path.getmtime(first_output) == mtime
+    assert store.claim("worker-c") is None
+
+
+def test_records_exported_when_worker_dies_before_export(store, video, tmp_path, monkeypatch):
+    job_id = submit(store, video, tmp_path, "a.avi")
+    export_records = job_queue.export_records
+
+    def crash(*args):
+        raise Crash()
+
+    # Fase detect selesai (phase = render), lalu proses mati sebelum rekaman deteksi ditulis
+    monkeypatch.setattr(job_queue, "export_records", crash)
+    worker = JobWorker(FakeModel(), store, batch_size=4)
+    with pytest.raises(Crash):
+        worker.run(store.claim(worker.worker_id))
+    assert store.get(job_id)["phase"] == "render"
+    assert not os.path.exists(store.records_path(job_id))
+
+    monkeypatch.setattr(job_queue, "export_records", export_records)
+    make_stale(store, job_id)
+    worker = JobWorker(FakeModel(), store, batch_size=4)
+    worker.run(store.claim(worker.worker_id))
+    assert store.get(job_id)["status"] == "done"
+    assert os.path.exists(store.records_path(job_id))
+
+
+def test_heartbeat_while_model_loads(store, video, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOB_HEARTBEAT_SECONDS", 0.05)
+    job_id = submit(store, video, tmp_path, "a.avi")
+    worker = JobWorker(None, store, batch_size=4)
+    job = worker.store.claim(worker.worker_id)
+    heartbeats = []
+
+    @contextlib.contextmanager
+    def slow_acquire(job):
+        # Pemuatan model yang lama: heartbeat tetap berjalan sehingga job tidak diambil alih
+        time.sleep(0.3)
+        heartbeats.append(store.get(job_id)["heartbeat_at"])
+        yield FakeModel()
+
+    monkeypatch.setattr(worker, "_acquire_model", slow_acquire)
+    worker.run(job)
+    assert heartbeats[0] > job["heartbeat_at"]
+    assert store.get(job_id)["status"] == "done"
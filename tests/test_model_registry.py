@@ -0,0 +1,31 @@
+import pytest
+
+import config
+import model_registry
+
+
+@pytest.fixture
+def weights_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DETECTION_MODEL_DIR", tmp_path)
+    monkeypatch.setattr(config, "MODEL_WEIGHTS", "best.pt")
+    (tmp_path / "kebun_v2.pt").write_bytes(b"")
+    monkeypatch.setattr(config, "DETECTION_MODEL_LIST", ["kebun_v2.pt", "yolov8n.pt"])
+    return tmp_path
+
+
+def test_model_names_lists_only_local_weights(weights_dir):
+    assert model_registry.model_names() == ["best.pt", "kebun_v2.pt"]
+
+
+def test_missing_weights_are_not_downloaded(weights_dir):
+    assert model_registry.resolve_weights("kebun_v2.pt") == str(weights_dir / "kebun_v2.pt")
+    with pytest.raises(FileNotFoundError):
+        model_registry.resolve_weights("yolov8n.pt")
+
+
+def test_registry_does_not_load_missing_weights(weights_dir):
+    loaded = []
+    registry = model_registry.ModelRegistry(loader=lambda backend, weights: loaded.append(weights))
+    with pytest.raises(FileNotFoundError):
+        registry.get("yolov8n.pt", "pytorch")
+    assert loaded == []
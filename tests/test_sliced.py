@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+import pytest
+
+import config
+import sliced
+from backends import DetectionResults
+from sliced import merge_detections, slice_windows, sliced_predict
+
+SIZE = 700
+TILE = 400
+OVERLAP = 0.25 # Window pada setiap sumbu: [0, 400) dan [300, 700)
+
+
+class FakeModel:
+    """
+    Model palsu: setiap persegi terang adalah satu objek, kelas dari kecerahannya
+    (50 * (kelas + 1)). Box yang terpotong tepi tile mendapat skor lebih rendah.
+    Jika duplicate=True, setiap box dilaporkan dua kali.
+    """
+    def __init__(self, duplicate=False):
+        self.duplicate = duplicate
+        self.batches = []
+
+    def predict(self, frames, conf=0.25, verbose=False):
+        frames = frames if isinstance(frames, list) else [frames]
+        self.batches.append([frame.shape[:2] for frame in frames])
+        results = []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            count, labels, stats, _ = cv2.connectedComponentsWithStats((frame[..., 0] > 0).astype(np.uint8))
+            rows = []
+            for label in range(1, count):
+                x, y, w, h = stats[label, :4]
+                class_id = int(frame[labels == label][0, 0]) // 50 - 1
+                clipped = x == 0 or y == 0 or x + w == width or y + h == height
+                rows.append([x, y, x + w, y + h, 0.6 if clipped else 0.9, class_id])
+                if self.duplicate:
+                    rows.append([x + 2, y + 2, x + w, y + h, 0.5, class_id])
+            data = np.array(rows, dtype=np.float32).reshape(-1, 6)
+            results.append(DetectionResults(data[data[:, 4] >= conf], frame.shape[:2]))
+        return results
+
+
+@pytest.fixture(autouse=True)
+def slice_config(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(config, "SLICE_MATCH_METRIC", "ios")
+    monkeypatch.setattr(config, "SLICE_MATCH_THRESHOLD", 0.5)
+
+
+def image_with(*objects, size=SIZE):
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    for x1, y1, x2, y2, class_id in objects:
+        image[y1:y2, x1:x2] = 50 * (class_id + 1)
+    return image
+
+
+def predict(model, image, merge, include_full=False, batch_size=4):
+    return sliced_predict(model, image, conf=0.3, tile_size=TILE, overlap=OVERLAP, batch_size=batch_size,
+                          merge=merge, include_full=include_full)
+
+
+def test_windows_cover_image_with_overlap():
+    assert slice_windows(SIZE, SIZE, TILE, OVERLAP) == [(0, 0, 400, 400), (300, 0, 700, 400),
+                                                         (0, 300, 400, 700), (300, 300, 700, 700)]
+    assert slice_windows(300, 200, TILE, OVERLAP) == [(0, 0, 300, 200)]
+
+
+def test_tile_offsets_map_to_full_image():
+    # Objek hanya terlihat di tile kanan bawah
+    detections = predict(FakeModel(), image_with((500, 550, 600, 620, 2)), "nms")
+    np.testing.assert_allclose(detections, [[500, 550, 600, 620, 0.9, 2]], rtol=1e-6)
+
+
+def test_box_split_across_tiles_merges_with_nms():
+    # Tile kiri melihat x 350-400 (terpotong), tile kanan melihat box utuh 350-450
+    detections = predict(FakeModel(), image_with((350, 100, 450, 180, 1)), "nms")
+    np.testing.assert_allclose(detections, [[350, 100, 450, 180, 0.9, 1]], rtol=1e-6)
+
+
+def test_box_split_across_tiles_merges_with_wbf():
+    detections = predict(FakeModel(), image_with((350, 100, 450, 180, 1)), "wbf")
+    # x2 dirata-rata dengan bobot skor: (400 * 0.6 + 450 * 0.9) / 1.5
+    np.testing.assert_allclose(detections, [[350, 100, 430, 180, 0.9, 1]], rtol=1e-5)
+
+
+def test_merge_keeps_classes_and_distant_boxes_apart():
+    image = image_with((350, 100, 450, 180, 1), (100, 500, 150, 550, 0), (550, 100, 650, 180, 3))
+    detections = predict(FakeModel(), image, "nms", include_full=True, batch_size=3)
+    assert sorted(detections[:, 5].tolist()) == [0, 1, 3]
+    np.testing.assert_allclose(detections[detections[:, 5] == 1, :4], [[350, 100, 450, 180]])
+
+
+def test_merge_detections_per_class():
+    detections = np.array([[0, 0, 100, 100, 0.9, 1],
+                           [0, 0, 50, 100, 0.7, 1],   # IoS 1 dengan box pertama
+                           [0, 0, 50, 100, 0.8, 2]],  # Kelas lain: tidak digabung
+                          dtype=np.float32)
+    assert merge_detections(detections, "nms", "ios", 0.5)[:, 4].tolist() == pytest.approx([0.9, 0.8])
+    # IoU 0.5 di bawah threshold 0.6: tetap terpisah
+    assert len(merge_detections(detections, "nms", "iou", 0.6)) == 3
+    with pytest.raises(ValueError):
+        merge_detections(detections, "rata")
+
+
+def test_single_window_skips_merge(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("merge_detections tidak boleh dipanggil untuk satu window")
+
+    monkeypatch.setattr(sliced, "merge_detections", fail)
+    model = FakeModel(duplicate=True)
+    detections = predict(model, image_with((50, 50, 150, 150, 1), size=300), "nms", include_full=True)
+    # Satu window: tidak ada inferensi gambar utuh tambahan dan duplikat tidak disaring
+    assert model.batches == [[(300, 300)]]
+    assert len(detections) == 2
+
+
+def test_tiles_run_in_batches():
+    model = FakeModel()
+    predict(model, image_with((350, 100, 450, 180, 1)), "nms", include_full=True, batch_size=3)
+    assert [len(batch) for batch in model.batches] == [1, 3, 1]
+    assert model.batches[0] == [(SIZE, SIZE)]
@@ -0,0 +1,74 @@
+import numpy as np
+
+from tracker import ObjectTracker
+
+CLASS_NAMES = ["kurang matang", "matang", "mentah", "terlalu matang"]
+
+
+def box(x, y, score, class_id, size=40):
+    return [x, y, x + size, y + size, score, class_id]
+
+
+def run(tracker, frames):
+    return [tracker.update(np.array(detections, dtype=np.float32).reshape(-1, 6)) for detections in frames]
+
+
+def test_two_moving_boxes_with_disappearance_and_class_flicker():
+    tracker = ObjectTracker(num_classes=4, iou_threshold=0.3, max_age=2, min_hits=3)
+    frames = []
+    for i in range(20):
+        detections = [box(10 + 4 * i, 20, 0.9, 1)] # "matang", bergerak ke kanan
+        if i < 10:
+            # Bergerak ke bawah lalu hilang; kelas berkedip "mentah" <-> "terlalu matang"
+            flicker = 3 if i % 3 == 2 else 2
+            detections.append(box(200, 10 + 3 * i, 0.8 if flicker == 2 else 0.6, flicker))
+        frames.append(detections)
+    outputs = run(tracker, frames)
+
+    # Track baru dilaporkan setelah min_hits deteksi
+    assert len(outputs[0]) == len(outputs[1]) == 0
+    assert len(outputs[2]) == 2
+    # ID tetap selama objek terlihat
+    assert len({tuple(np.sort(output[:, 6])) for output in outputs[2:10]}) == 1
+    # Objek yang hilang tidak lagi dilaporkan dan pensiun setelah max_age inferensi
+    assert len(outputs[10]) == 1
+    assert len(tracker.tracks) == 1
+    assert tracker.unique_counts(CLASS_NAMES) == {"kurang matang": 0, "matang": 1, "mentah": 1, "terlalu matang": 0}
+    assert tracker.unique_counts() == {0: 0, 1: 1, 2: 1, 3: 0}
+
+
+def test_short_lived_detection_is_not_counted():
+    tracker = ObjectTracker(num_classes=4, iou_threshold=0.3, max_age=2, min_hits=3)
+    frames = [[box(10 + 4 * i, 20, 0.9, 1)] for i in range(8)]
+    frames[3].append(box(300, 300, 0.5, 0)) # Deteksi palsu satu frame
+    frames[4].append(box(300, 300, 0.5, 0))
+    run(tracker, frames)
+    assert tracker.unique_counts(CLASS_NAMES) == {"kurang matang": 0, "matang": 1, "mentah": 0, "terlalu matang": 0}
+
+
+def test_reappearance_within_and_after_max_age():
+    frames = [[box(100, 100, 0.9, 2)] for _ in range(5)]
+
+    # Hilang selama max_age inferensi: track yang sama dilanjutkan
+    tracker = ObjectTracker(num_classes=4, iou_threshold=0.3, max_age=2, min_hits=3)
+    run(tracker, frames + [[], []] + frames)
+    assert tracker.unique_counts()[2] == 1
+
+    # Hilang lebih lama dari max_age: dihitung sebagai objek baru
+    tracker = ObjectTracker(num_classes=4, iou_threshold=0.3, max_age=2, min_hits=3)
+    run(tracker, frames + [[], [], []] + frames)
+    assert tracker.unique_counts()[2] == 2
+
+
+def test_predict_keeps_ids_between_inferred_frames():
+    tracker = ObjectTracker(num_classes=4, iou_threshold=0.3, max_age=2, min_hits=3)
+    ids = set()
+    for i in range(30):
+        # Model hanya dijalankan setiap frame ke-3; frame lain memakai prediksi tracker
+        if i % 3 == 0:
+            output = tracker.update(np.array([box(10 + 2 * i, 20, 0.9, 1)], dtype=np.float32))
+        else:
+            output = tracker.predict()
+        ids.update(output[:, 6].tolist())
+    assert ids == {1.0}
+    assert tracker.unique_counts()[1] == 1
@@ -0,0 +1,166 @@
+"""
+Tracker multi-objek ringan (gaya SORT) untuk menghitung TBS unik dalam video.
+
+Setiap track memakai filter Kalman kecepatan konstan pada [cx, cy, w, h]. Deteksi
+dipasangkan dengan posisi prediksi track berdasarkan IoU (Hungarian assignment), sehingga
+setiap tandan mendapat ID yang tetap selama terlihat. Kelas track ditentukan dari
+akumulasi skor per kelas, agar kelas yang berkedip antar frame tidak menghasilkan
+hitungan ganda.
+
+Karena posisi track dapat diprediksi tanpa deteksi, model cukup dijalankan setiap frame
+ke-k (FrameSampler mode "stride"); frame di antaranya memakai box hasil prediksi tracker.
+Semua komputasi berjalan di CPU dengan NumPy.
+"""
+from collections import Counter
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+import config
+from backends import box_iou
+
+# Deviasi standar noise relatif terhadap ukuran box (posisi dan kecepatan)
+_STD_POSITION = 1 / 20
+_STD_VELOCITY = 1 / 160
+
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8)
+
+
+def _xyxy_to_cxcywh(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+
+
+class Track:
+    """
+    Satu objek yang dilacak: state Kalman, skor per kelas, dan jumlah pasangan deteksi.
+    """
+    def __init__(self, track_id, detection, num_classes):
+        self.id = track_id
+        self.hits = 1
+        self.missed = 0 # Jumlah inferensi berturut-turut tanpa deteksi yang cocok
+        self.score = float(detection[4])
+        self.class_scores = np.zeros(num_classes)
+        self.class_scores[int(detection[5])] += detection[4]
+
+        self.mean = np.r_[_xyxy_to_cxcywh(detection[:4]), np.zeros(4)]
+        w, h = self.mean[2:4]
+        std = [2 * _STD_POSITION * w, 2 * _STD_POSITION * h, 2 * _STD_POSITION * w, 2 * _STD_POSITION * h,
+               10 * _STD_VELOCITY * w, 10 * _STD_VELOCITY * h, 10 * _STD_VELOCITY * w, 10 * _STD_VELOCITY * h]
+        self.covariance = np.diag(np.square(std))
+
+    @property
+    def box(self):
+        cx, cy, w, h = self.mean[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+    @property
+    def class_id(self):
+        return int(np.argmax(self.class_scores))
+
+    def predict(self):
+        """
+        Memajukan state satu frame.
+        """
+        w, h = self.mean[2:4]
+        std = [_STD_POSITION * w, _STD_POSITION * h, _STD_POSITION * w, _STD_POSITION * h,
+               _STD_VELOCITY * w, _STD_VELOCITY * h, _STD_VELOCITY * w, _STD_VELOCITY * h]
+        self.mean = _F @ self.mean
+        self.covariance = _F @ self.covariance @ _F.T + np.diag(np.square(std))
+
+    def update(self, detection):
+        w, h = self.mean[2:4]
+        noise = np.diag(np.square([_STD_POSITION * w, _STD_POSITION * h, _STD_POSITION * w, _STD_POSITION * h]))
+        projected_covariance = _H @ self.covariance @ _H.T + noise
+        gain = self.covariance @ _H.T @ np.linalg.inv(projected_covariance)
+        self.mean = self.mean + gain @ (_xyxy_to_cxcywh(detection[:4]) - _H @ self.mean)
+        self.covariance = (np.eye(8) - gain @ _H) @ self.covariance
+
+        self.hits += 1
+        self.missed = 0
+        self.score = float(detection[4])
+        self.class_scores[int(detection[5])] += detection[4]
+
+
+class ObjectTracker:
+    """
+    Memberi ID tetap pada deteksi antar frame dan menghitung objek unik per kelas.
+
+        tracker = ObjectTracker()
+        tracks = tracker.update(detections) # frame yang diinferensi
+        tracks = tracker.predict()          # frame yang dilewati model
+
+    Keduanya dipanggil tepat sekali per frame dan mengembalikan array (M, 7)
+    [x1, y1, x2, y2, score, class, track_id] untuk track yang sudah terkonfirmasi.
+    """
+    def __init__(self, num_classes=4, iou_threshold=None, max_age=None, min_hits=None):
+        self.num_classes = num_classes
+        self.iou_threshold = config.TRACKER_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        self.max_age = config.TRACKER_MAX_AGE if max_age is None else max_age
+        self.min_hits = config.TRACKER_MIN_HITS if min_hits is None else min_hits
+        self.tracks = []
+        self._finished = [] # Track terkonfirmasi yang sudah tidak terlihat
+        self._next_id = 1
+
+    def _confirmed(self, track):
+        return track.hits >= self.min_hits
+
+    def _output(self):
+        rows = [[*track.box, track.score, track.class_id, track.id]
+                for track in self.tracks if self._confirmed(track) and track.missed == 0]
+        return np.array(rows, dtype=np.float32).reshape(-1, 7)
+
+    def predict(self):
+        """
+        Frame tanpa inferensi: posisi track diprediksi dari kecepatannya.
+        """
+        for track in self.tracks:
+            track.predict()
+        return self._output()
+
+    def update(self, detections):
+        """
+        Frame dengan inferensi: memasangkan deteksi (N, 6) dengan track yang ada.
+        """
+        for track in self.tracks:
+            track.predict()
+
+        detections = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+        matched_tracks, matched_detections = [], []
+        if self.tracks and len(detections):
+            iou = box_iou(np.array([track.box for track in self.tracks]), detections[:, :4])
+            rows, cols = linear_sum_assignment(-iou)
+            keep = iou[rows, cols] >= self.iou_threshold
+            matched_tracks, matched_detections = rows[keep].tolist(), cols[keep].tolist()
+
+        for track_index, detection_index in zip(matched_tracks, matched_detections):
+            self.tracks[track_index].update(detections[detection_index])
+
+        matched = set(matched_tracks)
+        alive = []
+        for index, track in enumerate(self.tracks):
+            if index not in matched:
+                track.missed += 1
+            if track.missed <= self.max_age:
+                alive.append(track)
+            elif self._confirmed(track):
+                self._finished.append(track)
+        self.tracks = alive
+
+        unmatched = set(range(len(detections))) - set(matched_detections)
+        for detection_index in sorted(unmatched):
+            self.tracks.append(Track(self._next_id, detections[detection_index], self.num_classes))
+            self._next_id += 1
+        return self._output()
+
+    def unique_counts(self, class_names=None):
+        """
+        Jumlah objek unik (track terkonfirmasi) per kelas sejauh ini.
+        """
+        counts = Counter(track.class_id for track in self._finished + self.tracks if self._confirmed(track))
+        if class_names is None:
+            return {class_id: counts.get(class_id, 0) for class_id in range(self.num_classes)}
+        return {name: counts.get(class_id, 0) for class_id, name in enumerate(class_names)}
@@ -1,18 +1,15 @@
-import torch
-from ultralytics import YOLO
-from PIL import Image
 import cv2
 import numpy as np
-import streamlit as st
 import os
+from functools import lru_cache
 
-# Tambahan untuk PyTorch 2.6+ agar bisa load YOLO
-from torch.serialization import add_safe_globals
-from ultralytics.nn.modules.conv import Conv
-add_safe_globals([Conv])
+import config
+import metrics
+from detection_cache import get_detection_cache
+from batch_scheduler import get_batch_scheduler
 
 # Nama kelas dan warna bounding box (BGR)
-class_names = ['kurang matang', 'matang', 'mentah', 'terlalu matang']
+class_names = config.CLASS_NAMES
 class_colors = {
     0: (102, 214, 255),      # kurang matang - kuning pastel (BGR)
     1: (111, 118, 239),      # matang - hijau mint (BGR)
@@ -20,104 +17,628 @@ class_colors = {
     3: (178, 138, 17),       # terlalu matang - biru elegan (BGR)
 }
 
-@st.cache_resource
-def load_model():
+def load_model(backend=None, name=None):
     """
-    Memuat model YOLOv8 dan menyimpannya dalam cache Streamlit.
+    Memuat model YOLOv8 lewat registry model bersama (model_registry.py): satu instance
+    per model untuk semua sesi, dimuat saat pertama diminta.
+    name adalah nama model (default config.MODEL_WEIGHTS, lihat model_registry.model_names).
+    Backend inferensi ("pytorch", "onnx", "onnx-int8" atau "openvino") diambil dari config.MODEL_BACKEND.
+    torch dan ultralytics baru di-import di sini, tidak saat modul ini di-import. Jika gagal,
+    pesan galat ditampilkan di halaman Streamlit dan None dikembalikan; di luar UI, muat
+    lewat model_registry agar exception-nya diterima pemanggil.
     """
+    backend = backend or config.MODEL_BACKEND
+    name = name or config.MODEL_WEIGHTS
     try:
-        model = YOLO("best.pt")
-        return model
+        from model_registry import get_model_registry
+        return get_model_registry().get(name, backend)
     except Exception as e:
-        st.error(f"❌ Gagal memuat model: {e}. Pastikan file 'best.pt' ada di direktori yang sama.")
+        import streamlit as st
+        st.error(f"❌ Gagal memuat model {name} ({backend}): {e}. Pastikan file '{name}' ada di direktori yang sama.")
         return None
 
-def draw_boxes_on_frame(frame, results, class_names, class_colors):
+# Ukuran teks label (lebar, tinggi) per string label; label hanya kombinasi nama kelas dan persentase
+@lru_cache(maxsize=8192)
+def _label_size(label):
+    (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
+    return text_width, text_height
+
+@metrics.timed("draw")
+def draw_boxes_on_frame(frame, results, class_names, class_colors, inplace=False, out=None):
     """
     Fungsi pembantu untuk menggambar bounding box dan label pada sebuah frame gambar.
+    results dapat berupa hasil model, array deteksi (N, 6), atau array track (N, 7)
+    dengan ID track di kolom terakhir.
+    Secara default frame tidak diubah (digambar pada salinan). inplace=True menggambar
+    langsung pada frame; out (array berukuran sama) menyalin frame ke buffer milik
+    pemanggil lalu menggambar di sana tanpa alokasi baru.
     """
-    frame_with_boxes = frame.copy()
-
-    if results.boxes is not None and len(results.boxes.data) > 0:
-        for result in results.boxes.data:
-            x1, y1, x2, y2, score, cls = result.tolist()
-            class_id = int(cls)
-            label = f"{class_names[class_id]} ({score * 100:.1f}%)"
-            color = class_colors.get(class_id, (255, 255, 255))
-            
-            # Gambar bounding box
-            cv2.rectangle(frame_with_boxes, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
-            
-            # Gambar latar belakang label
-            (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.55, 2)
-            cv2.rectangle(frame_with_boxes, (int(x1), int(y1) - text_height - 10), 
-                          (int(x1) + text_width + 6, int(y1)), color, -1)
-            
-            # Gambar teks label
-            cv2.putText(frame_with_boxes, label, (int(x1) + 3, int(y1) - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
-    return frame_with_boxes
+    if inplace:
+        canvas = frame
+    elif out is not None:
+        np.copyto(out, frame)
+        canvas = out
+    else:
+        canvas = frame.copy()
 
-def detect_image_streamlit(image_file, model, conf=0.3):
+    # Satu kali transfer ke NumPy, lalu semua koordinat dibulatkan sekaligus
+    detections = results if isinstance(results, np.ndarray) else detections_to_array(results)
+    if len(detections) == 0:
+        return canvas
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    scores = (detections[:, 4] * 100).tolist()
+    class_ids = detections[:, 5].astype(np.int32).tolist()
+    track_ids = detections[:, 6].astype(np.int32).tolist() if detections.shape[1] > 6 else None
+
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        class_id = class_ids[i]
+        label = f"{class_names[class_id]} ({scores[i]:.1f}%)"
+        if track_ids is not None:
+            label = f"#{track_ids[i]} {label}"
+        color = class_colors.get(class_id, (255, 255, 255))
+
+        # Gambar bounding box
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, 2)
+
+        # Gambar latar belakang label
+        text_width, text_height = _label_size(label)
+        cv2.rectangle(canvas, (x1, y1 - text_height - 10), (x1 + text_width + 6, y1), color, -1)
+
+        # Gambar teks label
+        cv2.putText(canvas, label, (x1 + 3, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
+    return canvas
+
+def detections_to_array(results):
     """
-    Melakukan deteksi objek pada gambar yang diunggah dan mengembalikan gambar beranotasi.
+    Mengubah hasil deteksi (ultralytics Results atau DetectionResults backend) menjadi
+    array NumPy (N, 6) float32 berisi [x1, y1, x2, y2, score, class].
     """
-    image = Image.open(image_file).convert("RGB")
-    image_np = np.array(image)
-    image_bgr = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+    if isinstance(results, np.ndarray):
+        return results
+    if results is None or results.boxes is None or len(results.boxes.data) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    data = results.boxes.data
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data, dtype=np.float32)
 
+def filter_detections(detections, conf):
+    """
+    Menyaring array deteksi (N, 6) dengan confidence threshold tanpa inferensi ulang.
+    """
+    return detections[detections[:, 4] >= conf]
+
+def inference_conf(conf):
+    """
+    Threshold yang dipakai saat inferensi: cukup rendah agar semua nilai slider
+    dapat dilayani cukup dengan menyaring hasilnya.
+    """
+    return min(conf, config.MIN_CONFIDENCE)
+
+def detections_to_records(detections):
+    """
+    Mengubah array deteksi (N, 6) atau track (N, 7) menjadi list dict yang siap disimpan ke JSON/CSV.
+    """
+    records = []
+    for row in detections.tolist():
+        x1, y1, x2, y2, score, cls = row[:6]
+        class_id = int(cls)
+        record = {
+            "class_id": class_id,
+            "class_name": class_names[class_id],
+            "score": round(score, 4),
+            "x1": round(x1, 1), "y1": round(y1, 1), "x2": round(x2, 1), "y2": round(y2, 1),
+        }
+        if len(row) > 6:
+            record["track_id"] = int(row[6])
+        records.append(record)
+    return records
+
+def detect_image(image_bgr, model, conf=0.3):
+    """
+    Mendeteksi objek pada satu gambar BGR tanpa bergantung pada Streamlit.
+    Mengembalikan (gambar BGR beranotasi, hasil deteksi).
+    """
     results = model.predict(image_bgr, conf=conf, verbose=False)[0]
+    return draw_boxes_on_frame(image_bgr, results, class_names, class_colors), results
 
-    if results.boxes is None or len(results.boxes.data) == 0:
-        return None 
+def load_image_bgr(image_file):
+    """
+    Membaca gambar (file yang diunggah, path, atau bytes) menjadi array BGR dengan satu
+    kali decode OpenCV. Array ini adalah buffer kanonik gambar: tahap berikutnya memakainya
+    langsung tanpa konversi warna, konversi hanya terjadi saat ditampilkan atau di-encode.
+    Orientasi EXIF diabaikan, sama seperti sebelumnya saat gambar dibaca dengan PIL.
+    """
+    if isinstance(image_file, (str, os.PathLike)):
+        with open(image_file, "rb") as f:
+            data = f.read()
+    elif isinstance(image_file, (bytes, bytearray, memoryview)):
+        data = image_file
+    elif hasattr(image_file, "getvalue"):
+        data = image_file.getvalue()
+    else:
+        data = image_file.read()
 
-    processed_frame_bgr = draw_boxes_on_frame(image_bgr, results, class_names, class_colors)
-    
-    image_rgb = cv2.cvtColor(processed_frame_bgr, cv2.COLOR_BGR2RGB)
-    result_image = Image.fromarray(image_rgb)
-    return result_image
+    image_bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image_bgr is None:
+        # Format yang tidak dikenal OpenCV: decode dengan PIL, satu konversi ke BGR
+        from io import BytesIO
+        from PIL import Image
+        image = Image.open(BytesIO(data)).convert("RGB")
+        image_bgr = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+    return image_bgr
 
-def detect_video_streamlit(video_path, model, conf=0.3):
+@metrics.timed("detect_image")
+def detect_image_all(image_file, model, image_bgr=None, sliced=False):
     """
-    Melakukan deteksi objek pada video frame per frame.
-    Mengembalikan generator yang menghasilkan setiap frame yang sudah dianotasi (BGR)
-    dan juga mengembalikan list dari semua frame yang sudah diproses (BGR) untuk diunduh nanti.
+    Mendeteksi semua objek pada gambar yang diunggah dengan threshold terendah
+    (config.MIN_CONFIDENCE). Hasilnya disimpan di cache berdasarkan hash isi gambar,
+    sehingga gambar yang sama tidak diinferensi ulang. Inferensi melewati scheduler
+    micro-batching agar permintaan bersamaan digabung dalam satu batch.
+    Jika sliced=True dan gambar cukup besar (config.SLICE_MIN_SIZE), inferensi dilakukan
+    per tile (lihat sliced.py) agar tandan kecil pada gambar drone tetap terdeteksi.
+    Mengembalikan array deteksi (N, 6) yang belum disaring.
     """
-    cap = cv2.VideoCapture(video_path)
+    if image_bgr is None:
+        image_bgr = load_image_bgr(image_file)
+    conf = config.MIN_CONFIDENCE
+    variant = None
+    if sliced:
+        from sliced import should_slice, sliced_predict
+        sliced = should_slice(image_bgr)
+    if sliced:
+        variant = f"slice:{config.SLICE_TILE_SIZE}:{config.SLICE_OVERLAP}:{config.SLICE_MERGE}:{config.SLICE_INCLUDE_FULL}"
 
-    if not cap.isOpened():
-        st.error("Gagal membuka file video. Pastikan format video didukung dan file tidak rusak.")
-        return # Keluar dari generator jika video tidak dapat dibuka
+    def run_inference():
+        if sliced:
+            return sliced_predict(model, image_bgr, conf)
+        return detect_frames(model, [image_bgr], conf)[0]
 
-    # Mengambil properti video
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    # Simpan properti ini ke session state agar bisa diakses nanti
-    # Ini mungkin perlu dilakukan di app.py jika Anda ingin lebih ketat dalam mengelola session state
-    # atau passed as part of a tuple/dict with the frames
-    st.session_state['video_fps'] = fps
-    st.session_state['video_width'] = width
-    st.session_state['video_height'] = height
+    cache = get_detection_cache()
+    if cache is not None and hasattr(image_file, "getvalue"):
+        return cache.get_or_detect(image_file.getvalue(), model, conf, run_inference, variant)
+    return run_inference()
 
-    processed_frames_for_download = [] # List untuk menyimpan semua frame yang diproses
+def detect_images_all(image_files, model, images_bgr=None, sliced=False):
+    """
+    detect_image_all untuk banyak gambar sekaligus. Gambar yang belum ada di cache dikirim
+    bersamaan ke scheduler micro-batching (atau satu panggilan predict_frames), sehingga
+    banyak gambar dalam satu permintaan diinferensi sebagai satu batch.
+    Mengembalikan list array deteksi (N, 6) yang belum disaring, urut sesuai image_files.
+    """
+    if images_bgr is None:
+        images_bgr = [load_image_bgr(image_file) for image_file in image_files]
+    if sliced:
+        # Tile setiap gambar sudah diinferensi per batch di sliced_predict
+        return [detect_image_all(image_file, model, image_bgr, sliced=True)
+                for image_file, image_bgr in zip(image_files, images_bgr)]
 
+    from detection_cache import hash_bytes, model_identity
+
+    conf = config.MIN_CONFIDENCE
+    cache = get_detection_cache()
+    model_id = model_identity(model) if cache is not None else None
+    results = [None] * len(images_bgr)
+    hashes = [None] * len(images_bgr)
+    if cache is not None:
+        for i, image_file in enumerate(image_files):
+            if hasattr(image_file, "getvalue"):
+                hashes[i] = hash_bytes(image_file.getvalue())
+                results[i] = cache.get(hashes[i], model_id, conf)
+
+    missing = [i for i, detections in enumerate(results) if detections is None]
+    detected = detect_frames(model, [images_bgr[i] for i in missing], conf)
+    for i, detections in zip(missing, detected):
+        results[i] = detections
+        if hashes[i] is not None:
+            cache.put(hashes[i], model_id, conf, detections)
+    return results
+
+def render_image_detections(image_bgr, detections, conf=0.3):
+    """
+    Menyaring deteksi dengan threshold conf lalu menggambar hasilnya pada salinan image_bgr
+    (gambar asli tetap utuh untuk render ulang). Mengembalikan gambar BGR beranotasi
+    (tampilkan dengan st.image(..., channels="BGR")) atau None jika tidak ada deteksi yang lolos.
+    """
+    detections = filter_detections(detections, conf)
+    if len(detections) == 0:
+        return None
+    return draw_boxes_on_frame(image_bgr, detections, class_names, class_colors)
+
+@metrics.timed("image_e2e")
+def detect_image_streamlit(image_file, model, conf=0.3):
+    """
+    Melakukan deteksi objek pada gambar yang diunggah dan mengembalikan gambar BGR beranotasi.
+    Inferensi berjalan sekali dengan threshold terendah; conf hanya menyaring hasilnya.
+    """
+    image_bgr = load_image_bgr(image_file)
+    detections = detect_image_all(image_file, model, image_bgr)
+    return render_image_detections(image_bgr, detections, conf)
+
+def open_video_writer(output_path, fps, width, height, codec=None):
+    """
+    Membuka penulis video (antarmuka cv2.VideoWriter) untuk menulis frame hasil deteksi
+    langsung ke file. codec default config.VIDEO_OUTPUT_CODEC (lihat video_output.py).
+    """
+    from video_output import open_output_writer
+    return metrics.instrument_writer(open_output_writer(output_path, fps, width, height, codec))
+
+class FrameSampler:
+    """
+    Menentukan frame video mana yang dikirim ke model.
+    Mode yang didukung:
+      - "all"    : semua frame diinferensi
+      - "stride" : setiap frame ke-k (k = stride)
+      - "fps"    : N inferensi per detik video (N = target_fps)
+    Frame dikelompokkan ke dalam "bucket"; hanya frame pertama tiap bucket yang diinferensi.
+    """
+    MODES = ("all", "stride", "fps")
+
+    def __init__(self, mode="all", stride=1, target_fps=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode sampling tidak dikenal: {mode}. Pilih salah satu dari {self.MODES}.")
+        self.mode = mode
+        self.stride = max(1, int(stride))
+        self.target_fps = target_fps
+        self.source_fps = None
+
+    @classmethod
+    def from_config(cls):
+        return cls(config.VIDEO_SAMPLING_MODE, config.VIDEO_FRAME_STRIDE, config.VIDEO_INFERENCE_FPS)
+
+    def bind(self, source_fps):
+        """
+        Menyimpan FPS video sumber (dibutuhkan oleh mode "fps").
+        """
+        self.source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        return self
+
+    @property
+    def samples_every_frame(self):
+        if self.mode == "all":
+            return True
+        if self.mode == "stride":
+            return self.stride == 1
+        return not self.target_fps or self.target_fps >= (self.source_fps or 30.0)
+
+    def _bucket(self, index):
+        if self.samples_every_frame:
+            return index
+        if self.mode == "stride":
+            return index // self.stride
+        return int(index * self.target_fps / (self.source_fps or 30.0))
+
+    def should_infer(self, index):
+        return index == 0 or self._bucket(index) != self._bucket(index - 1)
+
+    def next_inference_index(self, index):
+        """
+        Indeks frame berikutnya (> index) yang akan diinferensi.
+        """
+        if self.samples_every_frame:
+            return index + 1
+        if self.mode == "stride":
+            return (index // self.stride + 1) * self.stride
+        bucket = self._bucket(index)
+        next_index = max(index + 1, int(np.ceil((bucket + 1) * (self.source_fps or 30.0) / self.target_fps)))
+        while next_index - 1 > index and self._bucket(next_index - 1) > bucket:
+            next_index -= 1
+        while self._bucket(next_index) <= bucket:
+            next_index += 1
+        return next_index
+
+    def output_fps(self, source_fps):
+        """
+        FPS video hasil jika frame yang dilewati tidak ikut ditulis.
+        """
+        if self.samples_every_frame:
+            return source_fps
+        if self.mode == "stride":
+            return source_fps / self.stride
+        return self.target_fps
+
+def read_frame_batches(cap, batch_size, sampler=None, keep_skipped=True, start=0):
+    """
+    Membaca frame dari cv2.VideoCapture dan mengelompokkannya menjadi list berisi
+    (indeks frame, frame BGR, perlu_inferensi) sesuai urutan aslinya. Setiap batch berisi
+    maksimal batch_size frame hasil decode, termasuk frame yang dilewati sampler, sehingga
+    memori per batch tetap terbatas berapa pun stride/fps sampler. Batch bisa saja tidak
+    berisi frame yang perlu diinferensi; frame-frame itu memakai deteksi batch sebelumnya.
+    Jika keep_skipped=False, frame yang dilewati tidak di-decode sama sekali:
+    posisi dimajukan dengan grab() atau seek CAP_PROP_POS_FRAMES untuk lompatan jauh.
+    start > 0 melanjutkan pembacaan dari indeks frame tersebut (misalnya dari checkpoint).
+    """
+    batch = []
+    index = start
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
     while True:
+        infer = sampler is None or sampler.should_infer(index)
+
+        if not infer and not keep_skipped:
+            next_index = sampler.next_inference_index(index)
+            if next_index - index >= config.VIDEO_SEEK_MIN_SKIP:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, next_index)
+            else:
+                for _ in range(next_index - index):
+                    if not cap.grab():
+                        break
+            index = next_index
+            continue
+
         ret, frame = cap.read()
         if not ret:
             break
 
-        results = model.predict(frame, conf=conf, verbose=False)[0]
-        processed_frame = draw_boxes_on_frame(frame, results, class_names, class_colors)
-        
-        processed_frames_for_download.append(processed_frame) # Simpan frame untuk diunduh
-        
-        # Mengembalikan frame dalam format RGB untuk tampilan Streamlit
-        yield cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-
-    cap.release()
-    
-    # Setelah loop selesai, simpan processed_frames_for_download ke session_state
-    # Ini akan diakses oleh app.py untuk membuat file yang dapat diunduh
-    st.session_state['processed_frames_data'] = processed_frames_for_download
\ No newline at end of file
+        batch.append((index, frame, infer))
+        index += 1
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+@metrics.timed("inference")
+def predict_frames(model, frames, conf=0.3):
+    """
+    Menjalankan model.predict untuk sekumpulan frame dalam satu panggilan.
+    Mengembalikan list hasil deteksi dengan urutan yang sama dengan frames.
+    """
+    if not frames:
+        return []
+    if len(frames) == 1:
+        results = model.predict(frames[0], conf=conf, verbose=False)
+    else:
+        results = model.predict(frames, conf=conf, verbose=False)
+    metrics.count_frames("inference", len(frames))
+    return results
+
+def detect_frames(model, frames, conf=0.3):
+    """
+    Jalur inferensi untuk model yang dipakai bersama (sesi UI, API, job, live, tile):
+    frame dikirim ke scheduler micro-batching model tersebut dan hasilnya dikumpulkan,
+    sehingga model tidak pernah dipanggil dari dua thread sekaligus. Jika scheduler
+    dimatikan (config.BATCH_SCHEDULER_ENABLED = False), pemanggilan model diserialkan
+    dengan lock per model. Mengembalikan array deteksi (N, 6) per frame.
+    """
+    if not frames:
+        return []
+    scheduler = get_batch_scheduler(model)
+    if scheduler is not None:
+        futures = [scheduler.submit(frame, conf) for frame in frames]
+        return [future.result() for future in futures]
+    from batch_scheduler import model_lock
+    with model_lock(model):
+        return predict_detections(model, frames, conf)
+
+def predict_detections(model, frames, conf=0.3):
+    """
+    predict_frames yang mengembalikan array deteksi (N, 6) per frame. Metrik jumlah deteksi
+    per kelas dihitung dari array yang sama, tanpa konversi ulang.
+    """
+    detections = [detections_to_array(results) for results in predict_frames(model, frames, conf)]
+    if metrics.ENABLED:
+        for frame_detections in detections:
+            metrics.count_detections(frame_detections)
+    return detections
+
+def pair_batch_results(batch, batch_results, last_results=None):
+    """
+    Memasangkan setiap frame dalam batch dengan hasil deteksinya. Frame yang tidak
+    diinferensi memakai hasil deteksi terakhir sebelumnya.
+    Mengembalikan list (indeks frame, frame, results, diinferensi).
+    """
+    results_iter = iter(batch_results)
+    pairs = []
+    for index, frame, infer in batch:
+        if infer:
+            last_results = next(results_iter)
+        pairs.append((index, frame, last_results, infer))
+    return pairs
+
+def track_frame(tracker, detections, infer, conf=0.3):
+    """
+    Menjalankan satu langkah tracker: deteksi yang lolos conf dipasangkan dengan track
+    pada frame yang diinferensi, sedangkan frame lain memakai posisi prediksi tracker.
+    Mengembalikan array track (M, 7) [x1, y1, x2, y2, score, class, track_id].
+    """
+    if infer:
+        return tracker.update(filter_detections(detections, conf))
+    return tracker.predict()
+
+class VideoDetections:
+    """
+    Deteksi lengkap (belum disaring threshold) untuk setiap frame video yang ditulis ke
+    output, sehingga video dapat dirender ulang dengan threshold lain tanpa inferensi.
+    Deteksi frame yang diinferensi langsung ditambahkan ke records (DetectionRecords,
+    array per kolom); setiap frame hanya mencatat rentang barisnya. Frame yang memakai
+    ulang deteksi sebelumnya berbagi rentang yang sama; inferred menandai frame yang
+    benar-benar diinferensi (dibutuhkan untuk tracking ulang).
+    """
+    def __init__(self, fps=None, source_id="video", source_fps=None):
+        from detection_records import DetectionRecords
+
+        self.fps = fps
+        self.source_id = source_id
+        self.source_fps = source_fps # fps video sumber, untuk timestamp rekaman
+        self.records = DetectionRecords()
+        self.frame_indices = []
+        self.inferred = []
+        self._starts = [] # Rentang baris records per frame
+        self._stops = []
+
+    def add(self, index, detections, inferred=True):
+        # Frame pertama selalu punya baris sendiri, juga jika memakai ulang deteksi dari luar objek ini
+        if inferred or not self._starts:
+            start = len(self.records)
+            timestamp = index / self.source_fps if self.source_fps else 0.0
+            stop = start + self.records.append(self.source_id, detections, index, timestamp)
+        else:
+            start, stop = self._starts[-1], self._stops[-1]
+        self.frame_indices.append(index)
+        self.inferred.append(inferred)
+        self._starts.append(start)
+        self._stops.append(stop)
+
+    def __len__(self):
+        return len(self.frame_indices)
+
+    def frame_detections(self, position):
+        """
+        Array deteksi (N, 6) frame ke-position dalam urutan output (boleh negatif).
+        """
+        return self.records.detections(self._starts[position], self._stops[position])
+
+    def frames(self):
+        """
+        (indeks frame, deteksi (N, 6), diinferensi) per frame. Frame yang memakai ulang
+        deteksi sebelumnya menerima array yang sama.
+        """
+        detections, last_range = None, None
+        for index, inferred, start, stop in zip(self.frame_indices, self.inferred, self._starts, self._stops):
+            if (start, stop) != last_range:
+                detections, last_range = self.records.detections(start, stop), (start, stop)
+            yield index, detections, inferred
+
+    def __iter__(self):
+        return ((index, detections) for index, detections, _ in self.frames())
+
+def render_video_detections(video_path, video_detections, conf=0.3, output_path=None, tracker=None, codec=None):
+    """
+    Merender ulang video dengan deteksi tersimpan yang disaring threshold conf.
+    Hanya decode, gambar, dan encode yang dijalankan (tanpa model.predict). Jika tracker
+    (ObjectTracker baru) diberikan, tracking diulang dari deteksi tersimpan. codec memilih
+    codec file output (default config.VIDEO_OUTPUT_CODEC).
+    Menghasilkan frame BGR beranotasi (buffer hasil decode, tanpa salinan).
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Gagal membuka file video '{video_path}'.")
+
+    writer = None
+    try:
+        if output_path is not None:
+            writer = open_video_writer(output_path, video_detections.fps or cap.get(cv2.CAP_PROP_FPS),
+                                       int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                       codec)
+        position = 0
+        for index, detections, infer in video_detections.frames():
+            # Lewati frame yang tidak ada di output tanpa mengambil pikselnya
+            while position < index:
+                cap.grab()
+                position += 1
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position += 1
+
+            if tracker is not None:
+                drawn = track_frame(tracker, detections, infer, conf)
+            else:
+                drawn = filter_detections(detections, conf)
+            processed_frame = draw_boxes_on_frame(frame, drawn, class_names, class_colors, inplace=True)
+            if writer is not None:
+                writer.write(processed_frame)
+            yield processed_frame
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+def process_video_capture(cap, model, conf=0.3, output_path=None, batch_size=None,
+                          sampler=None, keep_skipped=None, video_detections=None, tracker=None, codec=None):
+    """
+    Mendeteksi objek pada cv2.VideoCapture yang sudah dibuka, tanpa bergantung pada Streamlit.
+    Frame dikirim ke model per batch berisi batch_size frame (default config.VIDEO_BATCH_SIZE;
+    1 = frame per frame). sampler (FrameSampler, default dari config) menentukan frame yang
+    diinferensi; frame lain memakai deteksi terakhir jika keep_skipped=True, atau dilewati
+    tanpa di-decode jika keep_skipped=False.
+    Inferensi berjalan dengan threshold inference_conf(conf); conf hanya menyaring box yang digambar.
+    Menghasilkan (indeks frame, frame BGR beranotasi, array deteksi lengkap (N, 6) yang belum
+    disaring conf). Jika output_path
+    diberikan, setiap frame langsung ditulis ke file tersebut begitu selesai dianotasi,
+    sehingga memori hanya menampung frame yang sedang diproses. Deteksi tiap frame juga
+    dicatat ke video_detections (VideoDetections) jika diberikan. Jika tracker (ObjectTracker)
+    diberikan, yang digambar dan dihasilkan adalah array track (M, 7) dengan ID tetap, dan
+    frame yang dilewati sampler memakai posisi prediksi tracker. codec memilih codec file output
+    (lihat video_output.CODECS, default config.VIDEO_OUTPUT_CODEC). cap dilepas di akhir.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    if batch_size is None:
+        batch_size = config.VIDEO_BATCH_SIZE
+    batch_size = max(1, int(batch_size))
+    if sampler is None:
+        sampler = FrameSampler.from_config()
+    sampler.bind(fps)
+    if keep_skipped is None:
+        keep_skipped = config.VIDEO_ANNOTATE_SKIPPED
+    output_fps = fps if keep_skipped else sampler.output_fps(fps)
+    if video_detections is not None:
+        video_detections.fps = output_fps
+        video_detections.source_fps = fps
+
+    writer = None
+    try:
+        if output_path is not None:
+            writer = open_video_writer(output_path, output_fps, width, height, codec)
+
+        last_detections = None
+        for batch in metrics.instrument_iter("decode", read_frame_batches(cap, batch_size, sampler, keep_skipped)):
+            batch_detections = detect_frames(model, [frame for _, frame, infer in batch if infer],
+                                             conf=inference_conf(conf))
+            pairs = pair_batch_results(batch, batch_detections, last_detections)
+            last_detections = pairs[-1][2]
+
+            for index, frame, detections, infer in pairs:
+                if video_detections is not None:
+                    video_detections.add(index, detections, infer)
+                if tracker is not None:
+                    detections = track_frame(tracker, detections, infer, conf)
+                    drawn = detections
+                else:
+                    drawn = filter_detections(detections, conf)
+                # Frame hasil decode milik fungsi ini, jadi box digambar langsung di buffernya
+                processed_frame = draw_boxes_on_frame(frame, drawn, class_names, class_colors, inplace=True)
+
+                # Tulis frame langsung ke encoder, tidak disimpan di memori
+                if writer is not None:
+                    writer.write(processed_frame)
+                metrics.count_frames("video")
+
+                yield index, processed_frame, detections
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+@metrics.timed("video_e2e")
+def detect_video_streamlit(video_path, model, conf=0.3, output_path=None, batch_size=None,
+                           sampler=None, keep_skipped=None, video_detections=None, tracker=None, codec=None):
+    """
+    Melakukan deteksi objek pada video (lihat process_video_capture untuk parameter).
+    Mengembalikan generator yang menghasilkan setiap frame yang sudah dianotasi (BGR).
+    Jika output_path diberikan, setiap frame (BGR) langsung ditulis ke file tersebut.
+    Jika video_detections (VideoDetections) diberikan, deteksi lengkap tiap frame
+    disimpan di sana untuk render ulang dengan threshold lain.
+    """
+    import streamlit as st
+
+    cap = cv2.VideoCapture(video_path)
+
+    if not cap.isOpened():
+        st.error("Gagal membuka file video. Pastikan format video didukung dan file tidak rusak.")
+        return # Keluar dari generator jika video tidak dapat dibuka
+
+    # Simpan properti video ke session state agar bisa diakses nanti
+    st.session_state['video_fps'] = cap.get(cv2.CAP_PROP_FPS)
+    st.session_state['video_width'] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    st.session_state['video_height'] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    for _, processed_frame, _ in process_video_capture(cap, model, conf, output_path, batch_size,
+                                                       sampler, keep_skipped, video_detections, tracker,
+                                                       codec):
+        # Frame BGR hasil decode dikirim apa adanya; tampilkan dengan st.image(..., channels="BGR")
+        yield processed_frame
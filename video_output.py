@@ -0,0 +1,150 @@
+"""
+Subsistem output video: codec/kontainer file hasil dan pratinjau ringan untuk UI.
+
+File hasil di-encode sekali dengan codec pilihan (config.VIDEO_OUTPUT_CODEC). "h264"
+memakai ffmpeg bawaan imageio-ffmpeg (libx264): file jauh lebih kecil dari mp4v dan
+langsung dapat diputar browser. Codec OpenCV ("mp4v", "mjpg") tidak membutuhkan
+dependensi tambahan.
+
+Pratinjau di UI tidak memakai frame output: FramePreview memperkecil frame ke
+config.PREVIEW_MAX_WIDTH, membatasi laju ke config.PREVIEW_MAX_FPS, dan meng-encode JPEG
+sendiri. Biaya jaringan dan CPU pratinjau tetap kecil berapa pun resolusi dan kualitas
+file hasil.
+"""
+import logging
+import time
+
+import cv2
+import numpy as np
+
+import config
+
+logger = logging.getLogger("video_output")
+
+# backend "ffmpeg" lewat imageio-ffmpeg, "opencv" lewat cv2.VideoWriter.
+# browser: dapat diputar langsung oleh elemen <video>.
+CODECS = {
+    "h264": {"backend": "ffmpeg", "codec": "libx264", "crf": 23, "extension": ".mp4", "mime": "video/mp4",
+             "browser": True, "fallback": "mp4v"},
+    "vp9": {"backend": "ffmpeg", "codec": "libvpx-vp9", "crf": 32, "extension": ".webm", "mime": "video/webm",
+            "browser": True, "fallback": None},
+    "mp4v": {"backend": "opencv", "fourcc": "mp4v", "extension": ".mp4", "mime": "video/mp4", "browser": False},
+    "mjpg": {"backend": "opencv", "fourcc": "MJPG", "extension": ".avi", "mime": "video/x-msvideo", "browser": False},
+}
+
+
+def codec_spec(codec=None):
+    codec = codec or config.VIDEO_OUTPUT_CODEC
+    if codec not in CODECS:
+        raise ValueError(f"Codec output tidak dikenal: {codec}. Pilih salah satu dari {tuple(CODECS)}.")
+    return CODECS[codec]
+
+
+def output_filename(stem, codec=None):
+    """
+    Nama file output dengan ekstensi kontainer codec, misalnya "hasil" -> "hasil.mp4".
+    """
+    return stem + codec_spec(codec)["extension"]
+
+
+class FFmpegWriter:
+    """
+    Penulis video lewat ffmpeg (imageio-ffmpeg) dengan antarmuka seperti cv2.VideoWriter.
+    Frame BGR dikirim langsung ke stdin ffmpeg tanpa konversi warna di Python.
+    """
+    def __init__(self, path, fps, width, height, codec, crf=None, preset=None):
+        import imageio_ffmpeg
+
+        output_params = ["-crf", str(crf)]
+        if codec == "libx264":
+            # faststart: indeks file di depan agar browser dapat memutar sebelum unduhan selesai
+            output_params += ["-preset", preset or config.VIDEO_OUTPUT_PRESET, "-movflags", "+faststart"]
+        elif codec == "libvpx-vp9":
+            output_params += ["-b:v", "0", "-deadline", "realtime", "-cpu-used", "8"]
+        self._writer = imageio_ffmpeg.write_frames(path, (width, height), pix_fmt_in="bgr24", fps=fps, quality=None,
+                                                   codec=codec, macro_block_size=2, output_params=output_params)
+        self._writer.send(None)
+
+    def isOpened(self):
+        return self._writer is not None
+
+    def write(self, frame):
+        self._writer.send(np.ascontiguousarray(frame))
+
+    def release(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_output_writer(path, fps, width, height, codec=None):
+    """
+    Membuka penulis video untuk codec pilihan (default config.VIDEO_OUTPUT_CODEC).
+    Jika imageio-ffmpeg tidak terpasang, "h264" turun ke "mp4v" OpenCV.
+    """
+    spec = codec_spec(codec)
+    if not fps or fps <= 0:
+        fps = 30.0
+    if spec["backend"] == "ffmpeg":
+        try:
+            crf = config.VIDEO_OUTPUT_CRF if config.VIDEO_OUTPUT_CRF is not None else spec["crf"]
+            return FFmpegWriter(path, fps, width, height, spec["codec"], crf)
+        except ImportError:
+            if spec["fallback"] is None:
+                raise ImportError(f"Codec '{codec}' membutuhkan paket imageio-ffmpeg.")
+            logger.warning("imageio-ffmpeg tidak terpasang, output memakai codec %s", spec["fallback"])
+            spec = CODECS[spec["fallback"]]
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*spec["fourcc"]), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Gagal membuat file video '{path}'. Pastikan codec '{spec['fourcc']}' tersedia.")
+    return writer
+
+
+class FramePreview:
+    """
+    Pratinjau frame untuk UI: diperkecil, dibatasi laju, dan di-encode JPEG.
+
+        preview = FramePreview()
+        for frame in frames:
+            image = preview.update(frame)
+            if image is not None:
+                placeholder.image(image)
+    """
+    def __init__(self, max_width=None, max_fps=None, quality=None):
+        self.max_width = max_width or config.PREVIEW_MAX_WIDTH
+        self.interval = 1 / (max_fps or config.PREVIEW_MAX_FPS)
+        self.quality = quality or config.PREVIEW_JPEG_QUALITY
+        self.sent = 0
+        self._next_time = 0.0
+
+    def due(self):
+        return time.monotonic() >= self._next_time
+
+    def encode(self, frame, detections=None):
+        """
+        JPEG dari frame BGR yang diperkecil. Jika detections (N, 6) atau (N, 7) diberikan,
+        box digambar pada frame kecil (frame asli tidak diubah).
+        """
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.max_width / width)
+        small = frame
+        if scale < 1.0:
+            small = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        if detections is not None and len(detections):
+            from utils1 import class_colors, class_names, draw_boxes_on_frame
+
+            detections = np.array(detections, dtype=np.float32)
+            detections[:, :4] *= scale
+            small = draw_boxes_on_frame(small, detections, class_names, class_colors, inplace=small is not frame)
+        return cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1].tobytes()
+
+    def update(self, frame, detections=None, force=False):
+        """
+        JPEG pratinjau jika sudah waktunya mengirim frame baru (atau force=True), selain itu None.
+        """
+        if not force and not self.due():
+            return None
+        self._next_time = time.monotonic() + self.interval
+        self.sent += 1
+        return self.encode(frame, detections)
@@ -0,0 +1,304 @@
+"""
+Pipeline deteksi video bertahap: decode -> inferensi -> anotasi + encode.
+
+Setiap tahap berjalan di thread sendiri dan dihubungkan dengan queue berukuran
+terbatas, sehingga tahap yang cepat otomatis menunggu (backpressure) tahap yang
+lambat. cap.read() dan VideoWriter.write() di OpenCV melepas GIL, jadi decode dan
+encode dapat berjalan bersamaan dengan komputasi model.
+"""
+import logging
+import queue
+import threading
+import time
+import weakref
+
+import cv2
+
+import config
+import metrics
+from utils1 import (FrameSampler, read_frame_batches, detect_frames, pair_batch_results, filter_detections, inference_conf, draw_boxes_on_frame, open_video_writer,
+                    track_frame, class_names, class_colors)
+
+logger = logging.getLogger("video_pipeline")
+
+# Penanda akhir aliran data antar tahap
+_END = object()
+
+# Pipeline yang sedang berjalan, untuk metrik isi antrian antar tahap. Diubah oleh thread
+# pipeline dan dibaca oleh thread metrik, jadi selalu diakses lewat _running_lock.
+_running = weakref.WeakSet()
+_running_lock = threading.Lock()
+
+
+def _queue_depth(attribute):
+    def depth():
+        with _running_lock:
+            pipelines = list(_running)
+        return sum(getattr(pipeline, attribute).qsize() for pipeline in pipelines)
+    return depth
+
+
+metrics.register_queue("video_pipeline_decoded", _queue_depth("_decoded"))
+metrics.register_queue("video_pipeline_inferred", _queue_depth("_inferred"))
+metrics.register_queue("video_pipeline_display", _queue_depth("_display"))
+
+
+class PipelineError(RuntimeError):
+    """
+    Dilempar ketika salah satu tahap pipeline gagal atau sumber video macet.
+    """
+
+
+class StageStats:
+    """
+    Statistik satu tahap pipeline: jumlah frame dan waktu sibuk (detik).
+    Hanya diperbarui oleh thread milik tahap tersebut.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.busy_time = 0.0
+
+    def record(self, frames, elapsed):
+        self.frames += frames
+        self.busy_time += elapsed
+
+    @property
+    def fps(self):
+        return self.frames / self.busy_time if self.busy_time > 0 else 0.0
+
+
+class VideoPipeline:
+    """
+    Menjalankan deteksi video dengan tahap decode, inferensi, dan anotasi+encode
+    di thread terpisah. Gunakan frames() sebagai pengganti detect_video_streamlit:
+    generator ini menghasilkan frame BGR yang sudah dianotasi untuk ditampilkan.
+    """
+    STAGES = ("decode", "inferensi", "anotasi+encode")
+
+    def __init__(self, video_path, model, conf=0.3, output_path=None, batch_size=None,
+                 queue_size=None, stall_timeout=None, sampler=None, keep_skipped=None, video_detections=None,
+                 tracker=None, codec=None):
+        self.video_path = video_path
+        self.model = model
+        self.conf = conf
+        self.output_path = output_path
+        self.batch_size = max(1, int(batch_size or config.VIDEO_BATCH_SIZE))
+        self.queue_size = max(1, int(queue_size or config.PIPELINE_QUEUE_SIZE))
+        self.stall_timeout = stall_timeout or config.PIPELINE_STALL_TIMEOUT
+        self.sampler = sampler or FrameSampler.from_config()
+        self.keep_skipped = config.VIDEO_ANNOTATE_SKIPPED if keep_skipped is None else keep_skipped
+        # Deteksi lengkap per frame untuk render ulang dengan threshold lain (opsional)
+        self.video_detections = video_detections
+        # Tracker (ObjectTracker) dijalankan di tahap anotasi yang memproses frame berurutan
+        self.tracker = tracker
+        # Codec file output (video_output.CODECS), default config.VIDEO_OUTPUT_CODEC
+        self.codec = codec
+
+        self.fps = None
+        self.width = None
+        self.height = None
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.wall_time = 0.0
+
+        self._cap = None
+        self._stop_event = threading.Event()
+        self._error = None
+        self._threads = []
+        # Nama thread yang belum selesai setelah stop() (seharusnya kosong)
+        self.stuck_threads = []
+        # Antrian batch frame mentah, batch hasil inferensi, dan frame beranotasi untuk tampilan
+        self._decoded = queue.Queue(maxsize=self.queue_size)
+        self._inferred = queue.Queue(maxsize=self.queue_size)
+        self._display = queue.Queue(maxsize=self.queue_size * self.batch_size)
+
+    # --- Utilitas queue yang tetap responsif terhadap sinyal berhenti ---
+    def _put(self, q, item):
+        while not self._stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_stage(self, target, downstream):
+        try:
+            target()
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            self._stop_event.set()
+        finally:
+            self._put(downstream, _END)
+
+    # --- Tahap-tahap pipeline ---
+    def _decode_stage(self):
+        stats = self.stats["decode"]
+        batches = read_frame_batches(self._cap, self.batch_size, self.sampler, self.keep_skipped)
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                elapsed = time.perf_counter() - start
+                stats.record(len(batch), elapsed)
+                metrics.observe_stage("decode", elapsed)
+                if not self._put(self._decoded, batch):
+                    break
+        finally:
+            # Capture hanya dilepas oleh thread ini: release saat cap.read() berjalan merusak memori
+            self._cap.release()
+
+    def _inference_stage(self):
+        stats = self.stats["inferensi"]
+        while True:
+            batch = self._get(self._decoded)
+            if batch is _END:
+                break
+            frames = [frame for _, frame, infer in batch if infer]
+            start = time.perf_counter()
+            batch_detections = detect_frames(self.model, frames, conf=inference_conf(self.conf))
+            stats.record(len(frames), time.perf_counter() - start)
+            if not self._put(self._inferred, (batch, batch_detections)):
+                break
+
+    def _annotate_encode_stage(self):
+        stats = self.stats["anotasi+encode"]
+        writer = None
+        last_detections = None
+        output_fps = self.fps if self.keep_skipped else self.sampler.output_fps(self.fps)
+        if self.video_detections is not None:
+            self.video_detections.fps = output_fps
+            self.video_detections.source_fps = self.fps
+        try:
+            if self.output_path is not None:
+                writer = open_video_writer(self.output_path, output_fps, self.width, self.height, self.codec)
+            while True:
+                item = self._get(self._inferred)
+                if item is _END:
+                    break
+                pairs = pair_batch_results(*item, last_detections)
+                last_detections = pairs[-1][2]
+                for index, frame, detections, infer in pairs:
+                    start = time.perf_counter()
+                    if self.tracker is not None:
+                        drawn = track_frame(self.tracker, detections, infer, self.conf)
+                    else:
+                        drawn = filter_detections(detections, self.conf)
+                    processed_frame = draw_boxes_on_frame(frame, drawn, class_names, class_colors, inplace=True)
+                    if writer is not None:
+                        writer.write(processed_frame)
+                    if self.video_detections is not None:
+                        self.video_detections.add(index, detections, infer)
+                    stats.record(1, time.perf_counter() - start)
+                    metrics.count_frames("video")
+                    # Buffer hasil decode diteruskan tanpa salinan; konversi warna terjadi di st.image
+                    if not self._put(self._display, processed_frame):
+                        return
+        finally:
+            if writer is not None:
+                writer.release()
+
+    # --- API publik ---
+    def frames(self):
+        """
+        Menjalankan pipeline dan menghasilkan frame BGR beranotasi sesuai urutan video.
+        Melempar PipelineError jika sebuah tahap gagal atau tidak ada frame baru
+        selama stall_timeout detik.
+        """
+        # Batas waktu buka/baca di backend (FFmpeg) agar cap.read() pada sumber yang macet kembali sendiri
+        timeout_ms = int(self.stall_timeout * 1000)
+        self._cap = cv2.VideoCapture(self.video_path, cv2.CAP_ANY,
+                                     [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                                      cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms])
+        if not self._cap.isOpened():
+            self._cap.release()
+            raise PipelineError("Gagal membuka file video. Pastikan format video didukung dan file tidak rusak.")
+
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.sampler.bind(self.fps)
+
+        stages = [
+            (self._decode_stage, self._decoded),
+            (self._inference_stage, self._inferred),
+            (self._annotate_encode_stage, self._display),
+        ]
+        for name, (target, downstream) in zip(self.STAGES, stages):
+            thread = threading.Thread(target=self._run_stage, args=(target, downstream),
+                                      name=f"video-pipeline-{name}", daemon=True)
+            self._threads.append(thread)
+
+        started = time.perf_counter()
+        with _running_lock:
+            _running.add(self)
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            last_frame_time = time.monotonic()
+            while True:
+                try:
+                    item = self._display.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop_event.is_set():
+                        break
+                    if time.monotonic() - last_frame_time > self.stall_timeout:
+                        self._error = PipelineError(
+                            f"Tidak ada frame baru selama {self.stall_timeout} detik, pipeline dihentikan.")
+                        break
+                    continue
+                if item is _END:
+                    break
+                last_frame_time = time.monotonic()
+                yield item
+
+            if self._error is not None:
+                if isinstance(self._error, PipelineError):
+                    raise self._error
+                raise PipelineError(f"Pipeline video gagal: {self._error}") from self._error
+        finally:
+            self.wall_time = time.perf_counter() - started
+            self.stop()
+            with _running_lock:
+                _running.discard(self)
+
+    def stop(self, timeout=5.0):
+        """
+        Menghentikan semua tahap dan menunggu thread selesai (maksimal timeout detik per thread).
+        Decoder yang masih tertahan di cap.read() (sumber jaringan, file macet) dibiarkan sebagai
+        thread daemon sampai batas waktu baca capture habis; capture tidak dilepas dari sini.
+        Thread yang belum selesai dicatat di stuck_threads dan di log.
+        """
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self.stuck_threads = [thread.name for thread in self._threads if thread.is_alive()]
+        if self.stuck_threads:
+            logger.error("Thread pipeline tidak berhenti dalam %.1f detik: %s", timeout,
+                         ", ".join(self.stuck_threads))
+
+    def summary(self):
+        """
+        Ringkasan throughput per tahap (frame/detik saat tahap sibuk) dan keseluruhan.
+        """
+        summary = {name: {"frames": s.frames, "busy_time": s.busy_time, "fps": s.fps}
+                   for name, s in self.stats.items()}
+        encoded = self.stats["anotasi+encode"].frames
+        summary["total"] = {
+            "frames": encoded,
+            "busy_time": self.wall_time,
+            "fps": encoded / self.wall_time if self.wall_time > 0 else 0.0,
+        }
+        return summary
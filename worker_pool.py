@@ -0,0 +1,194 @@
+"""
+Pool proses untuk deteksi gambar paralel di banyak core CPU.
+
+Setiap worker memuat model satu kali dengan jumlah thread intra-op torch yang dibatasi,
+sehingga beberapa worker dapat berjalan bersamaan tanpa berebut core. Pekerjaan
+dibagikan ke semua worker dan hasilnya dikembalikan sesuai urutan selesai.
+
+Benchmark skala throughput terhadap jumlah worker:
+    python worker_pool.py data/gambar --workers 1 2 4 8 --threads-per-worker 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+import config
+
+# Model milik proses worker, dimuat sekali oleh init_worker
+_worker_model = None
+
+
+def init_worker(backend=None, weights=None, threads_per_worker=None):
+    """
+    Initializer proses worker: membatasi thread torch/OpenCV lalu memuat model.
+    """
+    global _worker_model
+    threads_per_worker = config.WORKER_THREADS if threads_per_worker is None else threads_per_worker
+    if threads_per_worker:
+        os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+        cv2.setNumThreads(threads_per_worker)
+        if (backend or config.MODEL_BACKEND) == "pytorch":
+            import torch
+            torch.set_num_threads(threads_per_worker)
+    from backends import load_backend
+    _worker_model = load_backend(backend, weights, num_threads=threads_per_worker)
+
+
+def worker_model():
+    """
+    Model yang dimuat oleh init_worker di proses ini.
+    """
+    return _worker_model
+
+
+def _read_image(image):
+    if isinstance(image, str):
+        frame = cv2.imread(image)
+    elif isinstance(image, (bytes, bytearray)):
+        frame = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        frame = image
+    if frame is None:
+        raise ValueError("Gambar tidak dapat dibaca.")
+    return frame
+
+
+def _detect_job(image, conf):
+    from utils1 import detections_to_array
+
+    frame = _read_image(image)
+    results = _worker_model.predict(frame, conf=conf, verbose=False)[0]
+    return detections_to_array(results)
+
+
+def default_workers(threads_per_worker=None):
+    threads_per_worker = threads_per_worker or config.WORKER_THREADS or 1
+    return max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+
+class DetectionWorkerPool:
+    """
+    Mesin inferensi berbasis pool proses. Gambar dapat berupa path, bytes hasil encode,
+    atau array BGR (path/bytes lebih murah dikirim antar proses).
+
+        with DetectionWorkerPool(workers=8, threads_per_worker=4) as pool:
+            for index, detections in pool.imap_unordered(paths, conf=0.3):
+                ...
+    """
+    def __init__(self, workers=None, threads_per_worker=None, backend=None, weights=None, max_pending=None):
+        self.threads_per_worker = config.WORKER_THREADS if threads_per_worker is None else threads_per_worker
+        self.workers = workers or config.WORKER_POOL_SIZE or default_workers(self.threads_per_worker)
+        # Batas pekerjaan yang sedang berjalan agar input yang sangat banyak tidak menumpuk di memori
+        self.max_pending = max_pending or self.workers * 2
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(backend, weights, self.threads_per_worker),
+        )
+
+    def submit(self, image, conf=0.3):
+        """
+        Mengirim satu gambar; mengembalikan Future berisi array deteksi (N, 6).
+        """
+        return self._executor.submit(_detect_job, image, conf)
+
+    def imap_unordered(self, images, conf=0.3):
+        """
+        Mendeteksi semua gambar dan menghasilkan (indeks input, array deteksi) sesuai
+        urutan selesai. Pengecualian dari worker diteruskan ke pemanggil.
+        """
+        pending = {}
+        images = iter(enumerate(images))
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < self.max_pending:
+                item = next(images, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, image = item
+                pending[self.submit(image, conf)] = index
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+    def warmup(self, size=(640, 640)):
+        """
+        Menjalankan beberapa gambar kosong agar semua worker selesai memuat model.
+        """
+        blank = cv2.imencode(".jpg", np.zeros((size[1], size[0], 3), dtype=np.uint8))[1].tobytes()
+        for _ in self.imap_unordered([blank] * self.workers * 2):
+            pass
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(images, worker_counts, threads_per_worker=None, backend=None, weights=None, conf=0.3, repeat=1):
+    """
+    Mengukur throughput (gambar/detik) untuk setiap jumlah worker.
+    """
+    report = []
+    jobs = [image for image in images for _ in range(repeat)]
+    for workers in worker_counts:
+        with DetectionWorkerPool(workers, threads_per_worker, backend, weights) as pool:
+            pool.warmup()
+            started = time.perf_counter()
+            for _ in pool.imap_unordered(jobs, conf=conf):
+                pass
+            elapsed = time.perf_counter() - started
+        report.append({"workers": workers, "threads_per_worker": pool.threads_per_worker,
+                       "images": len(jobs), "seconds": elapsed, "images_per_second": len(jobs) / elapsed})
+    baseline = report[0]["images_per_second"] if report else 0
+    for entry in report:
+        entry["speedup"] = entry["images_per_second"] / baseline if baseline else 0.0
+    return report
+
+
+def main(argv=None):
+    from batch_detect import collect_sources, media_type
+
+    parser = argparse.ArgumentParser(description="Benchmark throughput pool proses deteksi gambar.")
+    parser.add_argument("inputs", nargs="+", help="Folder, pola glob, atau file gambar")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Daftar jumlah worker yang diuji")
+    parser.add_argument("--threads-per-worker", type=int, default=config.WORKER_THREADS)
+    parser.add_argument("--backend", default=config.MODEL_BACKEND)
+    parser.add_argument("--weights", default=config.MODEL_WEIGHTS)
+    parser.add_argument("--repeat", type=int, default=1, help="Ulangi setiap gambar sebanyak N kali")
+    parser.add_argument("--json", help="Simpan hasil benchmark ke file JSON")
+    args = parser.parse_args(argv)
+
+    images = [path for path, _ in collect_sources(args.inputs) if media_type(path) == "image"]
+    if not images:
+        print("Tidak ada gambar yang ditemukan.")
+        return 1
+
+    report = benchmark(images, args.workers, args.threads_per_worker, args.backend, args.weights, repeat=args.repeat)
+    print(f"{'Worker':>6} {'Thread':>6} {'Gambar/detik':>13} {'Speedup':>8}")
+    for entry in report:
+        print(f"{entry['workers']:>6} {entry['threads_per_worker']:>6} {entry['images_per_second']:>13.2f} {entry['speedup']:>7.2f}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())